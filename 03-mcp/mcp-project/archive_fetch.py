@@ -0,0 +1,286 @@
+"""
+Conditional, resumable and verified downloads of documentation archives.
+
+``ArchiveFetcher`` keeps one zip (``fastmcp-main.zip``) up to date with its
+URL:
+
+- the ETag and Last-Modified of the copy on disk are kept in a small JSON
+  file next to it (``<zip>.meta.json``), and every check is a conditional
+  GET (``If-None-Match`` / ``If-Modified-Since``): an unchanged archive
+  costs one 304 response;
+- the body is streamed in 1 MiB chunks into ``<zip>.part``; if the transfer
+  is interrupted, the partial file and its validator are kept, and the next
+  fetch asks only for the missing bytes (``Range`` with ``If-Range``, so a
+  partial file of an older version is restarted from zero);
+- the finished file is checked (expected size, then the CRC of every zip
+  entry) before it is renamed over the old archive, so a truncated or
+  corrupt download never replaces a good one.
+
+``RefreshScheduler`` runs a refresh callable every few seconds in a daemon
+thread, for the server's periodic archive refresh.
+
+``requests`` is only imported by the first request, so creating a fetcher
+costs nothing at server start.
+"""
+
+import json
+import os
+import threading
+import time
+import zipfile
+
+CHUNK_SIZE = 1 << 20
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+
+
+def _write_json(path, value):
+    """Write JSON to ``path`` through a temp file and an atomic rename."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def verify_zip(path, expected_size=None):
+    """
+    Check that ``path`` is a complete, uncorrupted zip archive.
+
+    Raises:
+        ValueError: If the size differs from ``expected_size``, the file is
+            not a zip or an entry fails its CRC check.
+    """
+    size = os.path.getsize(path)
+    if expected_size is not None and size != expected_size:
+        raise ValueError(f"Incomplete download: {size} of {expected_size} bytes")
+    try:
+        with zipfile.ZipFile(path) as zf:
+            broken = zf.testzip()
+    except (zipfile.BadZipFile, OSError, EOFError) as e:
+        raise ValueError(f"Corrupt archive: {e}") from e
+    if broken is not None:
+        raise ValueError(f"Corrupt archive: bad CRC for {broken}")
+
+
+def _total_size(response, start):
+    """Size of the whole file from a 200 or 206 response, if it tells."""
+    content_range = response.headers.get('Content-Range', '')
+    if response.status_code == 206 and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get('Content-Length')
+    return start + int(length) if length and length.isdigit() else None
+
+
+class ArchiveFetcher:
+    """
+    Keeps a local copy of a zip archive in sync with its URL.
+
+    Attributes:
+        url (str): Where the archive is downloaded from.
+        path (str): The local copy.
+        meta_path (str): Validators of the local copy (ETag, Last-Modified).
+        part_path (str): The download in progress; ``part_path + '.json'``
+            holds the validator it was started with.
+        chunk_size (int): Bytes read and written at a time.
+        metrics (Metrics): Optional registry recording every request.
+    """
+
+    def __init__(self, url, path, chunk_size=CHUNK_SIZE, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, session=None, metrics=None):
+        self.url = url
+        self.path = path
+        self.meta_path = f"{path}.meta.json"
+        self.part_path = f"{path}.part"
+        self.chunk_size = chunk_size
+        self.timeout = (connect_timeout, read_timeout)
+        self._session = session
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._status = {'checked_at': None, 'result': None, 'error': None}
+
+    @property
+    def session(self):
+        """The HTTP session, created on first use."""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def status(self):
+        """The outcome of the last fetch, and the validators of the local copy."""
+        meta = _read_json(self.meta_path)
+        return dict(
+            self._status, etag=meta.get('etag'), last_modified=meta.get('last_modified'),
+            partial_bytes=os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0,
+        )
+
+    def _has_valid_copy(self):
+        return os.path.exists(self.path) and zipfile.is_zipfile(self.path)
+
+    def ensure(self):
+        """Return the local copy, downloading it only if it is missing or not a zip."""
+        if self._has_valid_copy():
+            return self.path
+        self.fetch()
+        return self.path
+
+    def fetch(self):
+        """
+        Bring the local copy up to date with a conditional, resumable GET.
+
+        Returns:
+            A dict with 'result' ("not_modified" or "downloaded"), the
+            'bytes' received and the offset a download 'resumed_from'.
+        """
+        with self._lock:
+            self._status['checked_at'] = time.time()
+            try:
+                outcome = self._fetch()
+            except BaseException as e:
+                self._status.update(result="failed", error=str(e) or type(e).__name__)
+                raise
+            self._status.update(result=outcome['result'], error=None)
+            return outcome
+
+    def _fetch(self):
+        meta = _read_json(self.meta_path) if self._has_valid_copy() else {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        part_meta = _read_json(f"{self.part_path}.json")
+        start = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        validator = part_meta.get('etag') or part_meta.get('last_modified')
+        if start and validator:
+            headers['Range'] = f"bytes={start}-"
+            headers['If-Range'] = validator
+        else:
+            start = 0
+
+        response = self._get(headers)
+        try:
+            if response.status_code == 304:
+                self._discard_part()
+                return {'result': "not_modified", 'bytes': 0, 'resumed_from': None}
+            if response.status_code == 416:
+                # The partial file does not fit the archive any more
+                self._discard_part()
+                response.close()
+                headers.pop('Range', None)
+                headers.pop('If-Range', None)
+                start = 0
+                response = self._get(headers)
+                if response.status_code == 304:
+                    return {'result': "not_modified", 'bytes': 0, 'resumed_from': None}
+            response.raise_for_status()
+            if response.status_code != 206:
+                start = 0
+            received = self._stream(response, start)
+        finally:
+            response.close()
+
+        total = _total_size(response, start)
+        try:
+            verify_zip(self.part_path, total)
+        except ValueError:
+            self._discard_part()
+            raise
+        os.replace(self.part_path, self.path)
+        _write_json(self.meta_path, {
+            'url': self.url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'size': os.path.getsize(self.path),
+            'fetched_at': time.time(),
+        })
+        self._discard_part()
+        return {'result': "downloaded", 'bytes': received, 'resumed_from': start or None}
+
+    def _get(self, headers):
+        import requests
+
+        start = time.perf_counter()
+        try:
+            response = self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout)
+        except requests.RequestException:
+            if self.metrics is not None:
+                self.metrics.record_upstream("archive", time.perf_counter() - start, error=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_upstream(
+                "archive", time.perf_counter() - start, error=response.status_code >= 400
+            )
+        return response
+
+    def _stream(self, response, start):
+        """Write the body to the partial file (appended to its first ``start`` bytes)."""
+        # Remember what the partial file belongs to before writing it, so
+        # an interrupted download can be resumed
+        _write_json(f"{self.part_path}.json", {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        })
+        received = 0
+        with open(self.part_path, 'ab' if start else 'wb', buffering=self.chunk_size) as f:
+            if start:
+                f.truncate(start)
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                f.write(chunk)
+                received += len(chunk)
+        return received
+
+    def _discard_part(self):
+        for path in [self.part_path, f"{self.part_path}.json"]:
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+class RefreshScheduler:
+    """
+    Calls ``refresh()`` every ``interval`` seconds in a daemon thread.
+
+    A failing refresh is recorded in ``last_error`` and retried at the next
+    tick; ``stop`` ends the loop without waiting for the next tick.
+    """
+
+    def __init__(self, refresh, interval, name="archive-refresh"):
+        self.refresh = refresh
+        self.interval = interval
+        self.name = name
+        self.runs = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+            self.runs += 1
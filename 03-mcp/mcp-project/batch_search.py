@@ -0,0 +1,88 @@
+"""
+Batch search over a fitted index.
+
+``search_many`` scores a list of queries in one pass: all queries are
+vectorized together and multiplied against the document matrix of each text
+field, instead of running one similarity pass per query. It accepts both the
+native ``BM25Index`` and a minsearch ``Index``. ``search_ids_many`` gives the
+document ids and scores instead of the documents.
+"""
+
+import numpy as np
+
+
+def _minsearch_search_ids_many(index, queries, filter_dict, boost_dict, num_results):
+    """Batch version of ``minsearch.Index.search``, giving ids and scores."""
+    scores = None
+    for field in index.text_fields:
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine similarity
+        query_matrix = index.vectorizers[field].transform(queries)
+        similarity = (query_matrix @ index.text_matrices[field].T).toarray()
+        boosted = similarity * boost_dict.get(field, 1)
+        scores = boosted if scores is None else scores + boosted
+
+    for field, value in filter_dict.items():
+        if field in index.keyword_fields:
+            if value is None:
+                mask = index.keyword_df[field].isna()
+            else:
+                mask = index.keyword_df[field] == value
+            scores = scores * mask.to_numpy()
+
+    results = []
+    for row in scores:
+        non_zero = np.flatnonzero(row > 0)
+        top = non_zero[np.argsort(-row[non_zero], kind='stable')][:num_results]
+        results.append((top, row[top]))
+    return results
+
+
+def search_ids_many(index, queries, filter_dict=None, boost_dict=None, num_results=10):
+    """
+    Rank documents for several queries at once.
+
+    Args:
+        index: A fitted ``BM25Index`` or minsearch ``Index``.
+        queries: List of query strings.
+        filter_dict: Keyword fields to filter by, applied to every query.
+        boost_dict: Boost scores for text fields, applied to every query.
+        num_results: Number of results to return per query.
+
+    Returns:
+        One ``(doc_ids, scores)`` pair of arrays per query, best match first.
+    """
+    queries = list(queries)
+    if not queries or not len(index.docs):
+        return [(np.empty(0, dtype=np.int64), np.empty(0)) for _ in queries]
+
+    if hasattr(index, 'search_ids_many'):
+        return index.search_ids_many(queries, filter_dict, boost_dict, num_results)
+
+    return _minsearch_search_ids_many(index, queries, filter_dict or {}, boost_dict or {}, num_results)
+
+
+def search_many(index, queries, filter_dict=None, boost_dict=None, num_results=10):
+    """
+    Search the index with several queries at once.
+
+    Args:
+        index: A fitted ``BM25Index`` or minsearch ``Index``.
+        queries: List of query strings.
+        filter_dict: Keyword fields to filter by, applied to every query.
+        boost_dict: Boost scores for text fields, applied to every query.
+        num_results: Number of results to return per query.
+
+    Returns:
+        A list with the ranked documents of each query, in query order.
+    """
+    queries = list(queries)
+    if not queries or not index.docs:
+        return [[] for _ in queries]
+
+    if hasattr(index, 'search_many'):
+        return index.search_many(queries, filter_dict, boost_dict, num_results)
+
+    return [
+        [index.docs[i] for i in doc_ids]
+        for doc_ids, _ in search_ids_many(index, queries, filter_dict, boost_dict, num_results)
+    ]
@@ -0,0 +1,492 @@
+#!/usr/bin/env python
+"""
+Offline search benchmark on synthetic FastMCP-like corpora.
+
+For every corpus size a synthetic markdown archive is generated with the
+same layout as ``fastmcp-main.zip`` (a single top-level directory holding
+``docs/**.mdx`` pages and ``README.md`` files), then a fresh worker process
+measures:
+
+- extraction and index build time of ``search.py`` (document-level index);
+- the index build phases of ``server.py`` (section chunks);
+- p50/p95/p99 query latency of ``search.search`` and ``search_fastmcp_docs``
+  (with the result caches disabled, so every query is scored), the latter
+  in its sparse, dense and hybrid modes, plus the dense index build time,
+  in fuzzy mode on the same queries with a typo in each, and scoped to one
+  of the six ``docs/`` subtrees with a ``paths`` filter;
+- the peak RSS of the worker.
+
+Results are written as JSON; ``--compare`` checks them against an earlier
+run and fails when a latency or build time regressed beyond ``--tolerance``.
+
+``--startup`` measures start-up instead, for ``server.py`` next to the bare
+FastMCP server of ``basic_server.py``: the ``-X importtime`` import time of
+each module (and which of the search stack's packages it pulled in), and the
+time from launching it as a stdio MCP server to its answer to ``initialize``
+and to a first tool call (``read_url`` against a closed local port, so no
+network is needed). It fails when ``server.py`` is more than
+``--tolerance`` times slower than the baseline or imports the search stack.
+
+Usage:
+    python benchmark.py --sizes 100,1000,10000 --output benchmark_results.json
+    python benchmark.py --compare benchmark_results.json --output benchmark_new.json
+    python benchmark.py --startup --output startup_results.json
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+DEFAULT_SIZES = [100, 1000, 10000]
+NUM_QUERIES = 200
+
+# Packages of the search stack; a server that only reads URLs never imports them
+HEAVY_MODULES = ('numpy', 'scipy', 'pandas', 'sklearn', 'minsearch', 'requests')
+
+# Servers timed by --startup: module, tool called first and its arguments
+STARTUP_TARGETS = [
+    ('basic_server', 'add', {'a': 1, 'b': 2}),
+    ('server', 'read_url', {'url': "https://example.com"}),
+]
+STARTUP_RUNS = 5
+
+# Terms that look like the real docs; the rest of the vocabulary is synthetic
+DOMAIN_TERMS = [
+    "fastmcp", "server", "client", "tool", "tools", "resource", "resources",
+    "prompt", "prompts", "context", "transport", "http", "stdio", "async",
+    "await", "python", "decorator", "schema", "json", "auth", "token",
+    "middleware", "proxy", "mount", "session", "logging", "progress",
+    "sampling", "elicitation", "testing", "demo", "deployment", "settings",
+]
+SYLLABLES = ["ka", "lo", "mi", "ren", "to", "sha", "vel", "dor", "pi", "qua",
+             "ser", "tin", "bro", "gal", "fe", "nu", "zor", "yel", "cra", "mos"]
+
+
+@functools.lru_cache(maxsize=None)
+def _vocabulary(size=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    words = list(DOMAIN_TERMS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES, size=rng.integers(2, 5)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return np.array(words, dtype=object)
+
+
+def _zipf_cdf(size, exponent=1.1):
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    return np.cumsum(weights) / weights.sum()
+
+
+def _sample_words(rng, vocabulary, cdf, count):
+    ids = np.minimum(np.searchsorted(cdf, rng.random(count)), len(vocabulary) - 1)
+    return vocabulary[ids]
+
+
+def _make_page(rng, vocabulary, cdf, title):
+    lines = [f"# {title}", ""]
+    for _ in range(rng.integers(2, 7)):
+        heading = " ".join(_sample_words(rng, vocabulary, cdf, rng.integers(1, 4)))
+        lines += [f"## {heading.capitalize()}", ""]
+        for _ in range(rng.integers(1, 4)):
+            words = _sample_words(rng, vocabulary, cdf, int(rng.lognormal(3.8, 0.6)) + 5)
+            lines += [" ".join(words).capitalize() + ".", ""]
+        if rng.random() < 0.3:
+            names = _sample_words(rng, vocabulary, cdf, 3)
+            lines += ["```python", f"from fastmcp import {names[0].capitalize()}",
+                      f"{names[1]} = {names[0].capitalize()}(\"{names[2]}\")", "```", ""]
+    return "\n".join(lines)
+
+
+def make_corpus(zip_path, num_docs, seed=0, base_dir="fastmcp-main"):
+    """
+    Write a synthetic markdown archive laid out like ``fastmcp-main.zip``.
+
+    Args:
+        zip_path: Where to write the zip.
+        num_docs: Number of markdown files (about 1 in 20 is a README.md).
+        seed: Random seed; the same seed always gives the same archive.
+        base_dir: Top-level directory inside the zip.
+
+    Returns:
+        ``zip_path``.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = _vocabulary()
+    cdf = _zipf_cdf(len(vocabulary))
+    sections = ["servers", "clients", "integrations", "patterns", "deployment", "python-sdk"]
+
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i in range(num_docs):
+            if i % 20 == 0:
+                name = f"examples/example_{i}/README.md"
+            else:
+                name = f"docs/{sections[i % len(sections)]}/page-{i}.mdx"
+            title = " ".join(_sample_words(rng, vocabulary, cdf, 3)).title()
+            zf.writestr(f"{base_dir}/{name}", _make_page(rng, vocabulary, cdf, title))
+
+    return zip_path
+
+
+def make_queries(count=NUM_QUERIES, seed=1):
+    """Return ``count`` one- to three-word queries drawn like the corpus text."""
+    rng = np.random.default_rng(seed)
+    vocabulary = _vocabulary()
+    cdf = _zipf_cdf(len(vocabulary), exponent=0.8)
+    return [" ".join(_sample_words(rng, vocabulary, cdf, rng.integers(1, 4))) for _ in range(count)]
+
+
+def make_typos(queries, seed=2):
+    """Swap two adjacent letters of the longest word of every query."""
+    rng = np.random.default_rng(seed)
+    misspelled = []
+    for query in queries:
+        words = query.split()
+        longest = max(range(len(words)), key=lambda i: len(words[i]))
+        word = words[longest]
+        if len(word) >= 4:
+            i = int(rng.integers(1, len(word) - 2))
+            words[longest] = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        misspelled.append(" ".join(words))
+    return misspelled
+
+
+def latency_summary(seconds):
+    """Return p50/p95/p99/mean latency in milliseconds."""
+    ms = np.asarray(seconds) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(ms.mean()), 4),
+    }
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def run_size(num_docs, queries, seed=0):
+    """Benchmark one corpus size in the current process and return its results."""
+    import search
+    import server
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = make_corpus(os.path.join(tmp, "fastmcp-main.zip"), num_docs, seed)
+        result = {'docs': num_docs, 'zip_bytes': os.path.getsize(zip_path)}
+
+        # search.py: document-level index
+        start = time.perf_counter()
+        documents = search.extract_and_index_files(zip_path)
+        result['extract_s'] = round(time.perf_counter() - start, 4)
+
+        start = time.perf_counter()
+        search._index, search._documents = search.build_index(documents), documents
+        result['build_s'] = round(time.perf_counter() - start, 4)
+
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            search.search(query, top_k=5)
+            timings.append(time.perf_counter() - start)
+        result['search'] = latency_summary(timings)
+
+        # server.py: section index, built through the regular start-up path
+        server._download_fastmcp_zip = lambda: zip_path
+        server._search_cache.max_entries = 0
+        server._rankings.max_entries = 0
+        start = time.perf_counter()
+        _, chunks = server._initialize_fastmcp_index()
+        result['server_build_s'] = round(time.perf_counter() - start, 4)
+        result['server_phases'] = dict(server._fastmcp_index_status['phases'])
+        result['server_chunks'] = len(chunks)
+
+        start = time.perf_counter()
+        server._derived_index("dense", server.FASTMCP_CORPUS, server._fastmcp_index)
+        result['dense_build_s'] = round(time.perf_counter() - start, 4)
+
+        async def time_tool(mode, queries=queries, **options):
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                await server.search_fastmcp_docs.fn(query, 5, mode=mode, **options)
+                timings.append(time.perf_counter() - start)
+            return timings
+
+        result['search_fastmcp_docs'] = latency_summary(asyncio.run(time_tool("sparse")))
+        for mode in ["dense", "hybrid"]:
+            result[f'search_fastmcp_docs_{mode}'] = latency_summary(asyncio.run(time_tool(mode)))
+        result['search_fastmcp_docs_fuzzy'] = latency_summary(
+            asyncio.run(time_tool("fuzzy", make_typos(queries)))
+        )
+        result['search_fastmcp_docs_scoped'] = latency_summary(
+            asyncio.run(time_tool("sparse", paths=["docs/servers/"]))
+        )
+
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def run_in_worker(num_docs, seed=0):
+    """Run ``run_size`` in a fresh interpreter so peak RSS covers one size only."""
+    env = dict(os.environ, JINA_PAGE_CACHE_DIR="", FASTMCP_INDEX_WARMUP="0")
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", str(num_docs), "--seed", str(seed)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(current, baseline, tolerance):
+    """
+    Compare two benchmark reports.
+
+    Returns:
+        A list of regression messages for the corpus sizes present in both,
+        covering build times and p95 latencies that grew beyond ``tolerance``.
+    """
+    previous = {run['docs']: run for run in baseline['results']}
+    regressions = []
+    for run in current['results']:
+        old = previous.get(run['docs'])
+        if old is None:
+            continue
+        # (name, new, old, noise floor): tiny absolute changes are not regressions
+        metrics = [
+            ('build_s', run['build_s'], old['build_s'], 0.05),
+            ('server_build_s', run['server_build_s'], old['server_build_s'], 0.05),
+            ('search.p95_ms', run['search']['p95_ms'], old['search']['p95_ms'], 0.2),
+            ('search_fastmcp_docs.p95_ms', run['search_fastmcp_docs']['p95_ms'],
+             old['search_fastmcp_docs']['p95_ms'], 0.2),
+        ]
+        # Reports written before the dense mode existed lack these
+        for mode in ["dense", "hybrid", "fuzzy", "scoped"]:
+            name = f'search_fastmcp_docs_{mode}'
+            if name in run and name in old:
+                metrics.append((f'{name}.p95_ms', run[name]['p95_ms'], old[name]['p95_ms'], 0.2))
+        for name, new_value, old_value, floor in metrics:
+            if old_value and new_value > old_value * tolerance and new_value - old_value > floor:
+                regressions.append(
+                    f"{run['docs']} docs: {name} {old_value} -> {new_value} "
+                    f"({new_value / old_value:.2f}x)"
+                )
+    return regressions
+
+
+def _run_python(args, **options):
+    return subprocess.run(
+        [sys.executable, *args], cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True, **options,
+    )
+
+
+def import_profile(module):
+    """
+    Import ``module`` in a fresh interpreter under ``-X importtime``.
+
+    Returns:
+        A dict with the cumulative 'import_s' of the module, its five
+        'slowest' top-level imports (seconds) and the 'heavy' HEAVY_MODULES
+        it imported.
+    """
+    stderr = _run_python(["-X", "importtime", "-c", f"import {module}"]).stderr
+    cumulative = {}
+    for line in stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        # Only the first import of a package is timed; later ones are cached
+        cumulative.setdefault(fields[2].strip(), int(fields[1]) / 1e6)
+    packages = {name: seconds for name, seconds in cumulative.items() if "." not in name and name != module}
+    slowest = sorted(packages.items(), key=lambda item: -item[1])[:5]
+    return {
+        'import_s': round(cumulative[module], 4),
+        'slowest': {name: round(seconds, 4) for name, seconds in slowest},
+        'heavy': [name for name in HEAVY_MODULES if name in cumulative],
+    }
+
+
+def time_first_response(module, tool, arguments, timeout=60):
+    """
+    Launch ``module`` as a stdio MCP server and time its first answers.
+
+    Returns:
+        Seconds from launch to the answer to ``initialize`` ('ready_s') and
+        to a first ``tool`` call ('first_tool_s').
+    """
+    env = dict(
+        os.environ, JINA_READER_URL="http://127.0.0.1:9/", JINA_PAGE_CACHE_DIR="",
+        FASTMCP_INDEX_WARMUP="0", FASTMCP_ARCHIVE_REFRESH="0",
+    )
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, f"{module}.py"], cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+
+    def call(message):
+        process.stdin.write(json.dumps(dict(message, jsonrpc="2.0")) + "\n")
+        process.stdin.flush()
+        if 'id' not in message:
+            return None
+        # Skip notifications (logs, progress) until the answer arrives
+        for line in process.stdout:
+            answer = json.loads(line)
+            if answer.get('id') == message['id']:
+                if 'error' in answer:
+                    raise RuntimeError(f"{module}: {answer['error']}")
+                return time.perf_counter() - start
+        raise RuntimeError(f"{module} exited before answering {message['method']}")
+
+    watchdog = threading.Timer(timeout, process.kill)
+    watchdog.start()
+    try:
+        ready = call({'id': 1, 'method': "initialize", 'params': {
+            'protocolVersion': "2025-06-18", 'capabilities': {},
+            'clientInfo': {'name': "benchmark", 'version': "1.0"},
+        }})
+        call({'method': "notifications/initialized"})
+        first_tool = call({'id': 2, 'method': "tools/call", 'params': {'name': tool, 'arguments': arguments}})
+    finally:
+        watchdog.cancel()
+        process.kill()
+        process.wait()
+    return {'ready_s': round(ready, 4), 'first_tool_s': round(first_tool, 4)}
+
+
+def run_startup(runs=STARTUP_RUNS):
+    """Median import and first-response times of every STARTUP_TARGETS server."""
+    results = {}
+    for module, tool, arguments in STARTUP_TARGETS:
+        profiles = [import_profile(module) for _ in range(runs)]
+        responses = [time_first_response(module, tool, arguments) for _ in range(runs)]
+        result = dict(profiles[-1], import_s=float(np.median([p['import_s'] for p in profiles])))
+        for name in ['ready_s', 'first_tool_s']:
+            result[name] = float(np.median([response[name] for response in responses]))
+        results[module] = result
+    return results
+
+
+def check_startup(results, tolerance, baseline='basic_server', target='server'):
+    """
+    Compare the start-up of ``target`` with the bare FastMCP ``baseline``.
+
+    Returns:
+        A list of messages for the times beyond ``tolerance`` times the
+        baseline (and 50 ms over it) and for heavy imports at start-up.
+    """
+    problems = []
+    for name in ['import_s', 'ready_s', 'first_tool_s']:
+        base, value = results[baseline][name], results[target][name]
+        if value > base * tolerance and value - base > 0.05:
+            problems.append(f"{target}: {name} {value}s vs {base}s in {baseline} ({value / base:.2f}x)")
+    if results[target]['heavy']:
+        problems.append(f"{target}: imports {', '.join(results[target]['heavy'])} at start-up")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated corpus sizes (documents)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="where to write the results (default: "
+                        "benchmark_results.json, or startup_results.json with --startup)")
+    parser.add_argument("--compare", help="earlier results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="allowed slowdown factor before --compare fails")
+    parser.add_argument("--startup", action="store_true",
+                        help="time server start-up against basic_server.py instead")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    output = args.output or ("startup_results.json" if args.startup else "benchmark_results.json")
+
+    # Read the baseline before anything is written: it must not be this run
+    baseline = None
+    if args.compare and args.worker is None:
+        if os.path.abspath(args.compare) == os.path.abspath(output):
+            parser.error(f"--output {output} would overwrite the --compare baseline; "
+                         "write the new results to another file")
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    if args.startup:
+        results = run_startup()
+        for module, run in results.items():
+            print(f"{module:>13}: import {run['import_s']:.3f}s, ready {run['ready_s']:.3f}s, "
+                  f"first tool response {run['first_tool_s']:.3f}s, "
+                  f"heavy imports: {', '.join(run['heavy']) or 'none'}")
+        with open(output, 'w') as f:
+            json.dump({
+                'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'startup': results,
+            }, f, indent=2)
+        print(f"✓ Results written to {output}")
+        problems = check_startup(results, args.tolerance)
+        for message in problems:
+            print(f"✗ Slow start-up: {message}")
+        if problems:
+            sys.exit(1)
+        print("✓ Start-up within the FastMCP baseline")
+        return
+
+    if args.worker is not None:
+        print(json.dumps(run_size(args.worker, make_queries(), args.seed)))
+        return
+
+    report = {
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'engine': os.environ.get("FASTMCP_SEARCH_ENGINE", "bm25"),
+        'queries': NUM_QUERIES,
+        'results': [],
+    }
+    for size in (int(size) for size in args.sizes.split(",")):
+        run = run_in_worker(size, args.seed)
+        report['results'].append(run)
+        print(f"{size:>7} docs: extract {run['extract_s']:.2f}s, build {run['build_s']:.2f}s, "
+              f"server build {run['server_build_s']:.2f}s, "
+              f"search p95 {run['search']['p95_ms']:.2f}ms, "
+              f"search_fastmcp_docs p95 {run['search_fastmcp_docs']['p95_ms']:.2f}ms "
+              f"(dense {run['search_fastmcp_docs_dense']['p95_ms']:.2f}ms, "
+              f"hybrid {run['search_fastmcp_docs_hybrid']['p95_ms']:.2f}ms, "
+              f"fuzzy {run['search_fastmcp_docs_fuzzy']['p95_ms']:.2f}ms, "
+              f"scoped {run['search_fastmcp_docs_scoped']['p95_ms']:.2f}ms), "
+              f"peak RSS {run['peak_rss_mb']}MB")
+
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results written to {output}")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        for message in regressions:
+            print(f"✗ Regression: {message}")
+        if regressions:
+            sys.exit(1)
+        print("✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,590 @@
+"""
+Native BM25 search engine for the FastMCP documentation.
+
+``BM25Index`` is a drop-in replacement for ``minsearch.Index``: it takes the
+same ``text_fields`` / ``keyword_fields`` arguments and exposes the same
+``fit`` and ``search`` methods. Instead of scoring every document with a
+cosine similarity, it keeps one posting list per term and field with
+precomputed BM25 impacts, and only visits the postings of the query terms.
+
+Top-k retrieval uses MaxScore pruning: posting lists are processed from the
+highest to the lowest upper bound, and once the remaining lists can no longer
+lift an unseen document above the current k-th score they are only used to
+rescore the candidates already collected.
+
+For its ``position_fields`` the index also keeps where every term occurs in
+every document (term id and character span of each token, in text order),
+so snippets and highlights can be cut out of a hit without tokenizing it
+again (see ``snippets``).
+"""
+
+import re
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from doc_store import field_values, update_documents
+
+TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+# Restricted searches look the allowed documents up in a posting list by
+# binary search when the list is this many times longer than them
+RESTRICT_BY_SEARCH = 16
+
+
+def tokenize(text):
+    """Split text into lowercase terms, using the same pattern as minsearch."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _top_k(doc_ids, scores, k):
+    """The ``k`` best ``(doc_ids, scores)``: highest score first, ties by document id."""
+    if len(scores) > k:
+        kth = np.partition(scores, -k)[-k]
+        keep = scores >= kth
+        doc_ids, scores = doc_ids[keep], scores[keep]
+    order = np.lexsort((doc_ids, -scores))[:k]
+    return doc_ids[order], scores[order]
+
+
+def _idf(num_docs, df):
+    return np.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+
+
+def collection_stats(indexes, queries):
+    """
+    Document counts and query term document frequencies summed over indexes.
+
+    Passing the result to ``search_ids(..., stats=...)`` of every index scores
+    all of them with the IDF of their union, so the scores of separately
+    built shards can be merged into one ranking.
+
+    Args:
+        indexes (list of BM25Index): The shards to be searched together.
+        queries (list of str): The queries whose terms are needed.
+
+    Returns:
+        dict: Per text field, a ``(num_docs, {term: df})`` tuple.
+    """
+    terms = {term for query in queries for term in tokenize(query)}
+    stats = {}
+    for index in indexes:
+        for field in index.text_fields:
+            if field not in index.postings:
+                continue
+            num_docs, dfs = stats.get(field, (0, Counter()))
+            indptr = index.postings[field][0]
+            for term in terms:
+                term_id = index.vocabulary.get(term)
+                if term_id is not None:
+                    dfs[term] += int(indptr[term_id + 1] - indptr[term_id])
+            stats[field] = (num_docs + len(index.doc_lengths[field]), dfs)
+    return stats
+
+
+class BM25Index:
+    """
+    An inverted index with BM25 ranking and exact matching for keyword fields.
+
+    Attributes:
+        text_fields (list): List of text field names to index.
+        keyword_fields (list): List of keyword field names to index.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 document length normalization.
+        vocabulary (dict): Term to term id, shared by all text fields.
+        postings (dict): Per text field, a ``(indptr, doc_ids, impacts)`` tuple
+            in CSC layout: the postings of term ``t`` are
+            ``doc_ids[indptr[t]:indptr[t + 1]]``, sorted by document id.
+        max_impacts (dict): Per text field, the largest impact of every term.
+        term_freqs (dict): Per text field, the term frequency of every posting,
+            kept so impacts can be recomputed after ``update``.
+        doc_lengths (dict): Per text field, the number of terms of every document.
+        position_fields (list): Text fields whose term positions are kept.
+        positions (dict): Per position field, a ``(indptr, term_ids, starts,
+            lengths)`` tuple: the tokens of document ``d`` are entries
+            ``indptr[d]:indptr[d + 1]``, in text order, with the character
+            offset and length of each in the document text.
+        keyword_index (dict): Per keyword field, value to sorted document ids.
+        docs (list): List of documents indexed.
+    """
+
+    def __init__(self, text_fields, keyword_fields=None, k1=1.2, b=0.75, position_fields=None):
+        self.text_fields = text_fields
+        self.keyword_fields = keyword_fields if keyword_fields is not None else []
+        self.k1 = k1
+        self.b = b
+        self.position_fields = position_fields if position_fields is not None else []
+        self.vocabulary = {}
+        self.postings = {}
+        self.max_impacts = {}
+        self.term_freqs = {}
+        self.doc_lengths = {}
+        self.positions = {}
+        self.keyword_index = {}
+        self.docs = []
+        self._stacked_impacts = None
+
+    def fit(self, docs):
+        """
+        Builds the posting lists for the provided documents.
+
+        Args:
+            docs (list of dict): List of documents to index. Each document is a dictionary.
+        """
+        self.docs = docs
+        self.vocabulary = {}
+        self._stacked_impacts = None
+
+        field_counts, self.positions = self._count_terms(docs)
+        for field in self.text_fields:
+            term_ids, doc_ids, tfs, lengths = self._count_arrays(field_counts[field], 0)
+            self._set_postings(field, term_ids, doc_ids, tfs, lengths)
+
+        self.build_keyword_index()
+
+        return self
+
+    def update(self, added_docs=(), removed_ids=()):
+        """
+        Removes and adds documents without re-tokenizing the unchanged ones.
+
+        Kept documents are renumbered in their original order and the new
+        documents are appended after them. Only the new documents are
+        tokenized, and a compressed document store stays compressed: the
+        kept contents are carried over without being decompressed (see
+        ``doc_store.update_documents``). The BM25 impacts of the whole index
+        are then recomputed from the stored term frequencies, since IDF and
+        the average length depend on every document.
+
+        Every container is replaced rather than modified, so a shallow copy
+        taken before the update (``copy.copy(index)``) keeps serving the old
+        documents while this one is being updated.
+
+        Args:
+            added_docs (list of dict): Documents to add.
+            removed_ids (iterable of int): Ids of the documents to remove.
+        """
+        self.vocabulary = self.vocabulary.copy()
+        self.postings, self.max_impacts = dict(self.postings), dict(self.max_impacts)
+        self.term_freqs, self.doc_lengths = dict(self.term_freqs), dict(self.doc_lengths)
+        self.positions = dict(self.positions)
+
+        added_docs = list(added_docs)
+        keep = np.ones(len(self.docs), dtype=bool)
+        keep[list(removed_ids)] = False
+        new_ids = (np.cumsum(keep) - 1).astype(np.int32)
+        num_kept = int(keep.sum())
+
+        self.docs = update_documents(self.docs, keep, added_docs)
+        self._stacked_impacts = None
+
+        field_counts, added_positions = self._count_terms(added_docs)
+        for field, added in added_positions.items():
+            self.positions[field] = self._merge_positions(self.positions.get(field), keep, added)
+        for field in self.text_fields:
+            indptr, doc_ids, _ = self.postings[field]
+            term_ids = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+            kept = keep[doc_ids]
+
+            added = self._count_arrays(field_counts[field], num_kept)
+            self._set_postings(
+                field,
+                np.concatenate([term_ids[kept], added[0]]),
+                np.concatenate([new_ids[doc_ids[kept]], added[1]]),
+                np.concatenate([self.term_freqs[field][kept], added[2]]),
+                np.concatenate([self.doc_lengths[field][keep], added[3]]),
+            )
+
+        self.build_keyword_index()
+
+        return self
+
+    def build_keyword_index(self):
+        """(Re)build the value to document ids lookup of every keyword field."""
+        self.keyword_index = {}
+        for field in self.keyword_fields:
+            values = {}
+            for doc_id, value in enumerate(field_values(self.docs, field)):
+                values.setdefault(value, []).append(doc_id)
+            self.keyword_index[field] = {
+                value: np.array(ids, dtype=np.int32) for value, ids in values.items()
+            }
+
+    def _term_ids(self, terms):
+        vocabulary = self.vocabulary
+        return [vocabulary.setdefault(term, len(vocabulary)) for term in terms]
+
+    def _count_terms(self, docs):
+        """
+        Per text field, one term id Counter per document (extends the vocabulary).
+
+        Returns:
+            tuple: The Counters by field, and the ``positions`` arrays of the
+            documents for every position field.
+        """
+        field_counts = {}
+        positions = {}
+        for field in self.text_fields:
+            if field in self.position_fields:
+                field_counts[field], positions[field] = self._count_positions(docs, field)
+            else:
+                field_counts[field] = [
+                    Counter(self._term_ids(tokenize(doc.get(field, '') or ''))) for doc in docs
+                ]
+        return field_counts, positions
+
+    def _count_positions(self, docs, field):
+        """Like ``_count_terms`` for one field, also recording where every token is."""
+        counts = []
+        term_ids, starts, ends = [], [], []
+        indptr = np.zeros(len(docs) + 1, dtype=np.int64)
+        for i, doc in enumerate(docs):
+            # Same tokens as tokenize(); lowercasing keeps offsets for all but
+            # a handful of characters, whose highlights may then be off a bit
+            matches = list(TOKEN_PATTERN.finditer((doc.get(field, '') or '').lower()))
+            ids = self._term_ids([match.group() for match in matches])
+            counts.append(Counter(ids))
+            term_ids += ids
+            starts += [match.start() for match in matches]
+            ends += [match.end() for match in matches]
+            indptr[i + 1] = indptr[i] + len(ids)
+        starts = np.array(starts, dtype=np.int32)
+        lengths = np.minimum(np.array(ends, dtype=np.int64) - starts, np.iinfo(np.uint16).max)
+        return counts, (indptr, np.array(term_ids, dtype=np.int32), starts, lengths.astype(np.uint16))
+
+    @staticmethod
+    def _merge_positions(positions, keep, added):
+        """The positions of the kept documents followed by those of the added ones."""
+        if positions is None:
+            return added
+        indptr, term_ids, starts, lengths = positions
+        sizes = np.diff(indptr)
+        kept = np.repeat(keep, sizes)
+        merged_indptr = np.zeros(int(keep.sum()) + len(added[0]), dtype=np.int64)
+        np.cumsum(np.concatenate([sizes[keep], np.diff(added[0])]), out=merged_indptr[1:])
+        return (
+            merged_indptr,
+            np.concatenate([term_ids[kept], added[1]]),
+            np.concatenate([starts[kept], added[2]]),
+            np.concatenate([lengths[kept], added[3]]),
+        )
+
+    @staticmethod
+    def _count_arrays(counts, first_doc_id):
+        """Flatten per-document Counters into ``(term_ids, doc_ids, tfs, lengths)`` arrays."""
+        term_ids = np.fromiter(
+            (t for c in counts for t in c), dtype=np.int64,
+            count=sum(len(c) for c in counts)
+        )
+        tfs = np.fromiter(
+            (tf for c in counts for tf in c.values()), dtype=np.float32,
+            count=len(term_ids)
+        )
+        doc_ids = np.repeat(
+            np.arange(first_doc_id, first_doc_id + len(counts), dtype=np.int32),
+            [len(c) for c in counts]
+        )
+        lengths = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        return term_ids, doc_ids, tfs, lengths
+
+    def _set_postings(self, field, term_ids, doc_ids, tfs, lengths):
+        """Store the CSC postings of a field and compute their BM25 impacts."""
+        # Sort by term, then document, to get one contiguous posting list per term
+        order = np.lexsort((doc_ids, term_ids))
+        term_ids, doc_ids, tfs = term_ids[order], doc_ids[order], tfs[order]
+
+        num_terms = len(self.vocabulary)
+        df = np.bincount(term_ids, minlength=num_terms)
+        indptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+
+        self.postings[field] = (indptr, doc_ids, None)
+        self.term_freqs[field] = tfs
+        self.doc_lengths[field] = lengths
+        self._compute_impacts(field)
+
+    def _compute_impacts(self, field):
+        """Derive BM25 impacts and per-term maxima from term frequencies and lengths."""
+        indptr, doc_ids, _ = self.postings[field]
+        tfs = self.term_freqs[field].astype(np.float64)
+        lengths = self.doc_lengths[field].astype(np.float64)
+
+        num_docs = len(lengths)
+        num_terms = len(indptr) - 1
+        avg_length = lengths.mean() if num_docs and lengths.sum() else 1.0
+        term_ids = np.repeat(np.arange(num_terms), np.diff(indptr))
+
+        idf = _idf(num_docs, np.diff(indptr))
+        norm = self.k1 * (1 - self.b + self.b * lengths[doc_ids] / avg_length)
+        impacts = (idf[term_ids] * tfs * (self.k1 + 1) / (tfs + norm)).astype(np.float32)
+
+        max_impacts = np.zeros(num_terms, dtype=np.float32)
+        np.maximum.at(max_impacts, term_ids, impacts)
+
+        self.postings[field] = (indptr, doc_ids, impacts)
+        self.max_impacts[field] = max_impacts
+
+    def _posting_lists(self, query, boost_dict, stats=None, expansions=None):
+        """Collect ``(upper_bound, doc_ids, impacts)`` for every query term and field."""
+        lists = []
+        query_terms = Counter(tokenize(query))
+        for term, weight in (expansions or {}).items():
+            query_terms[term] += weight
+
+        for field in self.text_fields:
+            boost = boost_dict.get(field, 1)
+            if boost <= 0 or field not in self.postings:
+                continue
+            indptr, doc_ids, impacts = self.postings[field]
+            max_impacts = self.max_impacts[field]
+
+            for term, qtf in query_terms.items():
+                term_id = self.vocabulary.get(term)
+                if term_id is None:
+                    continue
+                start, end = indptr[term_id], indptr[term_id + 1]
+                if start == end:
+                    continue
+                weight = boost * qtf
+                if stats is not None and field in stats:
+                    # Swap the IDF baked into the impacts for the collection one
+                    num_docs, dfs = stats[field]
+                    local_idf = _idf(len(self.doc_lengths[field]), end - start)
+                    weight *= _idf(num_docs, dfs.get(term, end - start)) / local_idf
+                lists.append((
+                    float(max_impacts[term_id]) * weight,
+                    doc_ids[start:end],
+                    impacts[start:end] * weight,
+                ))
+
+        lists.sort(key=lambda item: -item[0])
+        return lists
+
+    def term_weights(self, query, field):
+        """
+        The IDF in ``field`` of every query term that occurs in it.
+
+        Returns:
+            dict: Term id to IDF.
+        """
+        indptr = self.postings[field][0]
+        num_docs = len(self.doc_lengths[field])
+        weights = {}
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is not None and indptr[term_id + 1] > indptr[term_id]:
+                weights[term_id] = float(_idf(num_docs, indptr[term_id + 1] - indptr[term_id]))
+        return weights
+
+    def _allowed_docs(self, filter_dict):
+        """Sorted document ids that satisfy every keyword filter, or None if unfiltered."""
+        allowed = None
+        for field, value in filter_dict.items():
+            if field not in self.keyword_fields:
+                continue
+            ids = self.keyword_index[field].get(value, np.empty(0, dtype=np.int32))
+            allowed = ids if allowed is None else np.intersect1d(allowed, ids, assume_unique=True)
+        return allowed
+
+    def search_ids(self, query, filter_dict=None, boost_dict=None, num_results=10, stats=None,
+                   expansions=None, allowed_ids=None):
+        """
+        Ranks documents for a query and returns their ids and scores.
+
+        Args:
+            query (str): The search query string.
+            filter_dict (dict): Keyword fields to filter by (exact match).
+            boost_dict (dict): Boost scores for text fields.
+            num_results (int): The number of top results to return.
+            stats (dict): Optional ``collection_stats`` of a set of shards
+                this index belongs to, to score with their common IDF.
+            expansions (dict): Extra terms scored with the query, mapped to
+                their weight (a query term counts 1), e.g. the spelling
+                candidates of ``fuzzy.TrigramIndex.expand``.
+            allowed_ids (np.ndarray): Optional sorted document ids the
+                results are restricted to, e.g. the matches of a phrase.
+
+        Returns:
+            tuple: ``(doc_ids, scores)`` arrays, best match first.
+        """
+        filter_dict = filter_dict or {}
+        boost_dict = boost_dict or {}
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+
+        if not self.docs or num_results <= 0:
+            return empty
+
+        lists = self._posting_lists(query, boost_dict, stats, expansions)
+        allowed = self._allowed_docs(filter_dict)
+        if allowed_ids is not None:
+            allowed = allowed_ids if allowed is None else np.intersect1d(allowed, allowed_ids)
+
+        if allowed is not None:
+            restricted = []
+            bitmap = None
+            for _, doc_ids, impacts in lists:
+                if len(allowed) * RESTRICT_BY_SEARCH < len(doc_ids):
+                    # A small candidate set (a subtree): look its documents
+                    # up in the posting list instead of scanning the list
+                    pos = np.searchsorted(doc_ids, allowed)
+                    pos = pos[pos < len(doc_ids)]
+                    keep = pos[doc_ids[pos] == allowed[:len(pos)]]
+                else:
+                    if bitmap is None:
+                        bitmap = np.zeros(len(self.docs), dtype=bool)
+                        bitmap[allowed] = True
+                    keep = np.flatnonzero(bitmap[doc_ids])
+                if len(keep):
+                    # The bound of what is left is tighter than the term's
+                    restricted.append((float(impacts[keep].max()), doc_ids[keep], impacts[keep]))
+            restricted.sort(key=lambda item: -item[0])
+            lists = restricted
+
+        if not lists:
+            return empty
+
+        # remaining[i] is the best score a document can still gain from lists i..end
+        upper_bounds = np.array([item[0] for item in lists])
+        remaining = np.cumsum(upper_bounds[::-1])[::-1]
+
+        cand_docs = np.empty(0, dtype=np.int32)
+        cand_scores = np.empty(0, dtype=np.float32)
+        threshold = 0.0
+
+        for i, (_, doc_ids, impacts) in enumerate(lists):
+            if len(cand_docs) >= num_results and remaining[i] < threshold:
+                # No unseen document can reach the top k any more: drop hopeless
+                # candidates and only rescore the survivors with the rest
+                keep = cand_scores + remaining[i] >= threshold
+                cand_docs, cand_scores = cand_docs[keep], cand_scores[keep]
+                for _, rest_docs, rest_impacts in lists[i:]:
+                    pos = np.searchsorted(rest_docs, cand_docs)
+                    pos[pos == len(rest_docs)] = 0
+                    hit = rest_docs[pos] == cand_docs
+                    cand_scores[hit] += rest_impacts[pos[hit]]
+                break
+
+            merged_docs = np.concatenate([cand_docs, doc_ids])
+            merged_scores = np.concatenate([cand_scores, impacts])
+            cand_docs, inverse = np.unique(merged_docs, return_inverse=True)
+            cand_scores = np.bincount(inverse, weights=merged_scores).astype(np.float32)
+
+            if len(cand_docs) >= num_results:
+                threshold = np.partition(cand_scores, -num_results)[-num_results]
+
+        return _top_k(cand_docs, cand_scores, num_results)
+
+    def _query_matrix(self, queries):
+        """Sparse ``(len(queries), len(vocabulary))`` matrix of query term counts."""
+        rows, cols, counts = [], [], []
+        for row, query in enumerate(queries):
+            for term, qtf in Counter(tokenize(query)).items():
+                term_id = self.vocabulary.get(term)
+                if term_id is not None:
+                    rows.append(row)
+                    cols.append(term_id)
+                    counts.append(qtf)
+        return sparse.csr_matrix(
+            (counts, (rows, cols)), shape=(len(queries), len(self.vocabulary)), dtype=np.float64
+        )
+
+    def _impact_matrix(self):
+        """
+        All fields' posting lists stacked into one ``(fields * terms) x documents``
+        CSR matrix of BM25 impacts, built on first use.
+        """
+        if self._stacked_impacts is None:
+            blocks = []
+            for field in self.text_fields:
+                indptr, doc_ids, impacts = self.postings[field]
+                blocks.append(sparse.csr_matrix(
+                    (impacts, doc_ids, indptr), shape=(len(indptr) - 1, len(self.docs))
+                ))
+            self._stacked_impacts = sparse.vstack(blocks, format='csr')
+        return self._stacked_impacts
+
+    def search_ids_many(self, queries, filter_dict=None, boost_dict=None, num_results=10):
+        """
+        Ranks documents for several queries with a single sparse product.
+
+        The posting lists already form a ``terms x documents`` matrix of BM25
+        impacts, so multiplying the (boosted) query term matrix by it scores
+        every query at once.
+
+        Args:
+            queries (list of str): The search query strings.
+            filter_dict (dict): Keyword fields to filter by (exact match).
+            boost_dict (dict): Boost scores for text fields.
+            num_results (int): The number of top results to return per query.
+
+        Returns:
+            list of tuple: One ``(doc_ids, scores)`` pair per query, best match first.
+        """
+        filter_dict = filter_dict or {}
+        boost_dict = boost_dict or {}
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+
+        if not self.docs or num_results <= 0 or not queries:
+            return [empty for _ in queries]
+
+        query_matrix = self._query_matrix(queries)
+        boosted = sparse.hstack(
+            [query_matrix * boost_dict.get(field, 1) for field in self.text_fields],
+            format='csr'
+        )
+        scores = (boosted @ self._impact_matrix()).tocsr()
+        allowed = self._allowed_docs(filter_dict)
+
+        results = []
+        for row in range(len(queries)):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            row_docs = scores.indices[start:end]
+            row_scores = scores.data[start:end].astype(np.float32)
+            keep = row_scores > 0
+            if allowed is not None:
+                keep &= np.isin(row_docs, allowed, assume_unique=True)
+            results.append(_top_k(row_docs[keep].astype(np.int32), row_scores[keep], num_results))
+
+        return results
+
+    def search_many(self, queries, filter_dict=None, boost_dict=None, num_results=10, output_ids=False):
+        """
+        Searches the index with several queries at once.
+
+        Args:
+            queries (list of str): The search query strings.
+            filter_dict (dict): Keyword fields to filter by, applied to every query.
+            boost_dict (dict): Boost scores for text fields, applied to every query.
+            num_results (int): The number of top results to return per query.
+            output_ids (bool): If True, adds an '_id' field to each document.
+
+        Returns:
+            list of list of dict: The ranked documents of each query, in query order.
+        """
+        results = []
+        for doc_ids, _ in self.search_ids_many(queries, filter_dict, boost_dict, num_results):
+            if output_ids:
+                results.append([{**self.docs[i], '_id': int(i)} for i in doc_ids])
+            else:
+                results.append([self.docs[i] for i in doc_ids])
+        return results
+
+    def search(self, query, filter_dict=None, boost_dict=None, num_results=10, output_ids=False):
+        """
+        Searches the index with the given query, filters, and boost parameters.
+
+        Args:
+            query (str): The search query string.
+            filter_dict (dict): Dictionary of keyword fields to filter by. Keys are field names and values are the values to filter by.
+            boost_dict (dict): Dictionary of boost scores for text fields. Keys are field names and values are the boost scores.
+            num_results (int): The number of top results to return. Defaults to 10.
+            output_ids (bool): If True, adds an '_id' field to each document containing its index. Defaults to False.
+
+        Returns:
+            list of dict: List of documents matching the search criteria, ranked by relevance.
+        """
+        doc_ids, _ = self.search_ids(query, filter_dict, boost_dict, num_results)
+
+        if output_ids:
+            return [{**self.docs[i], '_id': int(i)} for i in doc_ids]
+        return [self.docs[i] for i in doc_ids]
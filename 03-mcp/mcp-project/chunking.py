@@ -0,0 +1,118 @@
+"""
+Section-level chunking of markdown documents.
+
+Files are split on markdown headings (ignoring ``#`` lines inside fenced code
+blocks), and sections that are still too long are cut into overlapping token
+windows. Every chunk remembers its parent ``filename``, the ``heading`` path
+that leads to it (e.g. ``"Context > Logging"``) and where it starts in the
+original file, so search results can point back to the source.
+"""
+
+import re
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+WORD_PATTERN = re.compile(r'\S+')
+
+# Defaults keep a chunk around 2-3 KB of markdown
+MAX_TOKENS = 300
+OVERLAP_TOKENS = 50
+SNIPPET_CHARS = 200
+
+
+def split_sections(content):
+    """
+    Split markdown into sections at headings.
+
+    Args:
+        content: The markdown text.
+
+    Returns:
+        A list of ``(heading_path, start, end)`` tuples, where ``heading_path``
+        is the list of enclosing headings and ``content[start:end]`` is the
+        section text (including its own heading line).
+    """
+    sections = []
+    stack = []  # (level, title) of the enclosing headings
+    current_path = []
+    start = 0
+    offset = 0
+    in_fence = False
+
+    for line in content.splitlines(keepends=True):
+        if FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = HEADING_PATTERN.match(line)
+            if match:
+                if offset > start:
+                    sections.append((current_path, start, offset))
+                level = len(match.group(1))
+                while stack and stack[-1][0] >= level:
+                    stack.pop()
+                stack.append((level, match.group(2)))
+                current_path = [title for _, title in stack]
+                start = offset
+        offset += len(line)
+
+    if offset > start:
+        sections.append((current_path, start, offset))
+
+    return sections
+
+
+def _windows(content, start, end, max_tokens, overlap):
+    """Yield ``(start, end)`` spans of at most ``max_tokens`` words with ``overlap`` shared words."""
+    words = [m.span() for m in WORD_PATTERN.finditer(content, start, end)]
+    if len(words) <= max_tokens:
+        yield start, end
+        return
+
+    step = max(1, max_tokens - overlap)
+    for first in range(0, len(words), step):
+        last = min(first + max_tokens, len(words)) - 1
+        yield words[first][0], words[last][1]
+        if last == len(words) - 1:
+            break
+
+
+def chunk_document(doc, max_tokens=MAX_TOKENS, overlap=OVERLAP_TOKENS):
+    """
+    Split one ``{'filename', 'content'}`` document into section chunks.
+
+    Args:
+        doc: The document to split.
+        max_tokens: Maximum number of whitespace-separated words per chunk.
+        overlap: Number of words shared by consecutive windows of a long section.
+
+    Returns:
+        A list of chunk dictionaries with 'filename', 'heading', 'content'
+        and 'start' (character offset of the chunk in the original file).
+    """
+    content = doc['content']
+    chunks = []
+
+    for heading_path, start, end in split_sections(content):
+        heading = " > ".join(heading_path)
+        for chunk_start, chunk_end in _windows(content, start, end, max_tokens, overlap):
+            raw = content[chunk_start:chunk_end]
+            text = raw.strip()
+            if not text:
+                continue
+            chunks.append({
+                'filename': doc['filename'],
+                'heading': heading,
+                'content': text,
+                'start': chunk_start + len(raw) - len(raw.lstrip()),
+            })
+
+    return chunks
+
+
+def chunk_documents(documents, max_tokens=MAX_TOKENS, overlap=OVERLAP_TOKENS):
+    """Split every document into section chunks, keeping document order."""
+    chunks = []
+    for doc in documents:
+        chunks.extend(chunk_document(doc, max_tokens, overlap))
+    return chunks
+
@@ -0,0 +1,366 @@
+"""
+Registry of documentation corpora searched as independent shards.
+
+Every corpus (a markdown zip laid out like ``fastmcp-main.zip``, the URL of
+such a zip, or a local directory) is chunked and indexed on its own and
+saved as a memory-mapped file next to its source (``mmap_store``), so
+registering a corpus never rebuilds the others and a restart maps the saved
+shards instead of rebuilding them. Shards that need building are built in
+parallel in a process pool.
+
+``search_shards`` fans a query out to several shards in worker threads and
+merges their top-k. Every shard is scored with the IDF of the union of the
+selected shards (``bm25.collection_stats``) rather than its own, so the
+scores of different shards can be compared; length normalization stays
+per shard.
+
+The indexing modules (numpy and scipy) are imported when a shard is first
+built, loaded or searched, so a registry costs nothing to set up.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from chunking import chunk_documents
+
+TEXT_FIELDS = ['content', 'heading', 'filename']
+KEYWORD_FIELDS = ['filename']
+
+
+def parse_corpora(spec):
+    """
+    Parse a ``name=source,name=source`` list (``FASTMCP_CORPORA``).
+
+    Returns:
+        A dict mapping corpus names to their sources, in the given order.
+    """
+    corpora = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, sep, source = item.partition('=')
+        if not sep or not name.strip() or not source.strip():
+            raise ValueError(f"Invalid corpus {item.strip()!r}: expected name=source")
+        corpora[name.strip()] = source.strip()
+    return corpora
+
+
+def is_url(source):
+    return source.startswith(('http://', 'https://'))
+
+
+def _is_markdown(name):
+    return name.endswith('.md') or name.endswith('.mdx')
+
+
+def _directory_files(directory):
+    """Relative paths of the markdown files under ``directory``, sorted."""
+    paths = []
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        paths += [os.path.join(root, name) for name in sorted(names) if _is_markdown(name)]
+    return [os.path.relpath(path, directory).replace(os.sep, '/') for path in paths]
+
+
+def read_markdown_files(source):
+    """
+    Read the .md and .mdx files of a zip or a directory.
+
+    Zip entries are named relative to the archive's top-level directory and
+    directory files relative to the directory, with '/' separators.
+
+    Returns:
+        A list of ``{'filename', 'content'}`` dicts.
+    """
+    if os.path.isdir(source):
+        files = []
+        for filename in _directory_files(source):
+            with open(os.path.join(source, filename), encoding='utf-8') as f:
+                files.append({'filename': filename, 'content': f.read()})
+        return files
+
+    with zipfile.ZipFile(source, 'r') as zf:
+        base_names = {name.split('/')[0] for name in zf.namelist()}
+        base_dir = list(base_names)[0] if base_names else ""
+        return [
+            {
+                'filename': info.filename.replace(f"{base_dir}/", "", 1),
+                'content': zf.read(info.filename).decode('utf-8'),
+            }
+            for info in zf.infolist()
+            if not info.filename.endswith('/') and _is_markdown(info.filename)
+        ]
+
+
+def source_digest(path):
+    """
+    Identify the content of a corpus: the SHA-256 of a zip, or for a
+    directory a hash of the name, size and mtime of its markdown files.
+    """
+    if not os.path.isdir(path):
+        from index_store import archive_hash
+        return archive_hash(path)
+    digest = hashlib.sha256()
+    for filename in _directory_files(path):
+        info = os.stat(os.path.join(path, filename))
+        digest.update(f"{filename}\0{info.st_size}\0{info.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_index(documents):
+    """Fit the BM25 index of one shard."""
+    from bm25 import BM25Index
+
+    return BM25Index(
+        text_fields=TEXT_FIELDS, keyword_fields=KEYWORD_FIELDS, position_fields=['content']
+    ).fit(documents)
+
+
+def build_shard(path, settings):
+    """
+    Bring the mapped index of the corpus at ``path`` up to date.
+
+    Runs in a pool worker. A current mapped file is left alone, a zip whose
+    previous index is still mapped is updated incrementally, anything else
+    is chunked and indexed from scratch.
+
+    Args:
+        path: Local zip or directory of the corpus.
+        settings: The ``chunk_documents`` settings.
+
+    Returns:
+        A ``(how, digest, shard)`` tuple: ``how`` is "mapped", "updated" or
+        "built", and ``shard`` is None when the index was saved, or the
+        ``(index, documents)`` (contents compressed) when it could not be
+        written next to the source.
+    """
+    from doc_store import compress_documents
+    from incremental import read_manifest, update_from_archive
+    from mmap_store import load_mapped, load_previous_mapped, save_mapped
+
+    digest = source_digest(path)
+    if load_mapped(path, digest, settings=settings) is not None:
+        return "mapped", digest, None
+
+    def make_documents(files):
+        return chunk_documents(files, **settings)
+
+    previous = None if os.path.isdir(path) else load_previous_mapped(path, settings=settings)
+    if previous is not None:
+        index, documents, manifest, _ = update_from_archive(
+            *previous, path, build_index=build_index, make_documents=make_documents
+        )
+        how = "updated"
+    else:
+        documents = make_documents(read_markdown_files(path))
+        if not documents:
+            raise ValueError(f"No markdown files in {path}")
+        index = build_index(documents)
+        manifest = None if os.path.isdir(path) else read_manifest(path)
+        how = "built"
+
+    try:
+        save_mapped(index, documents, path, digest, settings=settings, manifest=manifest)
+    except OSError:
+        return how, digest, compress_documents(index, documents)
+    return how, digest, None
+
+
+class CorpusRegistry:
+    """
+    Named corpora and their loaded shards.
+
+    Attributes:
+        settings (dict): Chunking settings shared by every shard.
+        directory (str): Where corpora given by URL are downloaded.
+        max_workers (int): Size of the process pool used for builds.
+    """
+
+    def __init__(self, settings, directory="corpora", max_workers=None, download=None):
+        """
+        Args:
+            settings: The ``chunk_documents`` settings.
+            directory: Where corpora given by URL are downloaded.
+            max_workers: Build processes (default: one per CPU).
+            download: ``download(url, path)`` callable used for URL sources.
+        """
+        self.settings = settings
+        self.directory = directory
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._download = download
+        self._sources = {}
+        self._shards = {}
+        self._status = {}
+        self._building = {}  # name -> Future of the build in flight
+        self._generations = {}  # name -> count of shard replacements
+        self._lock = threading.Lock()
+
+    @property
+    def names(self):
+        return list(self._sources)
+
+    def register(self, name, source):
+        """Add or replace a corpus; the shards of the others are kept."""
+        with self._lock:
+            self._sources[name] = source if is_url(source) else os.path.normpath(source)
+            self._shards.pop(name, None)
+            self._generations[name] = self._generations.get(name, 0) + 1
+            self._status[name] = {
+                'source': source, 'state': "idle", 'documents': 0, 'how': None, 'error': None
+            }
+
+    def local_path(self, name):
+        """The zip or directory the shard of ``name`` is built from."""
+        source = self._sources[name]
+        if is_url(source):
+            return os.path.join(self.directory, f"{name}.zip")
+        return source
+
+    def generation(self, name):
+        """A number that changes whenever the shard of ``name`` is replaced."""
+        return self._generations.get(name, 0)
+
+    def status(self):
+        """Per corpus: source, state, documents, how it was loaded and last error."""
+        return {name: dict(status) for name, status in self._status.items()}
+
+    def ensure(self, names=None):
+        """
+        Load or build the shards of ``names`` (default: every corpus).
+
+        Shards are built once and then kept; only the missing ones are
+        built, in parallel when there are several. Builds are single-flight
+        per corpus: a caller waits for the builds of its own corpora only,
+        joining one already in flight, and never for other corpora.
+
+        Returns:
+            A dict mapping each name to its ``(index, documents)`` shard.
+
+        Raises:
+            ValueError: For an unknown corpus.
+            RuntimeError: If a shard could not be built (the others are kept).
+        """
+        names = self.names if names is None else list(names)
+        unknown = [name for name in names if name not in self._sources]
+        if unknown:
+            raise ValueError(f"Unknown corpus: {', '.join(unknown)}")
+
+        with self._lock:
+            missing = [name for name in names if name not in self._shards]
+            joined = [self._building[name] for name in missing if name in self._building]
+            leading = [name for name in missing if name not in self._building]
+            for name in leading:
+                self._building[name] = Future()
+
+        if leading:
+            try:
+                self._load(leading)
+            finally:
+                with self._lock:
+                    for name in leading:
+                        self._building.pop(name).set_result(None)
+        for future in joined:
+            future.result()
+
+        with self._lock:
+            failed = [name for name in missing if name not in self._shards]
+            if failed:
+                raise RuntimeError("; ".join(
+                    f"Could not build corpus {name}: {self._status[name]['error']}"
+                    for name in failed
+                ))
+            return {name: self._shards[name] for name in names}
+
+    def _fetch(self, name):
+        path = self.local_path(name)
+        if is_url(self._sources[name]) and not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            self._download(self._sources[name], path)
+        return path
+
+    def _load(self, names):
+        from mmap_store import load_mapped
+
+        paths = {}
+        for name in names:
+            self._status[name].update(state="building", error=None)
+            try:
+                paths[name] = self._fetch(name)
+            except Exception as e:
+                self._status[name].update(state="failed", error=str(e))
+
+        outcomes = {}
+        if len(paths) > 1 and self.max_workers > 1:
+            # spawn, not fork: the server process runs threads of its own
+            context = multiprocessing.get_context("spawn")
+            workers = min(self.max_workers, len(paths))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = {
+                    name: pool.submit(build_shard, path, self.settings)
+                    for name, path in paths.items()
+                }
+                for name, future in futures.items():
+                    try:
+                        outcomes[name] = future.result()
+                    except Exception as e:
+                        self._status[name].update(state="failed", error=str(e))
+        else:
+            for name, path in paths.items():
+                try:
+                    outcomes[name] = build_shard(path, self.settings)
+                except Exception as e:
+                    self._status[name].update(state="failed", error=str(e))
+
+        for name, (how, digest, shard) in outcomes.items():
+            if shard is None:
+                shard = load_mapped(paths[name], digest, settings=self.settings)
+            if shard is None:
+                self._status[name].update(state="failed", error="Saved index could not be mapped")
+                continue
+            with self._lock:
+                self._shards[name] = shard
+                self._generations[name] += 1
+            self._status[name].update(state="ready", documents=len(shard[1]), how=how)
+
+
+async def search_shards(shards, query, num_results=10, filter_dict=None, expansions=None, allowed_ids=None):
+    """
+    Search several shards concurrently and merge their results.
+
+    Args:
+        shards: Ordered ``{name: (index, documents)}`` of ``BM25Index`` shards;
+            equal scores are ranked in this order.
+        query: The search query string.
+        num_results: The number of results to return.
+        filter_dict: Keyword fields to filter by, applied to every shard.
+        expansions: Extra weighted query terms (see ``BM25Index.search_ids``).
+        allowed_ids: Optional ``{name: sorted doc_ids}`` the results of each
+            shard are restricted to.
+
+    Returns:
+        A list of ``(name, doc_id, score)`` tuples, best match first; the
+        document is ``shards[name][1][doc_id]``.
+    """
+    from bm25 import collection_stats
+
+    stats = collection_stats([index for index, _ in shards.values()], [query, *(expansions or {})])
+    hits = await asyncio.gather(*(
+        asyncio.to_thread(
+            index.search_ids, query, filter_dict, None, num_results, stats, expansions,
+            None if allowed_ids is None else allowed_ids[name]
+        )
+        for name, (index, _) in shards.items()
+    ))
+
+    merged = [
+        (float(score), order, int(doc_id), name)
+        for order, (name, (doc_ids, scores)) in enumerate(zip(shards, hits))
+        for doc_id, score in zip(doc_ids, scores)
+    ]
+    merged.sort(key=lambda hit: (-hit[0], hit[1], hit[2]))
+    return [(name, doc_id, score) for score, _, doc_id, name in merged[:num_results]]
@@ -2,7 +2,8 @@
 """Script to count occurrences of 'data' on https://datatalks.club/ using the MCP tool"""
 
 import requests
-import re
+
+from term_counter import count_terms
 
 def get_jina_content(url: str) -> str:
     """Fetch content using r.jina.ai"""
@@ -17,10 +18,7 @@ def get_jina_content(url: str) -> str:
 
 def count_word(text: str, word: str) -> int:
     """Count occurrences of a word in text (case-insensitive)"""
-    # Use regex to find word boundaries
-    pattern = r'\b' + re.escape(word) + r'\b'
-    matches = re.findall(pattern, text, re.IGNORECASE)
-    return len(matches)
+    return count_terms(text, [word])[word]['count_word_boundaries']
 
 if __name__ == "__main__":
     url = "https://datatalks.club/"
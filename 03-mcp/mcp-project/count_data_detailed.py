@@ -2,7 +2,8 @@
 """Script to count occurrences of 'data' on https://datatalks.club/ - detailed analysis"""
 
 import requests
-import re
+
+from term_counter import count_terms
 
 def get_jina_content(url: str) -> str:
     """Fetch content using r.jina.ai"""
@@ -24,14 +25,10 @@ if __name__ == "__main__":
     if content:
         print(f"\nTotal characters: {len(content)}\n")
         
-        # Count with word boundaries (case-insensitive)
-        pattern = r'\bdata\b'
-        matches = re.findall(pattern, content, re.IGNORECASE)
-        print(f"Occurrences of 'data' (word boundaries, case-insensitive): {len(matches)}")
-        
-        # Count simple substring (case-insensitive)
-        count = content.lower().count("data")
-        print(f"Occurrences of 'data' (substring, case-insensitive): {count}")
+        # Word-boundary and substring counts (case-insensitive) in one pass
+        counts = count_terms(content, ["data"])["data"]
+        print(f"Occurrences of 'data' (word boundaries, case-insensitive): {counts['count_word_boundaries']}")
+        print(f"Occurrences of 'data' (substring, case-insensitive): {counts['count_substring']}")
         
         # Show first 2000 characters
         print(f"\nFirst 2000 characters of content:\n")
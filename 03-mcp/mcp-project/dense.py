@@ -0,0 +1,243 @@
+"""
+Dense retrieval with hashed embeddings and an IVF index, in NumPy only.
+
+The embeddings need no model, network or GPU. Every term of a fitted
+``BM25Index`` gets a vector made of two parts:
+
+- its character n-grams (``<ru``, ``run``, ``un>``, ...) hashed into ``dim``
+  signed buckets, so inflections and typos of a word end up close to it;
+- a random-indexing context vector: a random projection of the terms it
+  shares sections with, so terms used in the same contexts ("launch", "run"
+  and "start" next to "server") get similar vectors even when they never
+  appear together.
+
+A document or a query is the TF-IDF weighted sum of its term vectors,
+normalized. Document vectors come in batches of sparse x dense products
+straight from the BM25 term frequencies, without tokenizing again.
+
+Vectors live in an inverted-file (IVF) index: spherical k-means splits them
+into about ``sqrt(n)`` lists and each vector is quantized to int8 with its
+own scale. A query scores the centroids and then only the vectors of the
+``nprobe`` closest lists. A query restricted to some documents (path filters,
+phrases) scores exactly those vectors instead, wherever their lists are.
+
+``reciprocal_rank_fusion`` merges a dense ranking with a sparse one.
+"""
+
+import zlib
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from bm25 import _idf, tokenize
+
+DIM = 128
+NGRAM_SIZES = (3, 4, 5)
+# Weight of the context part of a term vector, next to its n-gram part
+CONTEXT_WEIGHT = 1.0
+NPROBE = 8
+KMEANS_ITERATIONS = 10
+BATCH_SIZE = 4096
+RRF_K = 60
+
+
+def _ngrams(term):
+    padded = f"<{term}>"
+    return [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)] or [padded]
+
+
+def ngram_vectors(terms, dim=DIM):
+    """Normalized hashed character n-gram vectors of ``terms``, one row each."""
+    rows, cols, signs = [], [], []
+    for row, term in enumerate(terms):
+        for gram in _ngrams(term):
+            h = zlib.crc32(gram.encode('utf-8'))
+            rows.append(row)
+            cols.append(h % dim)
+            signs.append(1.0 if h & 0x80000000 else -1.0)
+    vectors = sparse.csr_matrix(
+        (signs, (rows, cols)), shape=(len(terms), dim), dtype=np.float32
+    ).toarray()
+    return _normalize(vectors)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def _batched_product(matrix, dense):
+    """``matrix @ dense`` for a sparse ``matrix``, a batch of rows at a time."""
+    return np.vstack([
+        np.asarray(matrix[start:start + BATCH_SIZE] @ dense, dtype=np.float32)
+        for start in range(0, matrix.shape[0], BATCH_SIZE)
+    ] or [np.zeros((0, dense.shape[1]), dtype=np.float32)])
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Merge rankings with reciprocal rank fusion.
+
+    Args:
+        rankings: Lists of hashable items, best first.
+        k: The RRF constant; larger values flatten the rank weights.
+
+    Returns:
+        A list of ``(item, score)`` pairs, best first; ties keep the order in
+        which items were first seen.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda entry: -entry[1])
+
+
+class DenseIndex:
+    """
+    Hashed-embedding vectors of the documents of a ``BM25Index``, in an IVF index.
+
+    Attributes:
+        dim (int): Embedding size.
+        nprobe (int): Number of IVF lists scanned per query.
+        term_vectors (np.ndarray): One normalized vector per term id.
+        term_idf (np.ndarray): IDF of every term id in the embedded field.
+        centroids (np.ndarray): Normalized centroid of every IVF list.
+        list_indptr (np.ndarray): The vectors of list ``l`` are entries
+            ``list_indptr[l]:list_indptr[l + 1]`` of the arrays below.
+        doc_ids (np.ndarray): Document id of every stored vector.
+        doc_rows (np.ndarray): Inverse of ``doc_ids``: the entry of every
+            document id.
+        codes (np.ndarray): int8 vectors, ``codes[i] * scales[i]`` being the
+            embedding of ``doc_ids[i]``.
+        scales (np.ndarray): Quantization scale of every vector.
+    """
+
+    def __init__(self, dim=DIM, nprobe=NPROBE, seed=0):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.seed = seed
+        self.vocabulary = {}
+        self.term_vectors = np.zeros((0, dim), dtype=np.float32)
+        self.term_idf = np.zeros(0, dtype=np.float32)
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.list_indptr = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.empty(0, dtype=np.int32)
+        self.doc_rows = np.empty(0, dtype=np.int64)
+        self.codes = np.empty((0, dim), dtype=np.int8)
+        self.scales = np.empty(0, dtype=np.float32)
+
+    def fit(self, index, field='content'):
+        """
+        Embed every document of a fitted ``BM25Index`` and build the IVF lists.
+
+        Args:
+            index: The ``BM25Index``; its term frequencies in ``field`` are
+                the only input, so nothing is tokenized again.
+            field: The text field to embed.
+        """
+        rng = np.random.default_rng(self.seed)
+        self.vocabulary = index.vocabulary.copy()
+        indptr, doc_ids, _ = index.postings[field]
+        num_docs, num_terms = len(index.doc_lengths[field]), len(indptr) - 1
+
+        self.term_idf = _idf(num_docs, np.diff(indptr)).astype(np.float32)
+        # Documents x terms, with sublinear TF-IDF weights
+        tfs = index.term_freqs[field].astype(np.float32)
+        weights = (1 + np.log(tfs)) * np.repeat(self.term_idf, np.diff(indptr))
+        matrix = sparse.csc_matrix(
+            (weights, doc_ids, indptr), shape=(num_docs, num_terms)
+        ).tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+        normalized = sparse.diags(1 / np.where(norms > 0, norms, 1)) @ matrix
+
+        terms = [None] * num_terms
+        for term, term_id in self.vocabulary.items():
+            terms[term_id] = term
+        grams = ngram_vectors(terms, self.dim)
+
+        # Second-order random indexing: terms x (documents x random term vectors)
+        projection = rng.standard_normal((num_terms, self.dim)).astype(np.float32)
+        context = _batched_product(normalized.T.tocsr(), _batched_product(normalized, projection))
+        self.term_vectors = _normalize(grams + CONTEXT_WEIGHT * _normalize(context)).astype(np.float32)
+
+        embeddings = _normalize(_batched_product(matrix, self.term_vectors))
+        self._build_lists(embeddings, rng)
+        return self
+
+    def _build_lists(self, embeddings, rng):
+        """Cluster the embeddings with spherical k-means and quantize them per list."""
+        num_docs = len(embeddings)
+        num_lists = max(1, min(num_docs, int(round(np.sqrt(num_docs)))))
+        centroids = embeddings[rng.choice(num_docs, size=num_lists, replace=False)] if num_docs else (
+            np.zeros((0, self.dim), dtype=np.float32)
+        )
+        assignment = np.zeros(num_docs, dtype=np.int64)
+        for _ in range(KMEANS_ITERATIONS if num_docs else 0):
+            assignment = np.argmax(embeddings @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, embeddings)
+            # An emptied list keeps its previous centroid
+            filled = np.bincount(assignment, minlength=num_lists) > 0
+            centroids[filled] = _normalize(sums[filled])
+
+        order = np.argsort(assignment, kind='stable')
+        self.centroids = centroids.astype(np.float32)
+        self.list_indptr = np.zeros(num_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=num_lists), out=self.list_indptr[1:])
+        self.doc_ids = order.astype(np.int32)
+        self.doc_rows = np.argsort(order)
+
+        vectors = embeddings[order]
+        peaks = np.abs(vectors).max(axis=1) if num_docs else np.zeros(0, dtype=np.float32)
+        self.scales = (np.where(peaks > 0, peaks, 1) / 127).astype(np.float32)
+        self.codes = np.round(vectors / self.scales[:, None]).astype(np.int8)
+
+    def embed(self, query):
+        """The normalized embedding of a query; unknown terms only bring their n-grams."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        max_idf = float(self.term_idf.max()) if len(self.term_idf) else 1.0
+        for term, qtf in Counter(tokenize(query)).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None or term_id >= len(self.term_vectors):
+                vector += (1 + np.log(qtf)) * max_idf * ngram_vectors([term], self.dim)[0]
+            else:
+                vector += (1 + np.log(qtf)) * self.term_idf[term_id] * self.term_vectors[term_id]
+        return _normalize(vector)
+
+    def search_ids(self, query, num_results=10, nprobe=None, allowed_ids=None):
+        """
+        Approximate nearest documents of a query by cosine similarity.
+
+        Args:
+            query (str): The search query string.
+            num_results (int): The number of top results to return.
+            nprobe (int): IVF lists to scan (default: ``self.nprobe``).
+            allowed_ids: Optional document ids the results are restricted
+                to; only their vectors are scored, whatever list they are in.
+
+        Returns:
+            tuple: ``(doc_ids, scores)`` arrays, best match first.
+        """
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+        vector = self.embed(query)
+        if num_results <= 0 or not len(self.doc_ids) or not vector.any():
+            return empty
+
+        if allowed_ids is not None:
+            rows = self.doc_rows[np.asarray(allowed_ids, dtype=np.int64)]
+        else:
+            nprobe = min(nprobe or self.nprobe, len(self.centroids))
+            lists = np.argpartition(-(self.centroids @ vector), nprobe - 1)[:nprobe]
+            rows = np.concatenate([
+                np.arange(self.list_indptr[l], self.list_indptr[l + 1]) for l in lists
+            ])
+        scores = (self.codes[rows].astype(np.float32) @ vector) * self.scales[rows]
+        doc_ids = self.doc_ids[rows]
+
+        if len(scores) > num_results:
+            top = np.argpartition(-scores, num_results - 1)[:num_results]
+            doc_ids, scores = doc_ids[top], scores[top]
+        order = np.lexsort((doc_ids, -scores))
+        return doc_ids[order], scores[order]
@@ -0,0 +1,273 @@
+"""
+Compressed storage for the indexed documents.
+
+Searches only ever return the top-k documents, but every section's
+``content`` used to stay decoded in memory (as a Python ``str``, which takes
+four bytes per character as soon as the text holds one emoji). Here each
+content is zlib-compressed on its own and all of them are concatenated into
+one blob with an offset table; a document is decompressed only when it is
+read, i.e. when a search returns it. The short string fields (filename,
+heading) are packed as UTF-8 in the same way, without compression.
+
+``PackedStrings`` and ``CompressedStrings`` also back the string columns of
+the memory-mapped index (``mmap_store``).
+"""
+
+import zlib
+from collections.abc import Sequence
+
+import numpy as np
+
+# Fields stored compressed; the others are small and read on every filter
+COMPRESSED_FIELDS = ('content',)
+COMPRESSION_LEVEL = 6
+# Sections are short, so they are compressed against a preset dictionary
+# sampled from the corpus itself (zlib uses at most 32 KiB of it)
+ZDICT_SIZE = 32768
+ZDICT_SAMPLES = 256
+
+
+def pack_strings(values):
+    """Encode strings as a ``(blob, offsets)`` pair of arrays."""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class PackedStrings(Sequence):
+    """A read-only list of strings stored as a UTF-8 blob and an offset table."""
+
+    def __init__(self, buffer, blob_start, offsets):
+        self._buffer = buffer
+        self._start = blob_start
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def encoded(self, i):
+        start = self._start + int(self._offsets[i])
+        return self._buffer[start:self._start + int(self._offsets[i + 1])]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.encoded(i).decode('utf-8')
+
+
+def make_zdict(values, size=ZDICT_SIZE, samples=ZDICT_SAMPLES):
+    """Build a preset dictionary from evenly spaced samples of ``values``."""
+    step = max(1, len(values) // samples)
+    return "".join(values[::step]).encode('utf-8')[-size:]
+
+
+def _compress(data, level, zdict):
+    compressor = zlib.compressobj(level, zdict=zdict) if zdict else zlib.compressobj(level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_strings(values, level=COMPRESSION_LEVEL, zdict=b""):
+    """
+    Compress every string on its own into a ``(blob, offsets)`` pair of arrays.
+
+    Args:
+        values: The strings.
+        level: zlib compression level.
+        zdict: Optional preset dictionary (see ``make_zdict``); it must be
+            given again to ``CompressedStrings`` to read the strings back.
+    """
+    compressed = [_compress(value.encode('utf-8'), level, zdict) for value in values]
+    offsets = np.zeros(len(compressed) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in compressed], out=offsets[1:])
+    return np.frombuffer(b"".join(compressed), dtype=np.uint8), offsets
+
+
+class CompressedStrings(PackedStrings):
+    """A read-only list of strings, each zlib-compressed, in a blob with an offset table."""
+
+    def __init__(self, buffer, blob_start, offsets, zdict=b""):
+        super().__init__(buffer, blob_start, offsets)
+        self._zdict = bytes(zdict)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        decompressor = zlib.decompressobj(zdict=self._zdict) if self._zdict else zlib.decompressobj()
+        return (decompressor.decompress(self.encoded(i)) + decompressor.flush()).decode('utf-8')
+
+    @property
+    def compressed_bytes(self):
+        """Size of the compressed strings and their preset dictionary."""
+        return int(self._offsets[-1] - self._offsets[0]) + len(self._zdict)
+
+    def carry(self, kept_ids, values, level=COMPRESSION_LEVEL):
+        """
+        A new column with the strings at ``kept_ids``, copied without being
+        decompressed, followed by ``values`` compressed with the same preset
+        dictionary.
+        """
+        compressed = [bytes(self.encoded(int(i))) for i in kept_ids]
+        compressed += [_compress(value.encode('utf-8'), level, self._zdict) for value in values]
+        offsets = np.zeros(len(compressed) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in compressed], out=offsets[1:])
+        return CompressedStrings(b"".join(compressed), 0, offsets, self._zdict)
+
+
+def _pack_values(values):
+    """Short string fields are packed as UTF-8 rather than kept as str objects."""
+    if all(isinstance(value, str) for value in values):
+        blob, offsets = pack_strings(values)
+        return PackedStrings(blob.tobytes(), 0, offsets)
+    return values
+
+
+class CompressedDocuments(Sequence):
+    """
+    Documents whose large text fields stay compressed until they are read.
+
+    Attributes:
+        compressed_bytes (int): Size of the compressed blobs.
+    """
+
+    def __init__(self, documents, fields=COMPRESSED_FIELDS):
+        """
+        Args:
+            documents: The documents to store (dicts with string ``fields``).
+            fields: The fields to compress.
+        """
+        documents = list(documents)
+        self._keys = []
+        self._values = {}
+        self._columns = {}
+        self.compressed_bytes = 0
+
+        # Documents keep their own field order; identical orders share one tuple
+        key_orders = {}
+        for doc in documents:
+            keys = tuple(doc)
+            self._keys.append(key_orders.setdefault(keys, keys))
+            for key in keys:
+                if key not in fields and key not in self._values:
+                    self._values[key] = [None] * len(documents)
+        for field, values in self._values.items():
+            for i, doc in enumerate(documents):
+                values[i] = doc.get(field)
+            self._values[field] = _pack_values(values)
+
+        for field in fields:
+            values = [doc.get(field) or '' for doc in documents]
+            zdict = make_zdict(values)
+            blob, offsets = compress_strings(values, zdict=zdict)
+            self._columns[field] = CompressedStrings(blob.tobytes(), 0, offsets, zdict)
+            self.compressed_bytes += len(blob) + len(zdict)
+
+    @classmethod
+    def _assemble(cls, keys, values, columns):
+        store = cls.__new__(cls)
+        store._keys, store._values, store._columns = keys, values, columns
+        store.compressed_bytes = sum(column.compressed_bytes for column in columns.values())
+        return store
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return {
+            key: self._columns[key][i] if key in self._columns else self._values[key][i]
+            for key in self._keys[i]
+        }
+
+    def value(self, i, field):
+        """One field of one document (None if it has no such field)."""
+        if field not in self._keys[i]:
+            return None
+        if field in self._columns:
+            return self._columns[field][i]
+        return self._values[field][i]
+
+    def column(self, field):
+        """All values of a field; only a compressed field gets decompressed."""
+        if field in self._columns:
+            return list(self._columns[field])
+        return list(self._values.get(field, [None] * len(self)))
+
+    def fields(self, i):
+        """The field names of one document, in its own order."""
+        return self._keys[i]
+
+    def compressed_columns(self):
+        """The ``CompressedStrings`` of every compressed field."""
+        return dict(self._columns)
+
+
+def field_values(documents, field):
+    """Values of ``field`` for every document, cheaply when the store allows it."""
+    if hasattr(documents, 'column'):
+        return documents.column(field)
+    return [doc.get(field) for doc in documents]
+
+
+def document_value(documents, i, field):
+    """One field of one document, without inflating the others when the store allows it."""
+    if hasattr(documents, 'value'):
+        return documents.value(i, field)
+    return documents[i].get(field)
+
+
+def update_documents(documents, keep, added):
+    """
+    The documents where the ``keep`` mask is true, followed by ``added``.
+
+    Stores with compressed columns (``CompressedDocuments``, and the
+    ``MappedDocuments`` of ``mmap_store``) give a new ``CompressedDocuments``
+    in which the kept contents are copied still compressed: only ``added``
+    gets compressed, and nothing is decompressed. Other sequences give a list.
+    """
+    added = list(added)
+    if not hasattr(documents, 'compressed_columns'):
+        return [doc for doc, kept in zip(documents, keep) if kept] + added
+
+    kept_ids = np.flatnonzero(keep)
+    columns = {
+        field: column.carry(kept_ids, [doc.get(field) or '' for doc in added])
+        for field, column in documents.compressed_columns().items()
+    }
+    # Documents keep their own field order; identical orders share one tuple
+    key_orders = {}
+    keys = [
+        key_orders.setdefault(fields, fields)
+        for fields in [tuple(documents.fields(i)) for i in kept_ids] + [tuple(doc) for doc in added]
+    ]
+    names = dict.fromkeys(name for fields in key_orders for name in fields if name not in columns)
+    values = {
+        name: _pack_values(
+            [documents.value(int(i), name) for i in kept_ids] + [doc.get(name) for doc in added]
+        )
+        for name in names
+    }
+    return CompressedDocuments._assemble(keys, values, columns)
+
+
+def compress_documents(index, documents):
+    """
+    Swap the documents of a fitted index for a ``CompressedDocuments`` copy.
+
+    Returns:
+        The ``(index, documents)`` pair, now sharing the compressed store.
+    """
+    documents = CompressedDocuments(documents)
+    index.docs = documents
+    return index, documents
@@ -0,0 +1,230 @@
+"""
+Async HTTP fetch layer for r.jina.ai.
+
+``JinaFetcher`` keeps one pooled keep-alive ``httpx.AsyncClient`` per event
+loop (closed when that loop shuts down or is replaced), applies connect/read timeouts to every request and bounds how many
+requests run at once against the same target host. The reader base URL is
+configurable (``JINA_READER_URL``) so tests can point it at a local stub.
+
+With a ``PageCache`` attached, fresh pages are answered from the cache,
+stale ones are served immediately and revalidated in the background, and
+expired ones are revalidated with a conditional request before use.
+Concurrent fetches of the same URL share one request (single-flight).
+"""
+
+import asyncio
+import os
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from page_cache import FRESH, STALE
+from singleflight import AsyncSingleFlight
+
+JINA_READER_URL = os.environ.get("JINA_READER_URL", "https://r.jina.ai/")
+CONNECT_TIMEOUT = float(os.environ.get("JINA_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("JINA_READ_TIMEOUT", "30"))
+MAX_CONNECTIONS = int(os.environ.get("JINA_MAX_CONNECTIONS", "20"))
+MAX_PER_HOST = int(os.environ.get("JINA_MAX_PER_HOST", "4"))
+
+
+class JinaFetcher:
+    """
+    Fetches pages through the r.jina.ai reader with a shared connection pool.
+
+    Attributes:
+        base_url (str): Reader prefix; the page URL is appended to it.
+        timeout (httpx.Timeout): Connect and read timeouts.
+        limits (httpx.Limits): Connection pool size and keep-alive settings.
+        max_per_host (int): Maximum concurrent requests per target host.
+        cache (PageCache): Optional cache consulted by ``fetch_text``.
+        flights (AsyncSingleFlight): Coalesces concurrent fetches per URL.
+        metrics (Metrics): Optional registry recording every upstream request.
+    """
+
+    def __init__(self, base_url=None, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, max_connections=MAX_CONNECTIONS,
+                 max_per_host=MAX_PER_HOST, transport=None, cache=None, metrics=None):
+        self.base_url = base_url or JINA_READER_URL
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self.max_per_host = max_per_host
+        self.cache = cache
+        self.metrics = metrics
+        self._transport = transport
+        self._client = None
+        self._closer = None
+        self._loop = None
+        self._host_slots = {}
+        self._revalidating = {}
+        self.flights = AsyncSingleFlight()
+
+    def reader_url(self, url):
+        """Return the reader URL that fetches ``url``."""
+        return f"{self.base_url}{url}"
+
+    async def _client_for_loop(self):
+        # Clients and semaphores belong to the event loop that created them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            previous, previous_loop = self._client, self._loop
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self._transport,
+                follow_redirects=True,
+            )
+            self._loop = loop
+            self._host_slots = {}
+            self._revalidating = {}
+            self._closer = self._close_with_loop(self._client)
+            await anext(self._closer)
+            # A loop still running elsewhere closes its own client; a loop
+            # shut down by asyncio.run already did (see _close_with_loop)
+            if previous is not None and previous_loop.is_running():
+                asyncio.run_coroutine_threadsafe(previous.aclose(), previous_loop)
+        return self._client
+
+    async def _close_with_loop(self, client):
+        # Left suspended at the yield: loop.shutdown_asyncgens(), which
+        # asyncio.run calls before closing the loop, runs the finally while
+        # the connections can still be closed
+        try:
+            yield
+        finally:
+            await client.aclose()
+
+    def _slot(self, url):
+        host = urlsplit(url).netloc or url
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_slots[host]
+
+    async def get(self, url, headers=None):
+        """
+        Fetch ``url`` through the reader.
+
+        Args:
+            url: The page URL.
+            headers: Optional extra request headers.
+
+        Returns:
+            The ``httpx.Response`` (raises ``httpx.HTTPError`` on failures,
+            including non-2xx responses other than 304).
+        """
+        client = await self._client_for_loop()
+        async with self._slot(url):
+            start = time.perf_counter()
+            try:
+                response = await client.get(self.reader_url(url), headers=headers)
+                if response.status_code != 304:
+                    response.raise_for_status()
+            except httpx.HTTPError:
+                self._record(start, error=True)
+                raise
+        self._record(start, nbytes=len(response.content))
+        return response
+
+    def _record(self, start, error=False, nbytes=0):
+        if self.metrics is not None:
+            self.metrics.record_upstream("jina", time.perf_counter() - start, error, nbytes)
+
+    async def _revalidate(self, url, entry):
+        # Conditional GET when there is a cached copy; a 304 keeps its body.
+        # Storing the page writes the disk tier, so it runs off the event loop
+        headers = self.cache.validators(entry) if entry else None
+        response = await self.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            return await asyncio.to_thread(self.cache.refresh, url, entry)
+        return await asyncio.to_thread(
+            self.cache.put,
+            url,
+            response.text,
+            etag=response.headers.get('etag'),
+            last_modified=response.headers.get('last-modified'),
+            revalidated=entry is not None,
+        )
+
+    async def _revalidate_quietly(self, url, entry):
+        try:
+            await self.flights.do(url, lambda: self._revalidate(url, entry))
+        except httpx.HTTPError:
+            pass  # Keep serving the stale copy
+
+    def _revalidate_in_background(self, url, entry):
+        if url in self._revalidating:
+            return
+        task = asyncio.create_task(self._revalidate_quietly(url, entry))
+        self._revalidating[url] = task
+        task.add_done_callback(lambda _: self._revalidating.pop(url, None))
+
+    async def wait_revalidations(self):
+        """Wait for the background revalidations of the current event loop."""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        while self._revalidating:
+            await asyncio.gather(*list(self._revalidating.values()))
+
+    async def fetch_text(self, url):
+        """Return the page text, or an "Error fetching content: ..." message."""
+        try:
+            if self.cache is None:
+                response = await self.flights.do(url, lambda: self.get(url))
+                return response.text
+
+            await self._client_for_loop()
+            entry, state = self.cache.lookup(url)
+            if state == FRESH:
+                return entry['body']
+            if state == STALE:
+                self._revalidate_in_background(url, entry)
+                return entry['body']
+            entry = await self.flights.do(url, lambda: self._revalidate(url, entry))
+            return entry['body']
+        except httpx.HTTPError as e:
+            return f"Error fetching content: {str(e)}"
+
+    def fetch_text_blocking(self, url):
+        """
+        Synchronous ``fetch_text`` for scripts; uses a short-lived client.
+
+        Runs its own event loop, so it cannot be called from a running one:
+        async code awaits ``fetch_text`` instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                "fetch_text_blocking() cannot be called from a running event loop; await fetch_text()"
+            )
+
+        async def fetch_once():
+            fetcher = JinaFetcher(
+                base_url=self.base_url,
+                connect_timeout=self.timeout.connect,
+                read_timeout=self.timeout.read,
+                transport=self._transport,
+                cache=self.cache,
+                metrics=self.metrics,
+            )
+            try:
+                return await fetcher.fetch_text(url)
+            finally:
+                await fetcher.aclose()
+
+        return asyncio.run(fetch_once())
+
+    async def aclose(self):
+        """Close the pooled client of the current event loop."""
+        await self.wait_revalidations()
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            # Runs the finally of _close_with_loop, which closes the client
+            await self._closer.aclose()
+            self._client = self._closer = None
+            self._loop = None
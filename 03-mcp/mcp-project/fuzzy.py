@@ -0,0 +1,205 @@
+"""
+Typo-tolerant query expansion with a trigram index over the vocabulary.
+
+``TrigramIndex`` maps every character trigram of the padded terms
+(``^contxt$`` -> ``^co``, ``con``, ..., ``xt$``) to the ids of the terms
+that contain it. The candidates for a misspelled term are found by counting
+the trigrams they share with it, visiting only the posting lists of its own
+trigrams rather than the whole vocabulary, and keeping the terms that share
+enough of them (q-gram lemma), have a close length and close letter counts.
+At most ``MAX_VERIFIED`` of those, the ones sharing the most trigrams, are
+checked with an exact, bounded edit distance (Damerau-Levenshtein, optimal
+string alignment, so "fastmpc" is one edit from "fastmcp"), which bounds the
+work per query term whatever the size of the vocabulary.
+
+``expand`` turns the candidates into extra query terms weighted below the
+terms actually typed (``bm25.BM25Index.search_ids(..., expansions=...)``).
+"""
+
+import functools
+
+import numpy as np
+
+from bm25 import tokenize
+
+GRAM_SIZE = 3
+# One edit destroys at most this many trigrams (a transposition touches four)
+GRAMS_PER_EDIT = 4
+# Letters are counted in this many buckets for the bag distance filter
+LETTER_BUCKETS = 32
+MAX_EXPANSIONS = 5
+# Candidates checked with the exact edit distance, most shared trigrams first
+MAX_VERIFIED = 32
+FUZZY_WEIGHT = 0.5
+
+
+def max_edits(term):
+    """Edits tolerated in a query term: none below 4 characters, 2 from 8."""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+def _letter_counts(terms):
+    """Per term, how many of its characters fall in each of the LETTER_BUCKETS."""
+    codes = np.array([ord(char) % LETTER_BUCKETS for term in terms for char in term], dtype=np.int64)
+    rows = np.repeat(np.arange(len(terms)), [len(term) for term in terms])
+    counts = np.zeros((len(terms), LETTER_BUCKETS), dtype=np.int16)
+    np.add.at(counts, (rows, codes), 1)
+    return counts
+
+
+def _grams(term):
+    padded = f"^{term}$"
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance between ``a`` and ``b``.
+
+    Only the diagonal band of width ``limit`` is computed, so the cost is
+    linear in the length of the terms.
+
+    Returns:
+        The distance, or ``limit + 1`` as soon as it is known to exceed ``limit``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    before, previous = None, [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        char, last_char = a[i - 1], a[i - 2] if i > 1 else None
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] + (char != b[j - 1])
+            if previous[j] < value:
+                value = previous[j] + 1
+            if current[j - 1] < value:
+                value = current[j - 1] + 1
+            if j > 1 and char == b[j - 2] and last_char == b[j - 1] and before[j - 2] < value:
+                value = before[j - 2] + 1
+            if value > over:
+                value = over
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return over
+        before, previous = previous, current
+    return previous[-1]
+
+
+class TrigramIndex:
+    """
+    Trigram to term ids lookup over a vocabulary.
+
+    Attributes:
+        terms (list): Every term, by term id.
+        lengths (np.ndarray): Length of every term.
+        letters (np.ndarray): Bucketed letter counts of every term.
+        gram_ids (dict): Trigram to its position in ``indptr``.
+        indptr (np.ndarray): The terms of trigram ``g`` are
+            ``term_ids[indptr[g]:indptr[g + 1]]``.
+        term_ids (np.ndarray): Concatenated trigram posting lists.
+    """
+
+    def __init__(self, vocabulary):
+        """
+        Args:
+            vocabulary: Term to term id mapping (a ``BM25Index.vocabulary``).
+        """
+        vocabulary = vocabulary.copy()
+        self.terms = [None] * len(vocabulary)
+        for term, term_id in vocabulary.items():
+            self.terms[term_id] = term
+        self.lengths = np.array([len(term) for term in self.terms], dtype=np.int32)
+        self.letters = _letter_counts(self.terms)
+
+        self.gram_ids = {}
+        pairs_gram, pairs_term = [], []
+        for term_id, term in enumerate(self.terms):
+            for gram in _grams(term):
+                pairs_gram.append(self.gram_ids.setdefault(gram, len(self.gram_ids)))
+                pairs_term.append(term_id)
+        pairs_gram = np.array(pairs_gram, dtype=np.int64)
+        order = np.argsort(pairs_gram, kind='stable')
+        self.term_ids = np.array(pairs_term, dtype=np.int32)[order]
+        self.indptr = np.zeros(len(self.gram_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs_gram, minlength=len(self.gram_ids)), out=self.indptr[1:])
+        # The same misspellings tend to come back, so remember recent ones
+        self._cached_candidates = functools.lru_cache(maxsize=4096)(self._candidates)
+
+    def candidates(self, term, max_distance=None, limit=MAX_EXPANSIONS):
+        """
+        Vocabulary terms within a few edits of ``term``.
+
+        Args:
+            term: The (lowercase) query term.
+            max_distance: Edits allowed (default: ``max_edits(term)``).
+            limit: Maximum number of candidates.
+
+        Returns:
+            A list of ``(candidate, distance)`` pairs, closest first, without
+            ``term`` itself.
+        """
+        return list(self._cached_candidates(term, max_distance, limit))
+
+    def _candidates(self, term, max_distance, limit):
+        k = max_edits(term) if max_distance is None else max_distance
+        if k <= 0:
+            return ()
+        grams = [self.gram_ids[gram] for gram in _grams(term) if gram in self.gram_ids]
+        if not grams:
+            return ()
+
+        ids, shared = np.unique(
+            np.concatenate([self.term_ids[self.indptr[g]:self.indptr[g + 1]] for g in grams]),
+            return_counts=True
+        )
+        needed = max(1, len(_grams(term)) - GRAMS_PER_EDIT * k)
+        keep = (shared >= needed) & (np.abs(self.lengths[ids] - len(term)) <= k)
+        ids, shared = ids[keep], shared[keep]
+
+        # Bag distance, a cheap lower bound of the edit distance
+        difference = self.letters[ids] - _letter_counts([term])[0]
+        extra = np.clip(difference, 0, None).sum(axis=1)
+        missing = np.clip(-difference, 0, None).sum(axis=1)
+        keep = np.maximum(extra, missing) <= k
+        ids, shared = ids[keep], shared[keep]
+        ids = ids[np.argsort(-shared, kind='stable')[:MAX_VERIFIED]]
+
+        found = []
+        for term_id in ids.tolist():
+            candidate = self.terms[term_id]
+            if candidate == term:
+                continue
+            distance = edit_distance(term, candidate, k)
+            if distance <= k:
+                found.append((candidate, distance))
+        found.sort(key=lambda item: (item[1], item[0]))
+        return tuple(found[:limit])
+
+    def expand(self, query, weight=FUZZY_WEIGHT, limit=MAX_EXPANSIONS):
+        """
+        Extra terms for a query: the candidates of every query term.
+
+        Args:
+            query: The search query string.
+            weight: Weight of a candidate one edit away; each further edit
+                multiplies it again.
+            limit: Maximum candidates per query term.
+
+        Returns:
+            A dict mapping candidate terms (never the query terms) to weights.
+        """
+        terms = set(tokenize(query))
+        expansions = {}
+        for term in terms:
+            for candidate, distance in self.candidates(term, limit=limit):
+                if candidate not in terms:
+                    expansions[candidate] = max(expansions.get(candidate, 0.0), weight ** distance)
+        return expansions
@@ -0,0 +1,143 @@
+"""
+Incremental reindexing of the FastMCP documentation archive.
+
+A manifest maps every indexed markdown entry of the zip (normalized the same
+way as ``_extract_and_index_files``) to its ``[crc, size]`` from the zip's
+central directory, which is read without decompressing anything. Comparing
+the manifest of a new archive with the stored one tells exactly which files
+changed, so only those are extracted, re-tokenized and upserted.
+"""
+
+import copy
+import zipfile
+
+from doc_store import field_values
+
+
+def _is_markdown(name):
+    return name.endswith('.md') or name.endswith('.mdx')
+
+
+def _base_dir(zf):
+    base_names = {name.split('/')[0] for name in zf.namelist()}
+    return list(base_names)[0] if base_names else "fastmcp-main"
+
+
+def read_manifest(zip_path):
+    """
+    Return ``{normalized_filename: [crc, size]}`` for the markdown entries of a zip.
+
+    Args:
+        zip_path: Path of the archive.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        base_dir = _base_dir(zf)
+        return {
+            info.filename.replace(f"{base_dir}/", "", 1): [info.CRC, info.file_size]
+            for info in zf.infolist()
+            if not info.filename.endswith('/') and _is_markdown(info.filename)
+        }
+
+
+def diff_manifests(old, new):
+    """
+    Compare two manifests.
+
+    Returns:
+        A ``(changed, deleted)`` tuple of sorted filename lists: ``changed``
+        holds new and modified entries, ``deleted`` the entries that are gone.
+    """
+    changed = sorted(name for name, entry in new.items() if old.get(name) != entry)
+    deleted = sorted(name for name in old if name not in new)
+    return changed, deleted
+
+
+def extract_entries(zip_path, filenames):
+    """
+    Read only the given (normalized) markdown files from a zip.
+
+    Returns:
+        A list of ``{'filename', 'content'}`` documents, in archive order.
+    """
+    wanted = set(filenames)
+    documents = []
+
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        base_dir = _base_dir(zf)
+        for info in zf.infolist():
+            normalized_filename = info.filename.replace(f"{base_dir}/", "", 1)
+            if normalized_filename in wanted and not info.filename.endswith('/'):
+                documents.append({
+                    'filename': normalized_filename,
+                    'content': zf.read(info.filename).decode('utf-8'),
+                })
+
+    return documents
+
+
+def apply_changes(index, documents, added, stale_filenames, build_index):
+    """
+    Remove the documents of ``stale_filenames`` and add ``added``.
+
+    Indexes with an ``update`` method (``BM25Index``) are updated on a copy,
+    so the given index keeps answering queries meanwhile; others (minsearch)
+    are refitted on the unchanged documents plus the new ones, which still
+    skips extracting the unchanged files.
+
+    Args:
+        index: The fitted index.
+        documents: The documents the index was fitted on.
+        added: New documents to index.
+        stale_filenames: Set of filenames whose documents must be dropped.
+        build_index: Callable that fits a new index from a document list.
+
+    Returns:
+        The updated ``(index, documents)``.
+    """
+    removed_ids = [
+        i for i, filename in enumerate(field_values(documents, 'filename'))
+        if filename in stale_filenames
+    ]
+
+    if hasattr(index, 'update'):
+        index = copy.copy(index)
+        index.update(added, removed_ids)
+        return index, index.docs
+
+    removed = set(removed_ids)
+    documents = [doc for i, doc in enumerate(documents) if i not in removed] + list(added)
+    return build_index(documents), documents
+
+
+def update_from_archive(index, documents, manifest, zip_path, build_index,
+                        make_documents=None):
+    """
+    Bring an index built from an older archive up to date with ``zip_path``.
+
+    Args:
+        index: The fitted index.
+        documents: The documents the index was fitted on (each with a 'filename').
+        manifest: The manifest of the archive the index was built from.
+        zip_path: Path of the new archive.
+        build_index: Callable that fits a new index from a document list.
+        make_documents: Optional callable turning extracted files into the
+            documents that get indexed (e.g. ``chunk_documents``).
+
+    Returns:
+        A ``(index, documents, manifest, changes)`` tuple, where ``changes``
+        is a dict with the 'changed' and 'deleted' filenames.
+    """
+    new_manifest = read_manifest(zip_path)
+    changed, deleted = diff_manifests(manifest, new_manifest)
+    changes = {'changed': changed, 'deleted': deleted}
+
+    if not changed and not deleted:
+        return index, documents, new_manifest, changes
+
+    files = extract_entries(zip_path, changed)
+    added = make_documents(files) if make_documents else files
+    index, documents = apply_changes(
+        index, documents, added, set(changed) | set(deleted), build_index
+    )
+
+    return index, documents, new_manifest, changes
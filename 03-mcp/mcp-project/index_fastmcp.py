@@ -4,6 +4,7 @@ Download fastmcp repository and index md/mdx files with minsearch.
 """
 
 import os
+import tempfile
 import zipfile
 import requests
 from pathlib import Path
@@ -23,9 +24,17 @@ def download_fastmcp_zip():
     response = requests.get(url, stream=True)
     response.raise_for_status()
     
-    with open(zip_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    # Write to a temp file and rename it, so an interrupted download never
+    # leaves a truncated zip behind
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(zip_path)), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                f.write(chunk)
+        os.replace(tmp_path, zip_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
     
     print(f"✓ Downloaded to {zip_path}")
     return zip_path
@@ -0,0 +1,275 @@
+"""
+On-disk snapshots of the FastMCP documentation index.
+
+A snapshot is written next to the source zip (``fastmcp-main.zip.index.npz``,
+or ``fastmcp-main.zip.<name>.npz`` for other document sets built from it)
+and stores everything needed to answer queries without re-reading the
+archive: the vocabulary and term matrix of every text field (TF-IDF matrices
+for minsearch, BM25 posting lists for the native engine) plus the document
+table. Each snapshot records the SHA-256 of the zip it was built from, the
+engine that built it and the settings used to derive the documents (such as
+chunk sizes), so a change to any of them triggers a rebuild. It can also
+record the archive manifest (CRC and size of every indexed entry), which lets
+``incremental.py`` update an outdated snapshot instead of rebuilding it.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+from scipy import sparse
+
+from bm25 import BM25Index
+
+SNAPSHOT_FORMAT = 3
+# Arrays of BM25Index.positions, in tuple order
+POSITION_PARTS = ('indptr', 'term_ids', 'starts', 'lengths')
+
+
+def archive_hash(zip_path):
+    """Return the SHA-256 hex digest of the archive at ``zip_path``."""
+    with open(zip_path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+def snapshot_path(zip_path, name='index'):
+    """Return the path of the ``name`` snapshot that belongs to ``zip_path``."""
+    return f"{zip_path}.{name}.npz"
+
+
+def _encode_json(value):
+    return np.frombuffer(json.dumps(value).encode('utf-8'), dtype=np.uint8)
+
+
+def _decode_json(array):
+    return json.loads(array.tobytes().decode('utf-8'))
+
+
+def index_engine(index):
+    """Return the engine name of a fitted index: 'bm25' or 'minsearch'."""
+    return 'bm25' if isinstance(index, BM25Index) else 'minsearch'
+
+
+def _minsearch_arrays(index):
+    arrays = {}
+    for field in index.text_fields:
+        vectorizer = index.vectorizers[field]
+        vocabulary = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        matrix = index.text_matrices[field].tocsr()
+
+        arrays[f'{field}.vocabulary'] = _encode_json(vocabulary)
+        arrays[f'{field}.idf'] = vectorizer.idf_
+        arrays[f'{field}.data'] = matrix.data
+        arrays[f'{field}.indices'] = matrix.indices
+        arrays[f'{field}.indptr'] = matrix.indptr
+        arrays[f'{field}.shape'] = np.array(matrix.shape)
+    return arrays
+
+
+def _bm25_arrays(index):
+    vocabulary = sorted(index.vocabulary, key=index.vocabulary.get)
+    arrays = {'vocabulary': _encode_json(vocabulary)}
+    for field in index.text_fields:
+        indptr, doc_ids, impacts = index.postings[field]
+        arrays[f'{field}.indptr'] = indptr
+        arrays[f'{field}.doc_ids'] = doc_ids
+        arrays[f'{field}.impacts'] = impacts
+        arrays[f'{field}.max_impacts'] = index.max_impacts[field]
+        arrays[f'{field}.term_freqs'] = index.term_freqs[field]
+        arrays[f'{field}.doc_lengths'] = index.doc_lengths[field]
+    for field, positions in index.positions.items():
+        for part, array in zip(POSITION_PARTS, positions):
+            arrays[f'pos.{field}.{part}'] = array
+    return arrays
+
+
+def _load_minsearch(data, meta):
+    # minsearch (and pandas with it) is only imported for its own snapshots
+    from minsearch import Index
+
+    index = Index(
+        text_fields=meta['text_fields'],
+        keyword_fields=meta['keyword_fields']
+    )
+    for field in index.text_fields:
+        vocabulary = _decode_json(data[f'{field}.vocabulary'])
+        vectorizer = index.vectorizers[field]
+        vectorizer.vocabulary_ = {term: i for i, term in enumerate(vocabulary)}
+        vectorizer.idf_ = data[f'{field}.idf']
+        index.text_matrices[field] = sparse.csr_matrix(
+            (data[f'{field}.data'], data[f'{field}.indices'], data[f'{field}.indptr']),
+            shape=tuple(data[f'{field}.shape'])
+        )
+    return index
+
+
+def _load_bm25(data, meta):
+    index = BM25Index(
+        text_fields=meta['text_fields'],
+        keyword_fields=meta['keyword_fields'],
+        **meta['params']
+    )
+    vocabulary = _decode_json(data['vocabulary'])
+    index.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+    for field in index.text_fields:
+        index.postings[field] = (
+            data[f'{field}.indptr'],
+            data[f'{field}.doc_ids'],
+            data[f'{field}.impacts'],
+        )
+        index.max_impacts[field] = data[f'{field}.max_impacts']
+        index.term_freqs[field] = data[f'{field}.term_freqs']
+        index.doc_lengths[field] = data[f'{field}.doc_lengths']
+    index.positions = {
+        field: tuple(data[f'pos.{field}.{part}'] for part in POSITION_PARTS)
+        for field in index.position_fields
+    }
+    return index
+
+
+def save_snapshot(index, documents, zip_path, digest=None, name='index', settings=None,
+                  manifest=None):
+    """
+    Persist a fitted index next to its source archive.
+
+    Args:
+        index: A fitted minsearch ``Index`` or ``BM25Index``.
+        documents: The document list the index was fitted on.
+        zip_path: Path of the archive the documents were extracted from.
+        digest: Precomputed ``archive_hash(zip_path)``, if already known.
+        name: Snapshot name, to keep several document sets per archive.
+        settings: JSON-serializable settings the documents were built with.
+        manifest: Optional ``{filename: [crc, size]}`` of the archive entries.
+
+    Returns:
+        The path of the written snapshot.
+    """
+    if digest is None:
+        digest = archive_hash(zip_path)
+
+    engine = index_engine(index)
+    meta = {
+        'format': SNAPSHOT_FORMAT,
+        'archive_hash': digest,
+        'engine': engine,
+        'settings': settings or {},
+        'manifest': manifest,
+        'text_fields': index.text_fields,
+        'keyword_fields': index.keyword_fields,
+    }
+    if engine == 'bm25':
+        meta['params'] = {'k1': index.k1, 'b': index.b, 'position_fields': index.position_fields}
+        arrays = _bm25_arrays(index)
+    else:
+        arrays = _minsearch_arrays(index)
+
+    arrays['meta'] = _encode_json(meta)
+    arrays['documents'] = _encode_json(documents)
+
+    # Write to a temporary file first so readers never see a partial snapshot
+    path = snapshot_path(zip_path, name)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return path
+
+
+def _read_snapshot(path, engine, settings):
+    """Read a snapshot file; returns ``(index, documents, meta)`` or None."""
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = _decode_json(data['meta'])
+            if (meta.get('format') != SNAPSHOT_FORMAT
+                    or meta.get('engine') != engine
+                    or meta.get('settings') != (settings or {})):
+                return None
+
+            documents = _decode_json(data['documents'])
+            if engine == 'bm25':
+                index = _load_bm25(data, meta)
+            else:
+                index = _load_minsearch(data, meta)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+    index.docs = documents
+    if engine == 'bm25':
+        index.build_keyword_index()
+    else:
+        import pandas as pd
+
+        index.keyword_df = pd.DataFrame({
+            field: [doc.get(field) for doc in documents]
+            for field in index.keyword_fields
+        })
+
+    return index, documents, meta
+
+
+def load_snapshot(zip_path, digest=None, engine='bm25', name='index', settings=None):
+    """
+    Load the snapshot for ``zip_path`` if it was built from the same archive.
+
+    Args:
+        zip_path: Path of the source archive.
+        digest: Precomputed ``archive_hash(zip_path)``, if already known.
+        engine: Engine the caller wants, 'bm25' or 'minsearch'.
+        name: Snapshot name, as given to ``save_snapshot``.
+        settings: Settings the caller would build the documents with.
+
+    Returns:
+        A ``(index, documents)`` tuple, or None when there is no usable
+        snapshot (missing, unreadable, older format, different archive,
+        engine or settings).
+    """
+    path = snapshot_path(zip_path, name)
+    if not os.path.exists(path):
+        return None
+
+    if digest is None:
+        digest = archive_hash(zip_path)
+
+    snapshot = _read_snapshot(path, engine, settings)
+    if snapshot is None or snapshot[2].get('archive_hash') != digest:
+        return None
+
+    index, documents, _ = snapshot
+    return index, documents
+
+
+def load_previous_snapshot(zip_path, engine='bm25', name='index', settings=None):
+    """
+    Load the snapshot for ``zip_path`` even if the archive has changed since.
+
+    Used for incremental updates: the returned manifest tells which entries
+    the snapshot was built from.
+
+    Args:
+        zip_path: Path of the source archive.
+        engine: Engine the caller wants, 'bm25' or 'minsearch'.
+        name: Snapshot name, as given to ``save_snapshot``.
+        settings: Settings the caller would build the documents with.
+
+    Returns:
+        An ``(index, documents, manifest)`` tuple, or None when there is no
+        compatible snapshot or it was saved without a manifest.
+    """
+    snapshot = _read_snapshot(snapshot_path(zip_path, name), engine, settings)
+    if snapshot is None or snapshot[2].get('manifest') is None:
+        return None
+
+    index, documents, meta = snapshot
+    return index, documents, meta['manifest']
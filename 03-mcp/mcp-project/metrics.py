@@ -0,0 +1,220 @@
+"""
+Latency and volume metrics for the MCP tools and their upstream work.
+
+A ``Metrics`` registry keeps, per tool, call and error counts, a latency
+histogram and the bytes returned; per upstream service (r.jina.ai), request
+and error counts, a latency histogram and the bytes received; and per index
+build phase (download, extract, fit, ...), a duration histogram. ``snapshot``
+returns everything as a dictionary and ``to_prometheus`` renders it in the
+Prometheus text exposition format.
+"""
+
+import functools
+import inspect
+import json
+import threading
+import time
+from bisect import bisect_left
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of durations in seconds.
+
+    Attributes:
+        bounds (tuple): Bucket upper bounds; an implicit +Inf bucket follows.
+        counts (list): Observations per bucket (not cumulative).
+        count (int): Number of observations.
+        total (float): Sum of all observations.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile as the upper bound of its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum_s': round(self.total, 6),
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_le_ms': self.quantile(0.5) * 1000,
+            'p95_le_ms': self.quantile(0.95) * 1000,
+            'p99_le_ms': self.quantile(0.99) * 1000,
+            'buckets': {
+                str(bound): count for bound, count in zip(self.bounds + ("+Inf",), self.counts)
+            },
+        }
+
+
+def payload_bytes(result):
+    """Return the size of a tool result as the UTF-8 JSON sent to the client."""
+    if isinstance(result, str):
+        return len(result.encode('utf-8'))
+    return len(json.dumps(result, default=str).encode('utf-8'))
+
+
+class Metrics:
+    """Thread-safe registry of tool, upstream and index phase metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools = {}
+        self._upstream = {}
+        self._phases = {}
+
+    @staticmethod
+    def _series(table, name, volume_key):
+        if name not in table:
+            table[name] = {'calls': 0, 'errors': 0, volume_key: 0, 'latency': Histogram()}
+        return table[name]
+
+    def record_call(self, tool, seconds, error=False, nbytes=0):
+        """Record one call of ``tool``."""
+        with self._lock:
+            series = self._series(self._tools, tool, 'bytes_returned')
+            series['calls'] += 1
+            series['errors'] += bool(error)
+            series['bytes_returned'] += nbytes
+            series['latency'].observe(seconds)
+
+    def record_upstream(self, service, seconds, error=False, nbytes=0):
+        """Record one request to an upstream ``service``."""
+        with self._lock:
+            series = self._series(self._upstream, service, 'bytes_received')
+            series['calls'] += 1
+            series['errors'] += bool(error)
+            series['bytes_received'] += nbytes
+            series['latency'].observe(seconds)
+
+    def record_phase(self, phase, seconds):
+        """Record how long one index build phase took."""
+        with self._lock:
+            histogram = self._phases.setdefault(phase, Histogram())
+            histogram.observe(seconds)
+
+    def instrument(self, name=None, is_error=None):
+        """
+        Decorator recording calls, errors, latency and result size of a tool.
+
+        Args:
+            name: Metric name (defaults to the function name).
+            is_error: Optional callable flagging results that report an error
+                instead of raising one.
+        """
+        def decorator(fn):
+            tool = name or fn.__name__
+
+            def finish(start, result, error):
+                if not error and is_error is not None:
+                    error = is_error(result)
+                nbytes = 0 if result is None else payload_bytes(result)
+                self.record_call(tool, time.perf_counter() - start, error, nbytes)
+
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        result = await fn(*args, **kwargs)
+                    except BaseException:
+                        finish(start, None, True)
+                        raise
+                    finish(start, result, False)
+                    return result
+            else:
+                @functools.wraps(fn)
+                def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        result = fn(*args, **kwargs)
+                    except BaseException:
+                        finish(start, None, True)
+                        raise
+                    finish(start, result, False)
+                    return result
+            return wrapper
+        return decorator
+
+    def reset(self):
+        """Drop every recorded metric."""
+        with self._lock:
+            self._tools.clear()
+            self._upstream.clear()
+            self._phases.clear()
+
+    def snapshot(self):
+        """Return all metrics as a JSON-serializable dictionary."""
+        def series_dict(table):
+            return {
+                name: {key: value.to_dict() if key == 'latency' else value
+                       for key, value in series.items()}
+                for name, series in table.items()
+            }
+
+        with self._lock:
+            return {
+                'tools': series_dict(self._tools),
+                'upstream': series_dict(self._upstream),
+                'index_phases': {
+                    phase: histogram.to_dict() for phase, histogram in self._phases.items()
+                },
+            }
+
+    def to_prometheus(self, prefix="mcp"):
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram_lines(metric, label, histogram):
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{label}}} {histogram.total}')
+            lines.append(f'{metric}_count{{{label}}} {histogram.count}')
+
+        def series_lines(kind, label_name, table, volume_key, volume_help):
+            metric = f"{prefix}_{kind}"
+            lines.append(f"# TYPE {metric}_calls_total counter")
+            lines.append(f"# TYPE {metric}_errors_total counter")
+            lines.append(f"# HELP {metric}_{volume_key}_total {volume_help}")
+            lines.append(f"# TYPE {metric}_{volume_key}_total counter")
+            lines.append(f"# TYPE {metric}_latency_seconds histogram")
+            for name, series in sorted(table.items()):
+                label = f'{label_name}="{name}"'
+                lines.append(f"{metric}_calls_total{{{label}}} {series['calls']}")
+                lines.append(f"{metric}_errors_total{{{label}}} {series['errors']}")
+                lines.append(f"{metric}_{volume_key}_total{{{label}}} {series[volume_key]}")
+                histogram_lines(f"{metric}_latency_seconds", label, series['latency'])
+
+        with self._lock:
+            series_lines("tool", "tool", self._tools, 'bytes_returned',
+                         "Bytes of tool results returned to clients.")
+            series_lines("upstream", "service", self._upstream, 'bytes_received',
+                         "Bytes received from upstream services.")
+            lines.append(f"# TYPE {prefix}_index_phase_seconds histogram")
+            for phase, histogram in sorted(self._phases.items()):
+                histogram_lines(f"{prefix}_index_phase_seconds", f'phase="{phase}"', histogram)
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,405 @@
+"""
+Memory-mapped, read-only BM25 index shared by every server process.
+
+The index and its documents are written as flat arrays into a single file
+next to the source zip (``fastmcp-main.zip.<name>.idx``):
+
+- the vocabulary (a UTF-8 blob with an offset table, sorted so terms are
+  looked up by binary search, plus the term id of every entry);
+- per text field, the CSC posting lists (``indptr``, ``doc_ids``,
+  ``impacts``), the per-term maximum impacts, term frequencies and
+  document lengths;
+- per position field, the term id, character offset and length of every
+  token of every document, with a per-document offset table;
+- per keyword field, the sorted distinct values and their document ids;
+- per document field, a UTF-8 content blob with an offset table (string
+  fields; the section ``content`` is zlib-compressed per document, see
+  ``doc_store``) or an int64 array (integer fields).
+
+``load_mapped`` maps the file read-only and wraps the arrays without
+copying them, so the page cache holds one copy of the index for all
+processes: workers start without refitting and an extra worker costs little
+more than the pages it actually touches. Documents are decoded only when a
+search returns them.
+
+Like ``index_store`` snapshots, the file records the SHA-256 of the archive,
+the settings the documents were built with and the archive manifest.
+"""
+
+import bisect
+import functools
+import json
+import mmap
+import os
+import tempfile
+from collections.abc import Sequence
+
+import numpy as np
+
+from bm25 import BM25Index
+from doc_store import (
+    COMPRESSED_FIELDS, CompressedStrings, PackedStrings, compress_strings, field_values, make_zdict,
+    pack_strings,
+)
+from index_store import POSITION_PARTS, archive_hash
+
+MAGIC = b"BM25MMAP"
+MAPPED_FORMAT = 3
+ALIGNMENT = 64
+
+
+def mapped_path(zip_path, name='sections'):
+    """Return the path of the ``name`` mapped index that belongs to ``zip_path``."""
+    return f"{zip_path}.{name}.idx"
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class MappedVocabulary:
+    """Term to term id lookup over a sorted, memory-mapped term list."""
+
+    def __init__(self, terms, term_ids):
+        self._terms = terms
+        self._term_ids = term_ids
+        # Query terms are looked up once per field, so remember recent ones
+        self._position = functools.lru_cache(maxsize=4096)(self._find)
+
+    def __len__(self):
+        return len(self._terms)
+
+    def _find(self, term):
+        encoded = term.encode('utf-8')
+        position = bisect.bisect_left(
+            range(len(self._terms)), encoded, key=self._terms.encoded
+        )
+        if position < len(self._terms) and self._terms.encoded(position) == encoded:
+            return position
+        return None
+
+    def get(self, term, default=None):
+        position = self._position(term)
+        return default if position is None else int(self._term_ids[position])
+
+    def __contains__(self, term):
+        return self._position(term) is not None
+
+    def __iter__(self):
+        return iter(self._terms)
+
+    def __getitem__(self, term):
+        position = self._position(term)
+        if position is None:
+            raise KeyError(term)
+        return int(self._term_ids[position])
+
+    def copy(self):
+        """Return a regular ``dict`` (``BM25Index.update`` copies the vocabulary)."""
+        return dict(zip(self._terms, self._term_ids.tolist()))
+
+
+class MappedKeywordIndex:
+    """Keyword value to sorted document ids, over memory-mapped arrays."""
+
+    def __init__(self, values, indptr, doc_ids):
+        self._values = MappedVocabulary(values, np.arange(len(values)))
+        self._indptr = indptr
+        self._doc_ids = doc_ids
+
+    def get(self, value, default=None):
+        if not isinstance(value, str):
+            return default
+        position = self._values.get(value)
+        if position is None:
+            return default
+        return self._doc_ids[self._indptr[position]:self._indptr[position + 1]]
+
+    def items(self):
+        """Every ``(value, doc_ids)`` pair, in value order."""
+        for position, value in enumerate(self._values):
+            yield value, self._doc_ids[self._indptr[position]:self._indptr[position + 1]]
+
+
+class MappedDocuments(Sequence):
+    """Documents decoded on access from memory-mapped columns."""
+
+    def __init__(self, columns, length):
+        self._columns = columns
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError(i)
+        return {
+            field: int(column[i]) if isinstance(column, np.ndarray) else column[i]
+            for field, column in self._columns.items()
+        }
+
+    def value(self, i, field):
+        """One field of one document (None if there is no such field)."""
+        column = self._columns.get(field)
+        if column is None:
+            return None
+        return int(column[i]) if isinstance(column, np.ndarray) else column[i]
+
+    def column(self, field):
+        """All values of a field (cheap for every field but the compressed ones)."""
+        column = self._columns.get(field)
+        if column is None:
+            return [None] * self._length
+        return column.tolist() if isinstance(column, np.ndarray) else list(column)
+
+    def fields(self, i):
+        """The field names of one document (the same for every document)."""
+        return tuple(self._columns)
+
+    def compressed_columns(self):
+        """The ``CompressedStrings`` of every compressed field."""
+        return {
+            field: column for field, column in self._columns.items()
+            if isinstance(column, CompressedStrings)
+        }
+
+
+def _document_columns(documents):
+    fields = list(documents[0]) if documents else []
+    arrays = {}
+    kinds = {}
+    for field in fields:
+        if any(set(doc) != set(fields) for doc in documents):
+            raise ValueError("mapped documents must all have the same fields")
+        values = [doc[field] for doc in documents]
+        if field in COMPRESSED_FIELDS and all(isinstance(value, str) for value in values):
+            kinds[field] = 'zlib'
+            zdict = make_zdict(values)
+            arrays[f'doc.{field}.zdict'] = np.frombuffer(zdict, dtype=np.uint8)
+            arrays[f'doc.{field}.blob'], arrays[f'doc.{field}.offsets'] = compress_strings(
+                values, zdict=zdict
+            )
+        elif all(isinstance(value, str) for value in values):
+            kinds[field] = 'str'
+            arrays[f'doc.{field}.blob'], arrays[f'doc.{field}.offsets'] = pack_strings(values)
+        elif all(isinstance(value, int) for value in values):
+            kinds[field] = 'int'
+            arrays[f'doc.{field}'] = np.array(values, dtype=np.int64)
+        else:
+            raise ValueError(f"field {field!r} must hold only strings or only integers")
+    return kinds, arrays
+
+
+def _index_arrays(index):
+    terms = sorted(index.vocabulary, key=lambda term: term.encode('utf-8'))
+    arrays = {}
+    arrays['vocabulary.blob'], arrays['vocabulary.offsets'] = pack_strings(terms)
+    arrays['vocabulary.term_ids'] = np.array(
+        [index.vocabulary[term] for term in terms], dtype=np.int64
+    )
+
+    for field in index.text_fields:
+        indptr, doc_ids, impacts = index.postings[field]
+        arrays[f'{field}.indptr'] = indptr
+        arrays[f'{field}.doc_ids'] = doc_ids
+        arrays[f'{field}.impacts'] = impacts
+        arrays[f'{field}.max_impacts'] = index.max_impacts[field]
+        arrays[f'{field}.term_freqs'] = index.term_freqs[field]
+        arrays[f'{field}.doc_lengths'] = index.doc_lengths[field]
+
+    for field, positions in index.positions.items():
+        for part, array in zip(POSITION_PARTS, positions):
+            arrays[f'pos.{field}.{part}'] = array
+
+    for field in index.keyword_fields:
+        ids_by_value = {}
+        for doc_id, value in enumerate(field_values(index.docs, field)):
+            ids_by_value.setdefault(value, []).append(doc_id)
+        values = sorted(
+            (value for value in ids_by_value if isinstance(value, str)),
+            key=lambda value: value.encode('utf-8')
+        )
+        arrays[f'kw.{field}.blob'], arrays[f'kw.{field}.offsets'] = pack_strings(values)
+        arrays[f'kw.{field}.indptr'] = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(ids_by_value[value]) for value in values], out=arrays[f'kw.{field}.indptr'][1:])
+        arrays[f'kw.{field}.doc_ids'] = np.array(
+            [doc_id for value in values for doc_id in ids_by_value[value]], dtype=np.int32
+        )
+
+    return arrays
+
+
+def save_mapped(index, documents, zip_path, digest=None, name='sections', settings=None,
+                manifest=None):
+    """
+    Write a fitted ``BM25Index`` and its documents as a mappable file.
+
+    Args:
+        index: A fitted ``BM25Index``.
+        documents: The document list the index was fitted on; every document
+            must have the same string or integer fields.
+        zip_path: Path of the archive the documents were extracted from.
+        digest: Precomputed ``archive_hash(zip_path)``, if already known.
+        name: File name suffix, to keep several document sets per archive.
+        settings: JSON-serializable settings the documents were built with.
+        manifest: Optional ``{filename: [crc, size]}`` of the archive entries.
+
+    Returns:
+        The path of the written file.
+    """
+    if digest is None:
+        digest = archive_hash(zip_path)
+
+    doc_fields, arrays = _document_columns(documents)
+    arrays.update(_index_arrays(index))
+
+    table = {}
+    offset = 0
+    for array_name, array in arrays.items():
+        offset = _align(offset)
+        table[array_name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+
+    header = json.dumps({
+        'format': MAPPED_FORMAT,
+        'archive_hash': digest,
+        'settings': settings or {},
+        'manifest': manifest,
+        'text_fields': index.text_fields,
+        'keyword_fields': index.keyword_fields,
+        'params': {'k1': index.k1, 'b': index.b, 'position_fields': index.position_fields},
+        'num_docs': len(documents),
+        'doc_fields': doc_fields,
+        'arrays': table,
+    }).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    # Write to a temporary file first: processes that mapped the previous
+    # file keep reading it, new ones open the complete replacement
+    path = mapped_path(zip_path, name)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + len(header).to_bytes(8, 'little') + header)
+            for array_name, array in arrays.items():
+                f.seek(data_start + table[array_name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return path
+
+
+def _open(path, settings):
+    """Map a file read-only; returns ``(index, documents, meta)`` or None."""
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        if buffer[:len(MAGIC)] != MAGIC:
+            return None
+        header_length = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+        meta = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + header_length])
+        if meta.get('format') != MAPPED_FORMAT or meta.get('settings') != (settings or {}):
+            return None
+        data_start = _align(len(MAGIC) + 8 + header_length)
+
+        def array(array_name):
+            spec = meta['arrays'][array_name]
+            count = int(np.prod(spec['shape']))
+            if count == 0:
+                return np.empty(spec['shape'], dtype=spec['dtype'])
+            return np.frombuffer(
+                buffer, dtype=spec['dtype'], count=count, offset=data_start + spec['offset']
+            ).reshape(spec['shape'])
+
+        def strings(prefix, kind='str'):
+            start = data_start + meta['arrays'][f'{prefix}.blob']['offset']
+            if kind == 'zlib':
+                return CompressedStrings(
+                    buffer, start, array(f'{prefix}.offsets'), array(f'{prefix}.zdict')
+                )
+            return PackedStrings(buffer, start, array(f'{prefix}.offsets'))
+
+        index = BM25Index(
+            text_fields=meta['text_fields'],
+            keyword_fields=meta['keyword_fields'],
+            **meta['params']
+        )
+        index.vocabulary = MappedVocabulary(strings('vocabulary'), array('vocabulary.term_ids'))
+        for field in index.text_fields:
+            index.postings[field] = (
+                array(f'{field}.indptr'), array(f'{field}.doc_ids'), array(f'{field}.impacts')
+            )
+            index.max_impacts[field] = array(f'{field}.max_impacts')
+            index.term_freqs[field] = array(f'{field}.term_freqs')
+            index.doc_lengths[field] = array(f'{field}.doc_lengths')
+        index.positions = {
+            field: tuple(array(f'pos.{field}.{part}') for part in POSITION_PARTS)
+            for field in index.position_fields
+        }
+        index.keyword_index = {
+            field: MappedKeywordIndex(
+                strings(f'kw.{field}'), array(f'kw.{field}.indptr'), array(f'kw.{field}.doc_ids')
+            )
+            for field in index.keyword_fields
+        }
+
+        columns = {
+            field: array(f'doc.{field}') if kind == 'int' else strings(f'doc.{field}', kind)
+            for field, kind in meta['doc_fields'].items()
+        }
+        index.docs = MappedDocuments(columns, meta['num_docs'])
+    except (KeyError, ValueError, TypeError):
+        return None
+
+    return index, index.docs, meta
+
+
+def load_mapped(zip_path, digest=None, name='sections', settings=None):
+    """
+    Map the index for ``zip_path`` if it was built from the same archive.
+
+    Returns:
+        A ``(index, documents)`` tuple, or None when there is no usable file
+        (missing, unreadable, other format, different archive or settings).
+    """
+    path = mapped_path(zip_path, name)
+    if not os.path.exists(path):
+        return None
+
+    if digest is None:
+        digest = archive_hash(zip_path)
+
+    mapped = _open(path, settings)
+    if mapped is None or mapped[2].get('archive_hash') != digest:
+        return None
+
+    index, documents, _ = mapped
+    return index, documents
+
+
+def load_previous_mapped(zip_path, name='sections', settings=None):
+    """
+    Map the index for ``zip_path`` even if the archive has changed since.
+
+    Returns:
+        An ``(index, documents, manifest)`` tuple for incremental updates, or
+        None when there is no compatible file or it has no manifest.
+    """
+    mapped = _open(mapped_path(zip_path, name), settings)
+    if mapped is None or mapped[2].get('manifest') is None:
+        return None
+
+    index, documents, meta = mapped
+    return index, documents, meta['manifest']
@@ -0,0 +1,264 @@
+"""
+Two-tier cache for pages fetched through r.jina.ai.
+
+Pages are kept in an in-memory LRU (bounded by ``max_entries``) backed by an
+on-disk store (bounded by ``max_disk_bytes``), both keyed by URL. Each entry
+records when it was fetched and the ``ETag`` / ``Last-Modified`` validators
+of the response. An entry is fresh for ``ttl`` seconds; during the following
+``stale_ttl`` seconds it may be served while it is revalidated in the
+background (stale-while-revalidate); after that it has to be revalidated
+before use. Revalidation sends the stored validators, so an unchanged page
+costs a 304 instead of a full download.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+
+def _key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+class PageCache:
+    """
+    A thread-safe memory + disk page cache with TTL and revalidation support.
+
+    Entries are dicts with 'url', 'body', 'etag', 'last_modified' and
+    'fetched_at' (wall-clock seconds, so disk entries survive restarts).
+
+    Attributes:
+        max_entries (int): Maximum number of pages kept in memory.
+        directory (str): Directory of the disk tier, or None for memory only.
+        max_disk_bytes (int): Byte budget of the disk tier.
+        ttl (float): Seconds a page is served without revalidation.
+        stale_ttl (float): Extra seconds a page may be served while it is
+            revalidated in the background.
+    """
+
+    def __init__(self, max_entries=128, directory=None, max_disk_bytes=64 * 2**20,
+                 ttl=300, stale_ttl=3600, clock=time.time):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.counters = dict.fromkeys([
+            'memory_hits', 'disk_hits', 'misses', 'stale_served',
+            'revalidations', 'not_modified', 'evictions', 'disk_evictions',
+            'disk_errors',
+        ], 0)
+        self._clock = clock
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()  # key -> file size, least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        # The directory is only created by the first page written to it
+        if directory and os.path.isdir(directory):
+            self._scan_disk()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.page")
+
+    def _scan_disk(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.page'):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name[:-len('.page')], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _read_disk(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                header, body = f.read().split(b'\n', 1)
+            entry = json.loads(header)
+            entry['body'] = body.decode('utf-8')
+            os.utime(self._path(key))
+        except (OSError, ValueError):
+            self._disk_bytes -= self._disk.pop(key, 0)
+            return None
+        self._disk.move_to_end(key)
+        return entry
+
+    def _write_disk(self, key, entry):
+        # Called without the lock: only the bookkeeping below takes it
+        meta = {name: value for name, value in entry.items() if name != 'body'}
+        data = json.dumps(meta).encode('utf-8') + b'\n' + entry['body'].encode('utf-8')
+        if len(data) > self.max_disk_bytes:
+            return
+
+        tmp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException as e:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            if not isinstance(e, OSError):
+                raise
+            # A read-only or full disk only loses the disk copy: the page stays in memory
+            with self._lock:
+                self.counters['disk_errors'] += 1
+            return
+
+        evicted = []
+        with self._lock:
+            self._disk_bytes += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            while self._disk_bytes > self.max_disk_bytes:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                evicted.append(old_key)
+                self.counters['disk_evictions'] += 1
+        for old_key in evicted:
+            try:
+                os.unlink(self._path(old_key))
+            except FileNotFoundError:
+                pass
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def state(self, entry):
+        """Return FRESH, STALE or EXPIRED for a cached entry."""
+        age = self._clock() - entry['fetched_at']
+        if age < self.ttl:
+            return FRESH
+        if age < self.ttl + self.stale_ttl:
+            return STALE
+        return EXPIRED
+
+    def lookup(self, url):
+        """
+        Find the cached page for ``url`` in memory, then on disk.
+
+        Returns:
+            An ``(entry, state)`` tuple, or ``(None, None)`` on a miss.
+            Entries found on disk are promoted to memory.
+        """
+        key = _key(url)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                tier = 'memory_hits'
+            elif self.directory and key in self._disk:
+                entry = self._read_disk(key)
+                tier = 'disk_hits'
+                if entry is not None:
+                    self._remember(key, entry)
+
+            if entry is None or entry['url'] != url:
+                self.counters['misses'] += 1
+                return None, None
+
+            state = self.state(entry)
+            if state == EXPIRED:
+                self.counters['misses'] += 1
+            else:
+                self.counters[tier] += 1
+                if state == STALE:
+                    self.counters['stale_served'] += 1
+            return entry, state
+
+    def validators(self, entry):
+        """Return the conditional request headers for revalidating ``entry``."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, body, etag=None, last_modified=None, revalidated=False):
+        """
+        Store a downloaded page and return its entry.
+
+        Blocking when there is a disk tier: the page is written there after
+        the lock is released, so lookups never wait for the disk.
+
+        Args:
+            url: The page URL.
+            body: The page text.
+            etag: The response ``ETag`` header, if any.
+            last_modified: The response ``Last-Modified`` header, if any.
+            revalidated: True when the page replaces a cached entry that was
+                revalidated (the page had changed).
+        """
+        entry = {
+            'url': url,
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': self._clock(),
+        }
+        key = _key(url)
+        with self._lock:
+            self.counters['revalidations'] += revalidated
+            self._remember(key, entry)
+        if self.directory:
+            self._write_disk(key, entry)
+        return entry
+
+    def refresh(self, url, entry):
+        """Mark ``entry`` fresh again after a 304 Not Modified answer."""
+        entry = dict(entry, fetched_at=self._clock())
+        key = _key(url)
+        with self._lock:
+            self.counters['revalidations'] += 1
+            self.counters['not_modified'] += 1
+            self._remember(key, entry)
+        if self.directory:
+            self._write_disk(key, entry)
+        return entry
+
+    def clear(self):
+        """Drop every entry from both tiers (counters are kept)."""
+        with self._lock:
+            self._memory.clear()
+            if self.directory:
+                for key in self._disk:
+                    try:
+                        os.unlink(self._path(key))
+                    except FileNotFoundError:
+                        pass
+            self._disk.clear()
+            self._disk_bytes = 0
+
+    def stats(self):
+        """Return the cache sizes and counters as a dictionary."""
+        with self._lock:
+            hits = self.counters['memory_hits'] + self.counters['disk_hits']
+            lookups = hits + self.counters['misses']
+            return {
+                'memory_entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_bytes,
+                'max_disk_bytes': self.max_disk_bytes if self.directory else 0,
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+                **self.counters,
+                'hit_rate': hits / lookups if lookups else 0.0,
+            }
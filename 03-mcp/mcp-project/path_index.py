@@ -0,0 +1,114 @@
+"""
+Path-prefix, glob and extension filters resolved before scoring.
+
+``PathIndex`` lays out the distinct values of a path keyword field (the
+``filename`` of the sections) in sorted order, each with its document ids,
+concatenated in the same order. All the paths under a directory are then
+one contiguous range found by binary search, and so are their document ids:
+resolving ``docs/servers/`` costs two bisections and a slice the size of
+that subtree, whatever the size of the corpus. Extensions get a precomputed
+lookup, and a glob is only matched against the paths that share its
+literal prefix.
+
+The resulting sorted document ids are handed to
+``BM25Index.search_ids(..., allowed_ids=...)``, so only the matching
+postings are ever scored.
+"""
+
+import bisect
+import fnmatch
+import functools
+import posixpath
+import re
+
+import numpy as np
+
+GLOB_CHARS = re.compile(r'[*?\[]')
+
+
+def _pattern_kind(pattern):
+    """'glob', 'extension' (``.mdx``) or 'prefix' (``docs/servers/``, or a full path)."""
+    if GLOB_CHARS.search(pattern):
+        return 'glob'
+    if pattern.startswith('.') and '/' not in pattern:
+        return 'extension'
+    return 'prefix'
+
+
+class PathIndex:
+    """
+    Sorted paths of a keyword field and the ids of their documents.
+
+    Attributes:
+        paths (list): Distinct paths, sorted.
+        indptr (np.ndarray): The documents of ``paths[p]`` are
+            ``doc_ids[indptr[p]:indptr[p + 1]]``.
+        doc_ids (np.ndarray): Document ids, grouped by path in path order.
+        extensions (dict): Lowercase extension (``.mdx``) to the positions
+            of its paths in ``paths``.
+    """
+
+    def __init__(self, keyword_index):
+        """
+        Args:
+            keyword_index: Path to sorted document ids, e.g.
+                ``BM25Index.keyword_index['filename']``.
+        """
+        entries = sorted(
+            (value, ids) for value, ids in keyword_index.items() if isinstance(value, str)
+        )
+        self.paths = [path for path, _ in entries]
+        self.indptr = np.zeros(len(entries) + 1, dtype=np.int64)
+        np.cumsum([len(ids) for _, ids in entries], out=self.indptr[1:])
+        self.doc_ids = np.concatenate(
+            [np.asarray(ids, dtype=np.int32) for _, ids in entries] or [np.empty(0, dtype=np.int32)]
+        )
+        extensions = {}
+        for position, path in enumerate(self.paths):
+            extensions.setdefault(posixpath.splitext(path)[1].lower(), []).append(position)
+        self.extensions = {
+            extension: np.array(positions, dtype=np.int64) for extension, positions in extensions.items()
+        }
+        # Scoped searches tend to stay in the same subtree, so remember recent ones
+        self._cached_select = functools.lru_cache(maxsize=256)(self._select)
+
+    def _prefix_range(self, prefix):
+        first = bisect.bisect_left(self.paths, prefix)
+        return first, bisect.bisect_left(self.paths, prefix + "\U0010ffff", first)
+
+    def _documents(self, positions):
+        return [self.doc_ids[self.indptr[p]:self.indptr[p + 1]] for p in positions]
+
+    def select(self, patterns):
+        """
+        Documents whose path matches any of the patterns.
+
+        Args:
+            patterns: Path prefixes (``docs/servers/``; a full path matches
+                itself), extensions (``.mdx``) or globs (``docs/*/context.mdx``,
+                where ``*`` also matches ``/``).
+
+        Returns:
+            np.ndarray: Sorted, distinct document ids (read-only).
+        """
+        return self._cached_select(tuple(patterns))
+
+    def _select(self, patterns):
+        parts = []
+        for pattern in patterns:
+            kind = _pattern_kind(pattern)
+            if kind == 'prefix':
+                first, last = self._prefix_range(pattern)
+                parts.append(self.doc_ids[self.indptr[first]:self.indptr[last]])
+            elif kind == 'extension':
+                parts += self._documents(self.extensions.get(pattern.lower(), []))
+            else:
+                first, last = self._prefix_range(pattern[:GLOB_CHARS.search(pattern).start()])
+                matcher = re.compile(fnmatch.translate(pattern)).match
+                parts += self._documents(p for p in range(first, last) if matcher(self.paths[p]))
+        doc_ids = np.sort(np.concatenate(parts or [np.empty(0, dtype=np.int32)]))
+        if len(patterns) > 1 and len(doc_ids):
+            # Patterns may overlap
+            doc_ids = doc_ids[np.concatenate([[True], doc_ids[1:] != doc_ids[:-1]])]
+        doc_ids.setflags(write=False)
+        return doc_ids
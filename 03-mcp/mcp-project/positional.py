@@ -0,0 +1,213 @@
+"""
+Phrase, proximity and prefix queries over compressed term positions.
+
+``PositionalIndex`` turns the forward positions of a ``BM25Index`` (the
+tokens of every document in text order) into an inverted positional index:
+for every posting of a term, the token positions of the term in that
+document, delta-encoded (first position, then the gaps between positions)
+and packed as variable-length integers (7 bits per byte, the high bit set
+on all but the last byte of a value). Most gaps fit in one byte, so the
+positions take about a byte per token instead of the 4 of an int32.
+
+The documents and counts of every posting come from the BM25 posting lists
+themselves, so a query decodes only the positions of its own terms:
+
+- a phrase (``"context object"``) keeps the occurrences of its first term
+  followed by the second term one position later, the third two positions
+  later, and so on;
+- a proximity query (``"context object"~5``) keeps the occurrences of its
+  first term that have every other term within 5 positions, in any order;
+- a prefix (``tool*``) becomes the most frequent vocabulary terms that
+  start with it.
+
+``parse_query`` reads that syntax out of a query string.
+"""
+
+import bisect
+import re
+
+import numpy as np
+
+from bm25 import tokenize
+
+# Most frequent vocabulary terms a prefix stands for
+MAX_PREFIX_TERMS = 20
+# Quoted phrases, with an optional ~distance, and words ending with *
+QUERY_SYNTAX = re.compile(r'"([^"]*)"(?:~(\d+))?|(\w+)\*')
+_DOC_SHIFT = 32
+
+
+def varint_sizes(values):
+    """Bytes taken by every value once packed by ``encode_varints``."""
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = np.ones(len(values), dtype=np.int64)
+    for bits in range(7, 64, 7):
+        sizes += values >= (np.uint64(1) << np.uint64(bits))
+    return sizes
+
+
+def encode_varints(values):
+    """Pack non-negative integers into variable-length bytes (uint8 array)."""
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = varint_sizes(values)
+    ends = np.cumsum(sizes)
+    shifts = (np.arange(int(ends[-1]) if len(ends) else 0) - np.repeat(ends - sizes, sizes)) * 7
+    data = (np.repeat(values, sizes) >> shifts.astype(np.uint64)) & np.uint64(0x7F)
+    # Continuation bit on every byte but the last of each value
+    data |= np.uint64(0x80)
+    data[ends - 1] &= np.uint64(0x7F)
+    return data.astype(np.uint8)
+
+
+def decode_varints(data):
+    """The integers packed by ``encode_varints`` (int64 array)."""
+    data = np.asarray(data, dtype=np.uint8)
+    if not (data & 0x80).any():
+        return data.astype(np.int64)
+    last = (data & 0x80) == 0
+    value_ids = np.cumsum(last) - last
+    starts = np.flatnonzero(np.concatenate([[True], last[:-1]]))
+    shifts = (np.arange(len(data)) - starts[value_ids]) * 7
+    parts = (data & 0x7F).astype(np.int64) << shifts
+    return np.bincount(value_ids, weights=parts, minlength=int(last.sum())).astype(np.int64)
+
+
+def parse_query(query):
+    """
+    Split the phrase, proximity and prefix operators out of a query.
+
+    Returns:
+        A ``(text, phrases, prefixes)`` tuple: the words to score (the plain
+        words and the words of the phrases), the ``(terms, distance)`` of
+        every phrase of two or more terms (distance 0 for exact phrases),
+        and the lowercase prefixes of two or more characters.
+    """
+    words, phrases, prefixes = [], [], []
+    end = 0
+    for match in QUERY_SYNTAX.finditer(query):
+        words.append(query[end:match.start()])
+        end = match.end()
+        phrase, distance, prefix = match.groups()
+        if prefix is not None:
+            if len(prefix) >= 2:
+                prefixes.append(prefix.lower())
+            continue
+        terms = tokenize(phrase)
+        words += terms
+        if len(terms) > 1:
+            phrases.append((terms, int(distance or 0)))
+    words.append(query[end:])
+    return " ".join(word.strip() for word in words if word.strip()), phrases, prefixes
+
+
+class PositionalIndex:
+    """
+    Compressed token positions of one field of a ``BM25Index``, by term.
+
+    Attributes:
+        field (str): The indexed text field.
+        byte_indptr (np.ndarray): The positions of term ``t`` are
+            ``data[byte_indptr[t]:byte_indptr[t + 1]]``, in the order of its
+            BM25 postings.
+        data (np.ndarray): Varint-packed position gaps (uint8).
+        terms (list): The vocabulary, sorted, for prefix lookups.
+    """
+
+    def __init__(self, index, field='content'):
+        """
+        Args:
+            index: A ``BM25Index`` with ``field`` among its ``position_fields``.
+            field: The text field.
+        """
+        self.index = index
+        self.field = field
+        indptr, term_ids, _, _ = index.positions[field]
+        num_terms = len(index.postings[field][0]) - 1
+        sizes = np.diff(indptr)
+        doc_ids = np.repeat(np.arange(len(sizes), dtype=np.int64), sizes)
+        positions = np.arange(len(term_ids), dtype=np.int64) - indptr[:-1][doc_ids]
+
+        # Term, then document, then position: the order of the BM25 postings
+        order = np.lexsort((positions, doc_ids, term_ids))
+        term_ids, doc_ids, positions = term_ids[order], doc_ids[order], positions[order]
+        gaps = positions.copy()
+        same_posting = (term_ids[1:] == term_ids[:-1]) & (doc_ids[1:] == doc_ids[:-1])
+        gaps[1:][same_posting] = np.diff(positions)[same_posting]
+
+        value_indptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=num_terms), out=value_indptr[1:])
+        self.data = encode_varints(gaps)
+        byte_offsets = np.concatenate([[0], np.cumsum(varint_sizes(gaps))])
+        self.byte_indptr = byte_offsets[value_indptr]
+        self.terms = sorted(index.vocabulary)
+
+    def occurrences(self, term):
+        """
+        Every position of ``term``, as sorted ``doc_id << 32 | position`` keys.
+        """
+        empty = np.empty(0, dtype=np.int64)
+        term_id = self.index.vocabulary.get(term)
+        if term_id is None or term_id + 1 >= len(self.byte_indptr):
+            return empty
+        indptr, doc_ids, _ = self.index.postings[self.field]
+        start, end = indptr[term_id], indptr[term_id + 1]
+        if start == end:
+            return empty
+        tfs = self.index.term_freqs[self.field][start:end].astype(np.int64)
+        gaps = decode_varints(self.data[self.byte_indptr[term_id]:self.byte_indptr[term_id + 1]])
+
+        # Undo the delta encoding within each posting
+        totals = np.cumsum(gaps)
+        first = np.cumsum(tfs) - tfs
+        positions = totals - np.repeat(totals[first] - gaps[first], tfs)
+        return (np.repeat(doc_ids[start:end].astype(np.int64), tfs) << _DOC_SHIFT) | positions
+
+    def phrase_docs(self, terms, distance=0):
+        """
+        Documents that contain a phrase.
+
+        Args:
+            terms: The terms of the phrase, in order.
+            distance: 0 for the exact phrase; otherwise every term must occur
+                within ``distance`` positions of the first one, in any order.
+
+        Returns:
+            tuple: Sorted ``doc_ids`` and the number of matches in each.
+        """
+        anchors = self.occurrences(terms[0])
+        for offset, term in enumerate(terms[1:], 1):
+            if not len(anchors):
+                break
+            keys = self.occurrences(term)
+            if distance == 0:
+                anchors = np.intersect1d(anchors, keys - offset, assume_unique=True)
+                continue
+            # The first occurrence at or after anchor - distance must not be past anchor + distance
+            nearest = np.searchsorted(keys, anchors - distance)
+            found = nearest < len(keys)
+            found[found] = keys[nearest[found]] <= anchors[found] + distance
+            anchors = anchors[found]
+        doc_ids, counts = np.unique(anchors >> _DOC_SHIFT, return_counts=True)
+        return doc_ids.astype(np.int32), counts
+
+    def prefix_terms(self, prefix, limit=MAX_PREFIX_TERMS):
+        """The ``limit`` terms starting with ``prefix`` that occur in the most documents."""
+        first = bisect.bisect_left(self.terms, prefix)
+        last = bisect.bisect_left(self.terms, prefix + "\U0010ffff", first)
+        indptr = self.index.postings[self.field][0]
+        frequencies = []
+        for term in self.terms[first:last]:
+            term_id = self.index.vocabulary[term]
+            if term_id + 1 < len(indptr) and indptr[term_id + 1] > indptr[term_id]:
+                frequencies.append((-int(indptr[term_id + 1] - indptr[term_id]), term))
+        return [term for _, term in sorted(frequencies)[:limit]]
+
+    def matching_docs(self, phrases, doc_ids=None):
+        """
+        Sorted ids of the documents that contain every ``(terms, distance)``
+        phrase, among ``doc_ids`` (sorted) if given.
+        """
+        for terms, distance in phrases:
+            matches, _ = self.phrase_docs(terms, distance)
+            doc_ids = matches if doc_ids is None else np.intersect1d(doc_ids, matches, assume_unique=True)
+        return doc_ids if doc_ids is not None else np.arange(len(self.index.docs), dtype=np.int32)
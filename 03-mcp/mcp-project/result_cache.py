@@ -0,0 +1,109 @@
+"""
+Bounded LRU cache for search results.
+
+Entries are evicted least-recently-used first once ``max_entries`` is
+reached and, when a ``ttl`` is set, expire that many seconds after they were
+stored. Hit, miss and eviction counters are kept so the hit rate can be
+reported. Call ``clear()`` whenever the underlying index changes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_query(query):
+    """Lowercase a query and collapse runs of whitespace."""
+    return " ".join(query.lower().split())
+
+
+def make_key(query, num_results, filters=None, **options):
+    """
+    Build a hashable cache key for a search call.
+
+    Args:
+        query: The raw query string (normalized here).
+        num_results: Number of results requested.
+        filters: Optional dict of filters applied to the search.
+        **options: Any other argument that changes the results.
+
+    Returns:
+        A tuple usable as a dictionary key.
+    """
+    return (
+        normalize_query(query),
+        num_results,
+        tuple(sorted((filters or {}).items())),
+        tuple(sorted(options.items())),
+    )
+
+
+class ResultCache:
+    """
+    A thread-safe LRU cache with an optional time-to-live.
+
+    Attributes:
+        max_entries (int): Maximum number of cached results.
+        ttl (float): Seconds an entry stays valid, or None to never expire.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that found nothing (or an expired entry).
+        evictions (int): Number of entries dropped to stay within max_entries.
+    """
+
+    def __init__(self, max_entries=256, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for ``key``, or ``default`` on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Store ``value`` under ``key``, evicting the oldest entries if full."""
+        if self.max_entries <= 0:
+            return
+        expires_at = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Return the cache size and counters as a dictionary."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
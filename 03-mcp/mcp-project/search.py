@@ -8,29 +8,33 @@ import os
 import zipfile
 from pathlib import Path
 from minsearch import Index
-import requests
+
+from archive_fetch import ArchiveFetcher
+from batch_search import search_many as batch_search_many
+from bm25 import BM25Index
+from incremental import read_manifest, update_from_archive
+from index_store import archive_hash, load_previous_snapshot, load_snapshot, save_snapshot
 
 # Global index variable
 _index = None
 _documents = None
 
+# Search engine: "bm25" (native) or "minsearch" (TF-IDF)
+SEARCH_ENGINE = os.environ.get("FASTMCP_SEARCH_ENGINE", "bm25")
+
 def download_fastmcp_zip():
     """Download the fastmcp repository zip file if not already present."""
     zip_path = "fastmcp-main.zip"
     
-    if os.path.exists(zip_path):
+    # A copy that is not a valid zip (e.g. an old interrupted download) is
+    # downloaded again, resuming a partial download if there is one
+    if os.path.exists(zip_path) and zipfile.is_zipfile(zip_path):
         print(f"✓ {zip_path} already exists")
         return zip_path
     
     url = "https://github.com/jlowin/fastmcp/archive/refs/heads/main.zip"
     print(f"Downloading {url}...")
-    
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    
-    with open(zip_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    ArchiveFetcher(url, zip_path).fetch()
     
     print(f"✓ Downloaded to {zip_path}")
     return zip_path
@@ -71,10 +75,13 @@ def extract_and_index_files(zip_path):
     
     return documents
 
-def build_index(documents):
-    """Create a minsearch index from the documents."""
+def build_index(documents, engine=None):
+    """Create a search index from the documents (SEARCH_ENGINE by default)."""
+    engine = engine or SEARCH_ENGINE
+    
     # Initialize the index
-    index = Index(
+    index_class = BM25Index if engine == "bm25" else Index
+    index = index_class(
         text_fields=['content', 'filename'],
         keyword_fields=['filename']
     )
@@ -95,15 +102,40 @@ def initialize_index():
     
     # Download the zip file
     zip_path = download_fastmcp_zip()
+    digest = archive_hash(zip_path)
     
-    # Extract and index files
-    print("Extracting and indexing md/mdx files...")
-    _documents = extract_and_index_files(zip_path)
+    # Reuse the saved index when it was built from this exact archive
+    snapshot = load_snapshot(zip_path, digest, engine=SEARCH_ENGINE)
+    if snapshot is not None:
+        _index, _documents = snapshot
+        print(f"✓ Loaded saved index with {len(_documents)} markdown files")
+        return _index, _documents
     
-    print(f"✓ Indexed {len(_documents)} markdown files")
+    # An index saved for an older archive only needs the changed files
+    previous = load_previous_snapshot(zip_path, engine=SEARCH_ENGINE)
+    if previous is not None:
+        index, documents, manifest = previous
+        _index, _documents, manifest, changes = update_from_archive(
+            index, documents, manifest, zip_path, build_index=build_index
+        )
+        print(f"✓ Updated saved index: {len(changes['changed'])} changed, "
+              f"{len(changes['deleted'])} deleted files")
+    else:
+        # Extract and index files
+        print("Extracting and indexing md/mdx files...")
+        _documents = extract_and_index_files(zip_path)
+        manifest = read_manifest(zip_path)
+        
+        print(f"✓ Indexed {len(_documents)} markdown files")
+        
+        # Create the index
+        _index = build_index(_documents)
     
-    # Create the index
-    _index = build_index(_documents)
+    # Save it so the next run can skip extraction and fitting
+    try:
+        save_snapshot(_index, _documents, zip_path, digest, manifest=manifest)
+    except OSError as e:
+        print(f"✗ Could not save index snapshot: {e}")
     
     return _index, _documents
 
@@ -125,6 +157,21 @@ def search(query: str, top_k: int = 5):
     
     return results
 
+def search_many(queries, top_k: int = 5):
+    """
+    Search the index with several queries in one vectorized pass.
+    
+    Args:
+        queries: List of search query strings
+        top_k: Number of results to return per query (default: 5)
+    
+    Returns:
+        List with one result list per query, in query order
+    """
+    index, documents = initialize_index()
+    
+    return batch_search_many(index, queries, num_results=top_k)
+
 def test_search():
     """Test the search functionality with various queries."""
     print("=" * 60)
@@ -1,47 +1,193 @@
 from fastmcp import FastMCP
-import requests
-import re
+import asyncio
+import json
 import os
+import threading
+import time
 import zipfile
-from minsearch import Index
+from contextlib import asynccontextmanager, contextmanager
+from starlette.responses import PlainTextResponse
+from archive_fetch import ArchiveFetcher, RefreshScheduler
+from chunking import MAX_TOKENS, OVERLAP_TOKENS, chunk_documents
+from corpora import CorpusRegistry, parse_corpora, search_shards
+from fetch import JinaFetcher
+from metrics import Metrics
+from page_cache import PageCache
+from result_cache import ResultCache, make_key
+from singleflight import SingleFlight
+from term_counter import count_terms
+
+# The search stack (numpy, scipy, and minsearch with pandas and scikit-learn)
+# is imported by the functions that use it, on the first search or index
+# build: a session that only reads URLs starts as fast as FastMCP itself
+# (python benchmark.py --startup)
+
+@asynccontextmanager
+async def _lifespan(server):
+    """Start warming up the docs index as soon as the server starts."""
+    if os.environ.get("FASTMCP_INDEX_WARMUP", "1") != "0":
+        _start_index_warmup()
+    refresh = None
+    if ARCHIVE_REFRESH_INTERVAL > 0:
+        refresh = RefreshScheduler(_refresh_fastmcp_archive, ARCHIVE_REFRESH_INTERVAL).start()
+    try:
+        yield {}
+    finally:
+        if refresh is not None:
+            refresh.stop()
+        await _fetcher.aclose()
 
 # Initialize FastMCP server
-mcp = FastMCP("jina-scraper")
+mcp = FastMCP("jina-scraper", lifespan=_lifespan)
+
+# Search engine for the docs index: "bm25" (native) or "minsearch" (TF-IDF)
+SEARCH_ENGINE = os.environ.get("FASTMCP_SEARCH_ENGINE", "bm25")
+
+# Files are indexed as heading-level sections of at most MAX_TOKENS words
+CHUNK_SETTINGS = {'max_tokens': MAX_TOKENS, 'overlap': OVERLAP_TOKENS}
+
+# The built-in corpus: the FastMCP docs index below. Other corpora are
+# registered in _corpora and searched through the corpora parameter
+FASTMCP_CORPUS = "fastmcp"
 
-# Global index variable for FastMCP search
+# Global index variable for FastMCP search (documents are the section chunks)
 _fastmcp_index = None
 _fastmcp_documents = None
+_fastmcp_manifest = None
+# Moves on whenever the index is (re)published; cached rankings are keyed by it
+_fastmcp_generation = 0
+
+# Serializes index builds and refreshes; concurrent identical builds and
+# downloads are coalesced into one in-flight operation by _flights
+_fastmcp_index_lock = threading.Lock()
+_flights = SingleFlight()
+_warmup_thread = None
+
+# Readiness and build progress of the docs index (status://fastmcp-index)
+_fastmcp_index_status = {
+    'state': "idle",  # idle, building, ready or failed
+    'phase': None,    # current build phase while building
+    'phases': {},     # seconds spent in each finished phase
+    'documents': 0,
+    'error': None,
+    'started_at': None,
+    'finished_at': None,
+}
+
+# Recent search_fastmcp_docs results, cleared whenever the index is (re)built
+_search_cache = ResultCache(
+    max_entries=int(os.environ.get("FASTMCP_SEARCH_CACHE_SIZE", "256")),
+    ttl=float(os.environ.get("FASTMCP_SEARCH_CACHE_TTL", "0")) or None,
+)
+
+# Rankings of recent queries, so later pages are sliced instead of re-scored
+RANKING_DEPTH = int(os.environ.get("FASTMCP_RANKING_DEPTH", "50"))
+_rankings = ResultCache(
+    max_entries=int(os.environ.get("FASTMCP_RANKING_CACHE_SIZE", "64")),
+    ttl=float(os.environ.get("FASTMCP_RANKING_TTL", "300")) or None,
+)
+
+# Fields a search_fastmcp_docs result can carry
+RESULT_FIELDS = ('filename', 'heading', 'snippet', 'highlights', 'content', 'score', 'corpus')
+
+# Retrieval modes of search_fastmcp_docs: BM25, hashed embeddings, both
+# fused by reciprocal rank, or BM25 with misspelled terms expanded
+SEARCH_MODES = ('sparse', 'dense', 'hybrid', 'fuzzy')
+
+# Dense, trigram, positional and path indexes per corpus, derived from its
+# BM25 index on first use; each (kind, corpus) is built by its own flight,
+# so a slow dense fit never holds up the other indexes
+DERIVED_KINDS = ('dense', 'fuzzy', 'positional', 'paths')
+_derived_indexes = {}
+_derived_flights = SingleFlight()
+
+# Per-tool calls, errors, latency and result bytes, upstream requests and
+# index build phases (metrics://tools, and /metrics on HTTP transports)
+_metrics = Metrics()
+
+def _tool_error(result):
+    """Tool results that report a failure instead of raising one."""
+    if isinstance(result, str):
+        return result.startswith("Error fetching content")
+    return isinstance(result, dict) and "error" in result
+
+_instrumented = _metrics.instrument(is_error=_tool_error)
+
+# Pages fetched by the URL tools: memory LRU plus a byte-bounded disk store
+_page_cache = PageCache(
+    max_entries=int(os.environ.get("JINA_PAGE_CACHE_SIZE", "128")),
+    directory=os.environ.get("JINA_PAGE_CACHE_DIR", ".page_cache") or None,
+    max_disk_bytes=int(os.environ.get("JINA_PAGE_CACHE_BYTES", str(64 * 2**20))),
+    ttl=float(os.environ.get("JINA_PAGE_CACHE_TTL", "300")),
+    stale_ttl=float(os.environ.get("JINA_PAGE_CACHE_STALE", "3600")),
+)
+
+# Pooled keep-alive client shared by the URL tools (base URL: JINA_READER_URL)
+_fetcher = JinaFetcher(cache=_page_cache, metrics=_metrics)
+
+async def fetch_jina_content(url: str) -> str:
+    """Fetch content using r.jina.ai through the shared connection pool."""
+    return await _fetcher.fetch_text(url)
 
 def get_jina_content(url: str) -> str:
     """
     Helper function to fetch content using r.jina.ai.
     This is separated to be easily importable for testing if needed,
-    though testing the tool endpoint is also valid.
+    though testing the tool endpoint is also valid. Blocking, and not
+    callable from a running event loop; the tools use fetch_jina_content.
     """
-    jina_url = f"https://r.jina.ai/{url}"
-    try:
-        response = requests.get(jina_url)
-        response.raise_for_status()
-        return response.text
-    except requests.RequestException as e:
-        return f"Error fetching content: {str(e)}"
+    return _fetcher.fetch_text_blocking(url)
+
+# The FastMCP archive: conditional, resumable and verified downloads
+# (archive_fetch.py), checked again every FASTMCP_ARCHIVE_REFRESH seconds
+# (0 disables the periodic refresh)
+_archive_fetcher = ArchiveFetcher(
+    os.environ.get("FASTMCP_ARCHIVE_URL", "https://github.com/jlowin/fastmcp/archive/refs/heads/main.zip"),
+    "fastmcp-main.zip",
+    metrics=_metrics,
+)
+ARCHIVE_REFRESH_INTERVAL = float(os.environ.get("FASTMCP_ARCHIVE_REFRESH", "86400"))
 
 def _download_fastmcp_zip():
     """Download the fastmcp repository zip file if not already present."""
-    zip_path = "fastmcp-main.zip"
+    if os.path.exists(_archive_fetcher.path) and zipfile.is_zipfile(_archive_fetcher.path):
+        return _archive_fetcher.path
     
-    if os.path.exists(zip_path):
-        return zip_path
-    
-    url = "https://github.com/jlowin/fastmcp/archive/refs/heads/main.zip"
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    
-    with open(zip_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    # Concurrent callers share one download
+    return _flights.do(f"download:{_archive_fetcher.path}", _archive_fetcher.ensure)
+
+def _download_to(url, path):
+    """Download ``url`` to ``path`` (resumable and verified) unless it is already there."""
+    if os.path.exists(path):
+        return path
+    return ArchiveFetcher(url, path, metrics=_metrics).ensure()
+
+def _refresh_fastmcp_archive():
+    """
+    Check the FastMCP archive for a new version and re-index what changed.
     
-    return zip_path
+    Returns:
+        The fetch outcome, with the 'changed' and 'deleted' files when a
+        new archive was downloaded.
+    """
+    # The fetcher serializes this with a start-up download of the archive
+    outcome = _archive_fetcher.fetch()
+    if outcome['result'] == "downloaded" and _fastmcp_index is not None:
+        outcome.update(_refresh_fastmcp_index(_archive_fetcher.path))
+    return outcome
+
+# Extra documentation corpora (FASTMCP_CORPORA="name=zip, URL or directory,..."),
+# one memory-mapped shard each, built in a process pool
+_corpora = CorpusRegistry(
+    CHUNK_SETTINGS,
+    directory=os.environ.get("FASTMCP_CORPORA_DIR", "corpora"),
+    max_workers=int(os.environ.get("FASTMCP_CORPUS_WORKERS", "0")) or None,
+    download=_download_to,
+)
+for _name, _source in parse_corpora(os.environ.get("FASTMCP_CORPORA", "")).items():
+    if _name == FASTMCP_CORPUS:
+        raise ValueError(f"{FASTMCP_CORPUS!r} is the built-in corpus; rename it in FASTMCP_CORPORA")
+    _corpora.register(_name, _source)
 
 def _extract_and_index_files(zip_path):
     """Extract md and mdx files from zip and prepare for indexing."""
@@ -80,47 +226,332 @@ def _extract_and_index_files(zip_path):
     return documents
 
 def _build_fastmcp_index(documents):
-    """Create a minsearch index from the documents."""
-    index = Index(
-        text_fields=['content', 'filename'],
-        keyword_fields=['filename']
-    )
+    """Create a search index from the section chunks using SEARCH_ENGINE."""
+    if SEARCH_ENGINE == "bm25":
+        from bm25 import BM25Index
+        
+        # Content positions give the snippets and highlights of the hits
+        index = BM25Index(
+            text_fields=['content', 'heading', 'filename'],
+            keyword_fields=['filename'],
+            position_fields=['content']
+        )
+    else:
+        from minsearch import Index
+        
+        index = Index(
+            text_fields=['content', 'heading', 'filename'],
+            keyword_fields=['filename']
+        )
     
     # Fit the index with all documents
     index.fit(documents)
     
     return index
 
+def _chunk_files(files):
+    """Split extracted files into the section chunks that get indexed."""
+    return chunk_documents(files, **CHUNK_SETTINGS)
+
+def _load_fastmcp_snapshot(zip_path, digest):
+    """The saved index of this exact archive, or None (mapped file for BM25)."""
+    if SEARCH_ENGINE == "bm25":
+        from mmap_store import load_mapped
+        return load_mapped(zip_path, digest, settings=CHUNK_SETTINGS)
+    
+    from doc_store import compress_documents
+    from index_store import load_snapshot
+    snapshot = load_snapshot(
+        zip_path, digest, engine=SEARCH_ENGINE,
+        name="sections", settings=CHUNK_SETTINGS
+    )
+    return snapshot and compress_documents(*snapshot)
+
+def _load_previous_fastmcp_snapshot(zip_path):
+    """The saved index of an older archive with its manifest, or None."""
+    if SEARCH_ENGINE == "bm25":
+        from mmap_store import load_previous_mapped
+        return load_previous_mapped(zip_path, settings=CHUNK_SETTINGS)
+    
+    from index_store import load_previous_snapshot
+    return load_previous_snapshot(
+        zip_path, engine=SEARCH_ENGINE,
+        name="sections", settings=CHUNK_SETTINGS
+    )
+
+def _save_fastmcp_snapshot(index, documents, manifest, zip_path, digest=None):
+    """
+    Save the index next to the zip; failures only cost the next start.
+    
+    BM25 indexes are saved as a memory-mapped file and reopened from it, so
+    every server process on the host shares one copy of the index. Otherwise
+    the section contents are kept compressed in memory.
+    
+    Returns:
+        The ``(index, documents)`` to serve: the mapped ones when available.
+    """
+    from doc_store import compress_documents
+    from index_store import save_snapshot
+    from mmap_store import load_mapped, save_mapped
+    
+    try:
+        if SEARCH_ENGINE != "bm25":
+            save_snapshot(
+                index, documents, zip_path, digest,
+                name="sections", settings=CHUNK_SETTINGS, manifest=manifest
+            )
+            return compress_documents(index, documents)
+        
+        save_mapped(index, documents, zip_path, digest, settings=CHUNK_SETTINGS, manifest=manifest)
+    except OSError:
+        return compress_documents(index, documents)
+    
+    mapped = load_mapped(zip_path, digest, settings=CHUNK_SETTINGS)
+    return mapped or compress_documents(index, documents)
+
+@contextmanager
+def _index_phase(name):
+    """Report ``name`` as the current build phase and record how long it took."""
+    _fastmcp_index_status['phase'] = name
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _fastmcp_index_status['phases'][name] = round(elapsed, 4)
+        _metrics.record_phase(name, elapsed)
+
+def _load_or_build_fastmcp_index():
+    """Load, update or build the docs index; returns (index, documents, manifest)."""
+    from incremental import read_manifest, update_from_archive
+    from index_store import archive_hash
+    
+    # Download the zip file
+    with _index_phase("download"):
+        zip_path = _download_fastmcp_zip()
+        digest = archive_hash(zip_path)
+    
+    # Reuse the saved index when it was built from this exact archive
+    with _index_phase("load_snapshot"):
+        snapshot = _load_fastmcp_snapshot(zip_path, digest)
+    if snapshot is not None:
+        index, documents = snapshot
+        return index, documents, read_manifest(zip_path)
+    
+    # An index saved for an older archive only needs the changed files
+    previous = _load_previous_fastmcp_snapshot(zip_path)
+    if previous is not None:
+        with _index_phase("update"):
+            index, documents, manifest, _ = update_from_archive(
+                *previous, zip_path,
+                build_index=_build_fastmcp_index, make_documents=_chunk_files
+            )
+    else:
+        # Extract files and split them into sections
+        with _index_phase("extract"):
+            files = _extract_and_index_files(zip_path)
+            documents = _chunk_files(files)
+            manifest = read_manifest(zip_path)
+        
+        # Create the index
+        with _index_phase("fit"):
+            index = _build_fastmcp_index(documents)
+    
+    # Save it so the next start can skip extraction and fitting
+    with _index_phase("save_snapshot"):
+        index, documents = _save_fastmcp_snapshot(index, documents, manifest, zip_path, digest)
+    
+    return index, documents, manifest
+
 def _initialize_fastmcp_index():
-    """Initialize the global FastMCP documentation index."""
-    global _fastmcp_index, _fastmcp_documents
+    """
+    Initialize the global FastMCP documentation index.
     
+    The build runs exactly once: concurrent callers (and the warm-up thread)
+    share one in-flight build and get its index, or its error.
+    """
     if _fastmcp_index is not None:
         return _fastmcp_index, _fastmcp_documents
+    return _flights.do("fastmcp-index", _build_and_publish_fastmcp_index)
+
+def _publish_fastmcp_index(index, documents, manifest):
+    """
+    Swap in a (re)built docs index; the caller holds _fastmcp_index_lock.
     
-    # Download the zip file
-    zip_path = _download_fastmcp_zip()
-    
-    # Extract and index files
-    _fastmcp_documents = _extract_and_index_files(zip_path)
+    Cached results are dropped and the generation that keys cached rankings
+    moves on, so a ranking still being computed on the old index is never
+    served for the new one.
+    """
+    global _fastmcp_index, _fastmcp_documents, _fastmcp_manifest, _fastmcp_generation
     
-    # Create the index
-    _fastmcp_index = _build_fastmcp_index(_fastmcp_documents)
+    # Publish the index last so lock-free readers never see it half set up,
+    # and only then move the generation on: a reader that sees the new
+    # generation also sees the new index
+    _fastmcp_documents, _fastmcp_manifest = documents, manifest
+    _search_cache.clear()
+    _rankings.clear()
+    _fastmcp_index = index
+    _fastmcp_generation += 1
+
+def _build_and_publish_fastmcp_index():
+    with _fastmcp_index_lock:
+        # The index may have been built while we were waiting
+        if _fastmcp_index is not None:
+            return _fastmcp_index, _fastmcp_documents
+        
+        _fastmcp_index_status.update(
+            state="building", phase=None, phases={}, error=None,
+            started_at=time.time(), finished_at=None
+        )
+        try:
+            index, documents, manifest = _load_or_build_fastmcp_index()
+        except Exception as e:
+            _fastmcp_index_status.update(
+                state="failed", phase=None, error=str(e), finished_at=time.time()
+            )
+            raise
+        
+        _publish_fastmcp_index(index, documents, manifest)
+        
+        _fastmcp_index_status.update(
+            state="ready", phase=None, documents=len(documents), finished_at=time.time()
+        )
     
     return _fastmcp_index, _fastmcp_documents
 
+async def _ensure_fastmcp_index():
+    """Return the index, waiting for the build in a worker thread if it is not ready."""
+    if _fastmcp_index is not None:
+        return _fastmcp_index, _fastmcp_documents
+    return await asyncio.to_thread(_initialize_fastmcp_index)
+
+def _warm_up_fastmcp_index():
+    try:
+        index, _ = _initialize_fastmcp_index()
+        if SEARCH_ENGINE == "bm25":
+            for kind in DERIVED_KINDS:
+                _derived_index(kind, FASTMCP_CORPUS, index)
+    except Exception:
+        # Recorded in the index status; the next search retries the build
+        pass
+    try:
+        _corpora.ensure()
+    except Exception:
+        # Recorded in the corpus status; the next search retries the build
+        pass
+
+def _start_index_warmup():
+    """Start building the docs index in a background thread, once."""
+    global _warmup_thread
+    
+    if _warmup_thread is not None or _fastmcp_index is not None:
+        return
+    _warmup_thread = threading.Thread(
+        target=_warm_up_fastmcp_index, name="fastmcp-index-warmup", daemon=True
+    )
+    _warmup_thread.start()
+
+def _refresh_fastmcp_index(zip_path="fastmcp-main.zip"):
+    """
+    Apply changes of the archive on disk to the in-memory index.
+    
+    Only entries whose CRC or size differ from the manifest of the current
+    index are extracted and re-indexed; the snapshot is updated as well.
+    
+    Returns:
+        A dict with the 'changed' and 'deleted' filenames.
+    """
+    from incremental import update_from_archive
+    
+    if _fastmcp_index is None:
+        _initialize_fastmcp_index()
+        return {'changed': [], 'deleted': []}
+    
+    with _fastmcp_index_lock:
+        index, documents, manifest, changes = update_from_archive(
+            _fastmcp_index, _fastmcp_documents, _fastmcp_manifest, zip_path,
+            build_index=_build_fastmcp_index, make_documents=_chunk_files
+        )
+        
+        if changes['changed'] or changes['deleted']:
+            index, documents = _save_fastmcp_snapshot(index, documents, manifest, zip_path)
+            _publish_fastmcp_index(index, documents, manifest)
+            _fastmcp_index_status['documents'] = len(documents)
+    
+    return changes
+
 @mcp.tool()
-def read_url(url: str) -> str:
+@_instrumented
+async def read_url(url: str) -> str:
     """
     Download the content of a web page using r.jina.ai.
     
     Args:
         url: The URL of the web page to download.
     """
-    return get_jina_content(url)
+    return await fetch_jina_content(url)
+
+async def _read_url_result(url, slots):
+    """Fetch one page of a read_urls batch and describe how it went."""
+    async with slots:
+        started = time.perf_counter()
+        content = await fetch_jina_content(url)
+        latency_ms = (time.perf_counter() - started) * 1000
+    
+    if content.startswith("Error"):
+        return {"url": url, "status": "error", "error": content, "latency_ms": latency_ms, "bytes": 0}
+    return {
+        "url": url,
+        "status": "ok",
+        "content": content,
+        "latency_ms": latency_ms,
+        "bytes": len(content.encode('utf-8')),
+    }
 
 @mcp.tool()
-def count_word_in_url(url: str, word: str) -> dict:
+@_instrumented
+async def read_urls(urls: list[str], max_concurrency: int = 8, deadline: float | None = None) -> dict:
+    """
+    Download several web pages in parallel using r.jina.ai.
+    
+    Args:
+        urls: The URLs of the web pages to download.
+        max_concurrency: Maximum number of pages fetched at the same time.
+        deadline: Optional overall time limit in seconds; pages not finished
+            by then are reported with status "timeout".
+    
+    Returns:
+        A dictionary with one result per URL (in input order, each with its
+        status, content or error, latency_ms and bytes), plus the number of
+        completed and timed out fetches and the total elapsed_ms.
+    """
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(max(1, max_concurrency))
+    tasks = [asyncio.create_task(_read_url_result(url, slots)) for url in urls]
+    
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    results = [
+        {"url": url, "status": "timeout", "latency_ms": None, "bytes": 0}
+        if task.cancelled() else task.result()
+        for url, task in zip(urls, tasks)
+    ]
+    timed_out = sum(result["status"] == "timeout" for result in results)
+    
+    return {
+        "results": results,
+        "completed": len(results) - timed_out,
+        "timed_out": timed_out,
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+    }
+
+@mcp.tool()
+@_instrumented
+async def count_word_in_url(url: str, word: str) -> dict:
     """
     Count occurrences of a word on a web page using r.jina.ai.
     
@@ -131,44 +562,534 @@ def count_word_in_url(url: str, word: str) -> dict:
     Returns:
         A dictionary with the count, character count, and some context.
     """
-    content = get_jina_content(url)
+    content = await fetch_jina_content(url)
     if content.startswith("Error"):
         return {"error": content, "count": 0}
     
-    # Count with word boundaries (case-insensitive)
-    pattern = r'\b' + re.escape(word) + r'\b'
-    word_boundary_count = len(re.findall(pattern, content, re.IGNORECASE))
-    
-    # Count simple substring (case-insensitive)
-    substring_count = content.lower().count(word.lower())
+    # One pass gives both the word-boundary and the substring count (case-insensitive)
+    counts = count_terms(content, [word])[word]
+    substring_count = counts['count_substring']
     
     return {
         "url": url,
         "word": word,
         "total_characters": len(content),
-        "count_word_boundaries": word_boundary_count,
+        "count_word_boundaries": counts['count_word_boundaries'],
         "count_substring": substring_count,
         "recommendation": f"Use substring count ({substring_count}) for general searches"
     }
 
 @mcp.tool()
-def search_fastmcp_docs(query: str, num_results: int = 5) -> list:
+@_instrumented
+async def count_words_in_url(url: str, words: list[str]) -> dict:
+    """
+    Count occurrences of several words on a web page in a single scan.
+    
+    Args:
+        url: The URL of the web page to search.
+        words: The words to count (case-insensitive).
+    
+    Returns:
+        A dictionary with the character count and, per word, the
+        word-boundary and substring counts.
+    """
+    content = await fetch_jina_content(url)
+    if content.startswith("Error"):
+        return {"error": content, "counts": {}}
+    
+    return {
+        "url": url,
+        "total_characters": len(content),
+        "counts": count_terms(content, words),
+    }
+
+def _select_corpora(corpora):
+    """Validate the corpora of a search; None selects every corpus."""
+    available = [FASTMCP_CORPUS] + _corpora.names
+    if corpora is None:
+        return available
+    selected = list(dict.fromkeys(corpora))
+    unknown = [name for name in selected if name not in available]
+    if unknown or not selected:
+        raise ValueError(
+            f"Unknown corpus: {', '.join(unknown) or '(none given)'}; "
+            f"available: {', '.join(available)}"
+        )
+    return selected
+
+def _select_fields(fields, selected):
+    """Validate the fields of a search; None gives the full results."""
+    if fields is None:
+        default = ['filename', 'heading', 'snippet', 'highlights', 'content']
+        return default if selected == [FASTMCP_CORPUS] else default + ['corpus']
+    unknown = [field for field in fields if field not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field: {', '.join(unknown)}; available: {', '.join(RESULT_FIELDS)}")
+    return list(dict.fromkeys(fields))
+
+def _shard_generation(name):
+    """Changes whenever the shard of corpus ``name`` is replaced."""
+    if name == FASTMCP_CORPUS:
+        return _fastmcp_generation
+    return _corpora.generation(name)
+
+async def _load_shards(selected):
+    """The ``(index, documents)`` of every selected corpus, in the given order."""
+    shards = {}
+    if FASTMCP_CORPUS in selected:
+        if len(selected) > 1 and SEARCH_ENGINE != "bm25":
+            raise ValueError("Searching several corpora needs FASTMCP_SEARCH_ENGINE=bm25")
+        shards[FASTMCP_CORPUS] = await _ensure_fastmcp_index()
+    others = [name for name in selected if name != FASTMCP_CORPUS]
+    if others:
+        shards.update(await asyncio.to_thread(_corpora.ensure, others))
+    return {name: shards[name] for name in selected}
+
+def _index_hits(name, index, query, depth, expansions=None, allowed_ids=None):
+    """The ``(name, doc_id, score)`` ranking of one index."""
+    if hasattr(index, 'search_ids'):
+        doc_ids, scores = index.search_ids(
+            query, num_results=depth, expansions=expansions, allowed_ids=allowed_ids
+        )
+        return [(name, int(doc_id), float(score)) for doc_id, score in zip(doc_ids, scores)]
+    # minsearch does not expose its scores
+    return [(name, doc['_id'], None) for doc in index.search(query, num_results=depth, output_ids=True)]
+
+def _fit_derived_index(kind, index):
+    """Build the derived index of ``kind`` (one of DERIVED_KINDS) from a BM25 index."""
+    if kind == 'dense':
+        from dense import DenseIndex
+        return DenseIndex().fit(index)
+    if kind == 'fuzzy':
+        from fuzzy import TrigramIndex
+        return TrigramIndex(index.vocabulary)
+    if kind == 'positional':
+        from positional import PositionalIndex
+        return PositionalIndex(index)
+    from path_index import PathIndex
+    return PathIndex(index.keyword_index['filename'])
+
+def _derived_index(kind, name, index):
+    """
+    The ``DenseIndex`` ('dense'), ``TrigramIndex`` ('fuzzy'),
+    ``PositionalIndex`` ('positional') or ``PathIndex`` ('paths') of a
+    corpus, built once per BM25 index.
+    
+    Concurrent callers for the same index share one build; builds of other
+    kinds or corpora run independently. Blocking: call it off the event loop.
+    """
+    cached = _derived_indexes.get((kind, name))
+    if cached is not None and cached[0] is index:
+        return cached[1]
+    
+    def fit():
+        derived = _fit_derived_index(kind, index)
+        _derived_indexes[kind, name] = (index, derived)
+        return derived
+    
+    # The index is alive while its flight runs, so its id cannot be reused
+    return _derived_flights.do((kind, name, id(index)), fit)
+
+def _fuzzy_expansions(shards, query):
+    """Spelling candidates of the query terms in every shard, with their weights."""
+    expansions = {}
+    for name, (index, _) in shards.items():
+        for term, weight in _derived_index("fuzzy", name, index).expand(query).items():
+            expansions[term] = max(weight, expansions.get(term, 0.0))
+    return expansions
+
+def _prefix_expansions(shards, prefixes):
+    """The vocabulary terms every ``prefix*`` of a query stands for, at full weight."""
+    expansions = {}
+    for name, (index, _) in shards.items():
+        positional = _derived_index("positional", name, index)
+        for prefix in prefixes:
+            expansions.update(dict.fromkeys(positional.prefix_terms(prefix), 1.0))
+    return expansions
+
+def _allowed_documents(shards, phrases, paths):
+    """
+    Per shard, the sorted ids of the documents under the ``paths`` filters
+    that contain every phrase, or None if the query restricts neither.
+    """
+    if not phrases and not paths:
+        return None
+    allowed = {}
+    for name, (index, _) in shards.items():
+        doc_ids = _derived_index("paths", name, index).select(paths) if paths else None
+        if phrases:
+            doc_ids = _derived_index("positional", name, index).matching_docs(phrases, doc_ids)
+        allowed[name] = doc_ids
+    return allowed
+
+def _dense_hits(shards, query, depth, allowed=None):
+    """
+    The ``(name, doc_id, score)`` cosine ranking of the dense indexes of the
+    shards, restricted to the ``allowed`` ids of each shard if given.
+    """
+    hits = []
+    for name, (index, _) in shards.items():
+        doc_ids, scores = _derived_index("dense", name, index).search_ids(
+            query, num_results=depth, allowed_ids=None if allowed is None else allowed[name]
+        )
+        hits += [(name, int(doc_id), float(score)) for doc_id, score in zip(doc_ids, scores)]
+    # Stable sort: equal scores keep the shard order
+    hits.sort(key=lambda hit: -hit[2])
+    return hits[:depth]
+
+async def _ranked_hits(query, selected, needed, mode="sparse", expansions=None, paths=None):
+    """
+    Rank a query over the selected corpora, at least ``needed`` results deep.
+    
+    Rankings are cached for a few minutes and computed RANKING_DEPTH deep,
+    so asking for the next page only slices the cached one. Hybrid rankings
+    fuse the sparse and dense ones with reciprocal rank fusion, and their
+    scores are the fused ones. Sparse rankings score the weighted
+    ``expansions`` terms with the query (fuzzy mode and prefixes). In every
+    mode, only the documents under the ``paths`` filters that contain the
+    phrases of the query are ranked.
+    
+    Returns:
+        The shards and their ``(name, doc_id, score)`` hits, best first.
+    """
+    from dense import reciprocal_rank_fusion
+    from positional import parse_query
+    
+    # Keyed by the build generation of every shard, unchanged while the
+    # shards were loaded: a ranking computed on a replaced shard is never
+    # served again (a first load builds the shards, so it is read twice)
+    while True:
+        generations = tuple((name, _shard_generation(name)) for name in selected)
+        shards = await _load_shards(selected)
+        if generations == tuple((name, _shard_generation(name)) for name in selected):
+            break
+    key = make_key(query, 0, mode=mode, paths=tuple(paths or ()), shards=generations)
+    cached = _rankings.get(key)
+    if cached is not None:
+        depth, hits = cached
+        if len(hits) >= needed or len(hits) < depth:
+            return shards, hits
+    
+    depth = max(needed, RANKING_DEPTH)
+    text, phrases, _ = parse_query(query)
+    allowed = None
+    if phrases or paths:
+        # The first such query on a corpus builds its path or positional index
+        allowed = await asyncio.to_thread(_allowed_documents, shards, phrases, paths)
+    if mode != "dense":
+        if len(shards) == 1:
+            [(name, (index, _))] = shards.items()
+            hits = _index_hits(name, index, text, depth, expansions, None if allowed is None else allowed[name])
+        else:
+            hits = await search_shards(shards, text, depth, expansions=expansions, allowed_ids=allowed)
+    if mode in ("dense", "hybrid"):
+        dense = await asyncio.to_thread(_dense_hits, shards, text, depth, allowed)
+        if mode == "dense":
+            hits = dense
+        else:
+            fused = reciprocal_rank_fusion([[hit[:2] for hit in hits], [hit[:2] for hit in dense]])
+            hits = [(name, doc_id, score) for (name, doc_id), score in fused[:depth]]
+    _rankings.put(key, (depth, hits))
+    return shards, hits
+
+def _hit_matches(index, doc_id, content, query, weights):
+    """Query term occurrences of a hit: stored positions, or a scan of minsearch hits."""
+    from snippets import scanned_matches, stored_matches
+    
+    if 'content' in getattr(index, 'positions', {}):
+        if index not in weights:
+            weights[index] = index.term_weights(query, 'content')
+        return stored_matches(index, doc_id, weights[index]), weights[index]
+    return scanned_matches(content, query)
+
+def _project(shards, hits, query, fields):
+    """Build results with only the requested fields; sections are read only if needed."""
+    from doc_store import document_value
+    from snippets import highlight
+    
+    results = []
+    weights = {}  # query term weights per index
+    for name, doc_id, score in hits:
+        index, documents = shards[name]
+        if {'content', 'snippet', 'highlights'} & set(fields):
+            content = document_value(documents, doc_id, 'content')
+        if 'snippet' in fields or 'highlights' in fields:
+            snippet, highlights = highlight(content, *_hit_matches(index, doc_id, content, query, weights))
+        result = {}
+        for field in fields:
+            if field == 'snippet':
+                result[field] = snippet
+            elif field == 'highlights':
+                result[field] = highlights
+            elif field == 'content':
+                result[field] = content
+            elif field == 'score':
+                result[field] = score
+            elif field == 'corpus':
+                result[field] = name
+            else:
+                result[field] = document_value(documents, doc_id, field)
+        results.append(result)
+    return results
+
+def _json_size(value):
+    return len(json.dumps(value).encode('utf-8'))
+
+def _fit_budget(results, max_bytes):
+    """
+    Make the JSON of ``results`` fit in ``max_bytes``.
+    
+    Results that do not fit even without content are dropped from the end;
+    the remaining budget goes to the contents, best result first, and every
+    content that had to be cut is marked with 'truncated'.
+    """
+    has_content = bool(results) and 'content' in results[0]
+    if has_content:
+        for result in results:
+            result['truncated'] = False
+    skeleton = [dict(result, content="") if has_content else result for result in results]
+    while results and _json_size(skeleton) > max_bytes:
+        results.pop()
+        skeleton.pop()
+    if not has_content:
+        return results
+    
+    remaining = max_bytes - _json_size(skeleton)
+    for result in results:
+        content = result['content']
+        cost = _json_size(content) - 2
+        if cost <= remaining:
+            remaining -= cost
+            continue
+        # Longest prefix whose JSON fits what is left
+        low, high = 0, len(content)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if _json_size(content[:middle]) - 2 <= remaining:
+                low = middle
+            else:
+                high = middle - 1
+        result['content'] = content[:low]
+        result['truncated'] = True
+        remaining -= _json_size(result['content']) - 2
+    return results
+
+@mcp.tool()
+@_instrumented
+async def search_fastmcp_docs(
+    query: str,
+    num_results: int = 5,
+    corpora: list[str] | None = None,
+    offset: int = 0,
+    fields: list[str] | None = None,
+    max_bytes: int | None = None,
+    mode: str = "sparse",
+    paths: list[str] | None = None,
+) -> list:
     """
-    Search the FastMCP documentation for relevant documents.
+    Search the FastMCP documentation for relevant sections.
     
     Args:
         query: The search query string.
         num_results: Number of results to return (default: 5).
+        corpora: Names of the documentation corpora to search (default: all
+            of them; "fastmcp" is the FastMCP documentation).
+        offset: Number of top results to skip, to get the next page of a
+            query (its ranking is cached, so later pages are not re-scored).
+        fields: Fields to return per result, among filename, heading,
+            snippet, highlights, content, score and corpus. Leaving out
+            content, snippet and highlights makes a cheap list of candidates.
+        max_bytes: Optional size limit of the response (JSON bytes): contents
+            are truncated to fit, best result first, and flagged 'truncated';
+            results that do not fit at all are left out.
+        mode: "sparse" (BM25 keyword search, the default), "dense" (hashed
+            embeddings, which also match other forms of a word and terms
+            used in the same contexts), "hybrid" (both rankings fused by
+            reciprocal rank; 'score' is then the fused score) or "fuzzy"
+            (keyword search that also matches terms one or two typos away
+            from the query terms, at a lower weight).
+        paths: Only search sections whose filename matches one of these
+            patterns: a path prefix ("docs/servers/"), an extension (".mdx")
+            or a glob ("docs/*/context.mdx", where * also matches /).
+    
+    The query may also hold "quoted phrases" (only sections containing the
+    exact phrase are returned), "proximity phrases"~5 (their words within
+    5 words of the first one) and prefix* words (matching every term that
+    starts with the prefix; not in dense mode).
     
     Returns:
-        A list of dictionaries containing the most relevant documents with 'filename' and 'content' fields.
+        A list of dictionaries with the most relevant sections: 'filename' of the
+        source file, 'heading' path of the section, a short 'snippet' (the part
+        of the section with the most query terms), 'highlights' (up to two such
+        passages with the matched terms in **bold**) and the section 'content'
+        (or the requested fields). When
+        other corpora are searched, each result also names its 'corpus'.
     """
-    index, documents = _initialize_fastmcp_index()
+    if offset < 0:
+        raise ValueError("offset must not be negative")
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown mode: {mode}; available: {', '.join(SEARCH_MODES)}")
+    if mode != "sparse" and SEARCH_ENGINE != "bm25":
+        raise ValueError(f"The {mode} mode needs FASTMCP_SEARCH_ENGINE=bm25")
+    selected = _select_corpora(corpora)
+    fields = _select_fields(fields, selected)
+    return await _search(query, num_results, selected, fields, offset, max_bytes, mode, paths)
+
+def _result_key(query, num_results, selected, fields, offset=0, max_bytes=None, mode="sparse", paths=None):
+    """Cache key of the results of one search, shared by both search tools."""
+    return make_key(
+        query, num_results, corpora=tuple(selected), offset=offset,
+        fields=tuple(fields), max_bytes=max_bytes, mode=mode, paths=tuple(paths or ())
+    )
+
+async def _search(query, num_results, selected, fields, offset=0, max_bytes=None, mode="sparse", paths=None):
+    """search_fastmcp_docs on validated corpora, fields and mode."""
+    from positional import parse_query
+    
+    # Repeated queries are answered from the cache
+    key = _result_key(query, num_results, selected, fields, offset, max_bytes, mode, paths)
+    cached = _search_cache.get(key)
+    if cached is not None:
+        return cached
     
-    # Search the index
-    results = index.search(query, num_results=num_results)
+    text, phrases, prefixes = parse_query(query)
+    if (phrases or prefixes) and SEARCH_ENGINE != "bm25":
+        raise ValueError("Phrase and prefix queries need FASTMCP_SEARCH_ENGINE=bm25")
+    if prefixes and mode == "dense":
+        # Embeddings have no notion of "every term starting with"
+        raise ValueError("Prefix queries (word*) need the sparse, hybrid or fuzzy mode")
+    if paths is not None:
+        if not paths or not all(paths):
+            raise ValueError("paths needs at least one pattern, and no empty ones")
+        if SEARCH_ENGINE != "bm25":
+            raise ValueError("Path filters need FASTMCP_SEARCH_ENGINE=bm25")
+    expansions = None
+    if mode == "fuzzy" or prefixes:
+        shards = await _load_shards(selected)
+        expansions = {}
+        if prefixes:
+            # The first prefix query on a corpus builds its positional index
+            expansions = await asyncio.to_thread(_prefix_expansions, shards, prefixes)
+        if mode == "fuzzy":
+            # The first query on a corpus builds its trigram index
+            fuzzy = await asyncio.to_thread(_fuzzy_expansions, shards, text)
+            for term, weight in fuzzy.items():
+                expansions.setdefault(term, weight)
+    shards, hits = await _ranked_hits(query, selected, offset + num_results, mode, expansions, paths)
+    # Spelling candidates and prefix terms are highlighted like typed terms
+    results = _project(
+        shards, hits[offset:offset + max(num_results, 0)], " ".join([text, *(expansions or {})]), fields
+    )
+    if max_bytes is not None:
+        results = _fit_budget(results, max_bytes)
+    _search_cache.put(key, results)
     
     return results
 
+@mcp.tool()
+@_instrumented
+async def search_fastmcp_docs_batch(
+    queries: list[str], num_results: int = 5, corpora: list[str] | None = None
+) -> list:
+    """
+    Search the FastMCP documentation with several queries in one call.
+    
+    All plain queries that are not cached are scored together in a single
+    pass, which is much cheaper than calling search_fastmcp_docs once per
+    query. Queries with phrases or prefixes, and searches over several
+    corpora, are run one by one.
+    
+    Args:
+        queries: The search query strings.
+        num_results: Number of results to return per query (default: 5).
+        corpora: Names of the documentation corpora to search (default: all
+            of them), as in search_fastmcp_docs.
+    
+    Returns:
+        A list with one {'query', 'results'} entry per query, in the same order;
+        'results' has the same format as search_fastmcp_docs.
+    """
+    from batch_search import search_ids_many
+    from positional import parse_query
+    
+    selected = _select_corpora(corpora)
+    fields = _select_fields(None, selected)
+    keys = [_result_key(query, num_results, selected, fields) for query in queries]
+    results = [_search_cache.get(key) for key in keys]
+    
+    missing = [i for i, cached in enumerate(results) if cached is None]
+    plain = []
+    if len(selected) == 1:
+        plain = [i for i in missing if parse_query(queries[i])[1:] == ([], [])]
+    batched = set(plain)
+    for i in missing:
+        if i not in batched:
+            results[i] = await _search(queries[i], num_results, selected, fields)
+    
+    # Score every plain query that missed the cache at once, off the event loop
+    if plain:
+        shards = await _load_shards(selected)
+        [(name, (index, _))] = shards.items()
+        texts = [parse_query(queries[i])[0] for i in plain]
+        rankings = await asyncio.to_thread(search_ids_many, index, texts, num_results=max(num_results, 0))
+        # minsearch does not expose its scores (see _index_hits)
+        scored = hasattr(index, 'search_ids')
+        for i, text, (doc_ids, scores) in zip(plain, texts, rankings):
+            hits = [
+                (name, int(doc_id), float(score) if scored else None)
+                for doc_id, score in zip(doc_ids, scores)
+            ]
+            results[i] = _project(shards, hits, text, fields)
+            _search_cache.put(keys[i], results[i])
+    
+    return [
+        {'query': query, 'results': query_results}
+        for query, query_results in zip(queries, results)
+    ]
+
+@mcp.resource("stats://search-cache")
+def search_cache_stats() -> dict:
+    """Size, hit/miss counters and hit rate of the search_fastmcp_docs result cache."""
+    return _search_cache.stats()
+
+@mcp.resource("stats://page-cache")
+def page_cache_stats() -> dict:
+    """Size, hit/miss and revalidation counters of the read_url page cache."""
+    return _page_cache.stats()
+
+@mcp.resource("metrics://tools")
+def tool_metrics() -> dict:
+    """Calls, errors, latency histograms and bytes per tool, upstream fetches and index phases."""
+    return _metrics.snapshot()
+
+# Prometheus scrape endpoint, served only by the HTTP transports
+_METRICS_PATH = os.environ.get("FASTMCP_METRICS_PATH", "/metrics")
+if _METRICS_PATH:
+    @mcp.custom_route(_METRICS_PATH, methods=["GET"])
+    async def prometheus_metrics(request):
+        return PlainTextResponse(_metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+@mcp.resource("status://corpora")
+def corpora_status() -> dict:
+    """State, source and size of every searchable documentation corpus."""
+    status = {FASTMCP_CORPUS: {
+        'source': "fastmcp-main.zip",
+        'state': _fastmcp_index_status['state'],
+        'documents': _fastmcp_index_status['documents'],
+        'error': _fastmcp_index_status['error'],
+    }}
+    status.update(_corpora.status())
+    return status
+
+@mcp.resource("status://fastmcp-index")
+def fastmcp_index_status() -> dict:
+    """Readiness of the FastMCP docs index and progress of its build."""
+    status = dict(_fastmcp_index_status, phases=dict(_fastmcp_index_status['phases']))
+    status['ready'] = _fastmcp_index is not None
+    status['archive'] = _archive_fetcher.status()
+    if status['state'] == "building":
+        status['elapsed'] = round(time.time() - status['started_at'], 3)
+    return status
+
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
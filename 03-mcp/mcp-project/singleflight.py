@@ -0,0 +1,97 @@
+"""
+Request coalescing ("single-flight") for identical concurrent operations.
+
+While an operation for a key is in flight, later callers with the same key
+do not start their own: they wait for the running one and share its result
+(or its exception). Once it finishes the key is released, so the next call
+runs the operation again. ``SingleFlight`` coalesces threads,
+``AsyncSingleFlight`` coalesces tasks of an event loop.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Thread-based single-flight group.
+
+    Attributes:
+        calls (int): Number of operations actually run.
+        coalesced (int): Number of calls that shared an operation in flight.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def do(self, key, fn):
+        """
+        Run ``fn()`` for ``key``, or wait for the call already running for it.
+
+        Returns:
+            The result of ``fn()``; its exception is raised in every caller.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio single-flight group.
+
+    The shared operation runs in its own task, so a caller that is cancelled
+    (e.g. by a deadline) does not cancel it for the others.
+
+    Attributes:
+        calls (int): Number of operations actually run.
+        coalesced (int): Number of calls that shared an operation in flight.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+
+    def _release(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    async def do(self, key, fn):
+        """
+        Await ``fn()`` for ``key``, or join the call already running for it.
+
+        Args:
+            key: Identifies the operation (e.g. a URL).
+            fn: Callable returning the coroutine to run.
+        """
+        task = self._in_flight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
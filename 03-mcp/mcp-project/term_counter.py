@@ -0,0 +1,186 @@
+"""
+Single-pass, case-insensitive counting of many terms at once.
+
+``TermCounter`` compiles the terms into an Aho-Corasick automaton and scans
+the text once (optionally in streamed chunks), counting for every term:
+
+- ``count_substring``: non-overlapping occurrences, like ``str.count`` on
+  the lowercased text;
+- ``count_word_boundaries``: non-overlapping occurrences delimited by
+  ``\\b``, like ``re.findall(r'\\b<term>\\b', text, re.IGNORECASE)``.
+
+While the automaton is at its root, the scan jumps straight to the next
+character that can start a term, so text that matches nothing is skipped
+at C speed.
+"""
+
+import re
+from collections import deque
+
+
+def _is_word(char):
+    return char.isalnum() or char == '_'
+
+
+class TermCounter:
+    """
+    Aho-Corasick counter for a fixed list of terms.
+
+    Feed the text with ``feed`` (any number of chunks), then call ``finish``.
+
+    Attributes:
+        terms (list): The distinct lowercased terms.
+        characters (int): Number of (lowercased) characters scanned so far.
+    """
+
+    def __init__(self, terms):
+        self.terms = list(dict.fromkeys(term.lower() for term in terms if term))
+        self.characters = 0
+        self._build()
+
+        count = len(self.terms)
+        self._substring = [0] * count
+        self._word = [0] * count
+        self._substring_end = [0] * count
+        self._word_end = [0] * count
+        self._state = 0
+        self._tail = ""
+        self._pending = []  # word matches waiting for the next character
+
+    def _build(self):
+        goto = [{}]
+        out = [[]]
+        for term_id, term in enumerate(self.terms):
+            state = 0
+            for char in term:
+                if char not in goto[state]:
+                    goto.append({})
+                    out.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            out[state].append(term_id)
+
+        # Breadth-first failure links; outputs of the fallback states are merged in
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in goto[state].items():
+                queue.append(target)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[target] = goto[fallback].get(char, 0)
+                if fail[target] == target:
+                    fail[target] = 0
+                out[target] = out[target] + out[fail[target]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        self._max_length = max(map(len, self.terms), default=0)
+        self._starts = re.compile(
+            "[" + "".join(re.escape(char) for char in goto[0]) + "]"
+        ) if goto[0] else None
+
+    def _previous_char(self, chunk, index):
+        if index >= 0:
+            return chunk[index]
+        if -index <= len(self._tail):
+            return self._tail[index]
+        return ""
+
+    def _resolve(self, term_id, end, next_char):
+        term = self.terms[term_id]
+        if _is_word(next_char) != _is_word(term[-1]) and end - len(term) >= self._word_end[term_id]:
+            self._word[term_id] += 1
+            self._word_end[term_id] = end
+
+    def _record(self, term_ids, chunk, end_in_chunk):
+        end = self.characters + end_in_chunk
+        for term_id in term_ids:
+            term = self.terms[term_id]
+            start = end - len(term)
+            if start >= self._substring_end[term_id]:
+                self._substring[term_id] += 1
+                self._substring_end[term_id] = end
+
+            before = self._previous_char(chunk, end_in_chunk - len(term) - 1)
+            if _is_word(before) == _is_word(term[0]):
+                continue
+            if end_in_chunk < len(chunk):
+                self._resolve(term_id, end, chunk[end_in_chunk])
+            else:
+                self._pending.append((term_id, end))
+
+    def feed(self, text):
+        """Scan the next chunk of text."""
+        chunk = text.lower()
+        if not chunk or self._starts is None:
+            self.characters += len(chunk)
+            return
+        for term_id, end in self._pending:
+            self._resolve(term_id, end, chunk[0])
+        self._pending = []
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = self._state
+        position = 0
+        length = len(chunk)
+        while position < length:
+            if state == 0:
+                match = self._starts.search(chunk, position)
+                if match is None:
+                    break
+                position = match.start()
+            char = chunk[position]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            position += 1
+            if out[state]:
+                self._record(out[state], chunk, position)
+
+        self._state = state
+        self._tail = (self._tail + chunk)[-self._max_length:]
+        self.characters += length
+
+    def finish(self):
+        """
+        End the text and return the counts.
+
+        Returns:
+            ``{term: {'count_word_boundaries': int, 'count_substring': int}}``
+            for every (lowercased) term.
+        """
+        for term_id, end in self._pending:
+            self._resolve(term_id, end, "")
+        self._pending = []
+        return {
+            term: {
+                'count_word_boundaries': self._word[term_id],
+                'count_substring': self._substring[term_id],
+            }
+            for term_id, term in enumerate(self.terms)
+        }
+
+
+def count_terms(text, terms):
+    """
+    Count several terms in ``text`` with a single scan.
+
+    Args:
+        text: The text to scan.
+        terms: The terms to count (case-insensitive).
+
+    Returns:
+        A dict mapping every given term to its ``count_word_boundaries``
+        and ``count_substring``.
+    """
+    counter = TermCounter(terms)
+    counter.feed(text)
+    counts = counter.finish()
+    return {
+        term: counts.get(term.lower(), {'count_word_boundaries': 0, 'count_substring': 0})
+        for term in terms
+    }
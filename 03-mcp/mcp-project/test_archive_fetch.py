@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+"""
+Tests for conditional, resumable archive downloads against a local stub (no network needed).
+"""
+
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+
+import requests
+
+import server
+from archive_fetch import ArchiveFetcher, RefreshScheduler, verify_zip
+from test_fetch import QuietServer
+from test_index_store import DOCS, make_zip
+from test_server_index import isolated_index
+
+
+def zip_bytes(files):
+    """An in-memory archive with ``files``; stored, so its size is predictable."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+def random_zip(seed, size=200_000):
+    rng = random.Random(seed)
+    return zip_bytes({"fastmcp-main/data.bin": bytes(rng.getrandbits(8) for _ in range(size))})
+
+
+class StubArchive(BaseHTTPRequestHandler):
+    """
+    Serves ``body`` with an ETag, honouring If-None-Match, Range and If-Range;
+    with ``cut_at`` set, hangs up after sending that many bytes of the body.
+    """
+    protocol_version = "HTTP/1.1"
+    body = b""
+    etag = '"v1"'
+    cut_at = None
+    requests = []
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == cls.etag:
+            self.send_response(304)
+            self.send_header("ETag", cls.etag)
+            self.end_headers()
+            return
+
+        start = 0
+        byte_range = self.headers.get("Range")
+        if byte_range and self.headers.get("If-Range", cls.etag) == cls.etag:
+            start = int(byte_range.split("=")[1].rstrip("-"))
+            if start >= len(cls.body):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        payload = cls.body[start:]
+        self.send_response(206 if start else 200)
+        self.send_header("ETag", cls.etag)
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(cls.body) - 1}/{len(cls.body)}")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if cls.cut_at is not None:
+            self.wfile.write(payload[:cls.cut_at])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def stub_archive(body, etag='"v1"'):
+    """Serve ``body`` on a free local port and yield its URL."""
+    StubArchive.body, StubArchive.etag, StubArchive.cut_at = body, etag, None
+    StubArchive.requests = []
+    httpd = QuietServer(("127.0.0.1", 0), StubArchive)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}/main.zip"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_conditional_download():
+    """An unchanged archive costs a 304; a changed one replaces the local copy."""
+    first, second = random_zip(0), random_zip(1)
+    with tempfile.TemporaryDirectory() as tmp, stub_archive(first) as url:
+        fetcher = ArchiveFetcher(url, os.path.join(tmp, "fastmcp-main.zip"), chunk_size=4096)
+        assert fetcher.fetch() == {'result': "downloaded", 'bytes': len(first), 'resumed_from': None}
+        with open(fetcher.path, 'rb') as f:
+            assert f.read() == first
+        assert fetcher.status()['etag'] == '"v1"'
+
+        assert fetcher.fetch()['result'] == "not_modified"
+        assert StubArchive.requests[-1]["If-None-Match"] == '"v1"'
+        assert fetcher.ensure() == fetcher.path and len(StubArchive.requests) == 2
+
+        StubArchive.body, StubArchive.etag = second, '"v2"'
+        assert fetcher.fetch()['result'] == "downloaded"
+        with open(fetcher.path, 'rb') as f:
+            assert f.read() == second
+        status = fetcher.status()
+        assert status['etag'] == '"v2"' and status['result'] == "downloaded" and status['error'] is None
+        assert not os.path.exists(fetcher.part_path)
+
+    print("✓ Conditional downloads")
+
+
+def test_resume_after_interruption():
+    """An interrupted download resumes with a Range request, unless the archive changed."""
+    body = random_zip(2)
+    with tempfile.TemporaryDirectory() as tmp, stub_archive(body) as url:
+        fetcher = ArchiveFetcher(url, os.path.join(tmp, "fastmcp-main.zip"), chunk_size=4096)
+        StubArchive.cut_at = 80_000
+        try:
+            fetcher.fetch()
+            assert False, "expected the download to fail"
+        except requests.RequestException:
+            pass
+        assert not os.path.exists(fetcher.path)
+        # Whole chunks only: the one cut short is read again
+        partial = os.path.getsize(fetcher.part_path)
+        assert 80_000 - 4096 < partial <= 80_000
+        assert fetcher.status()['result'] == "failed" and fetcher.status()['partial_bytes'] == partial
+
+        StubArchive.cut_at = None
+        outcome = fetcher.fetch()
+        assert outcome == {'result': "downloaded", 'bytes': len(body) - partial, 'resumed_from': partial}
+        assert StubArchive.requests[-1]["Range"] == f"bytes={partial}-"
+        with open(fetcher.path, 'rb') as f:
+            assert f.read() == body
+
+        # A partial download of an older version starts over
+        os.unlink(fetcher.path)
+        StubArchive.cut_at = 50_000
+        try:
+            fetcher.fetch()
+        except requests.RequestException:
+            pass
+        StubArchive.body, StubArchive.etag, StubArchive.cut_at = random_zip(3), '"v2"', None
+        outcome = fetcher.fetch()
+        assert outcome['resumed_from'] is None and outcome['bytes'] == len(StubArchive.body)
+        with open(fetcher.path, 'rb') as f:
+            assert f.read() == StubArchive.body
+
+    print("✓ Resumed downloads")
+
+
+def test_corrupt_download_is_rejected():
+    """A corrupt archive never replaces the local copy; a corrupt local copy is replaced."""
+    good = random_zip(4)
+    corrupt = bytearray(good)
+    corrupt[len(corrupt) // 2] ^= 0xFF
+    with tempfile.TemporaryDirectory() as tmp, stub_archive(good) as url:
+        fetcher = ArchiveFetcher(url, os.path.join(tmp, "fastmcp-main.zip"))
+        fetcher.fetch()
+
+        StubArchive.body, StubArchive.etag = bytes(corrupt), '"v2"'
+        try:
+            fetcher.fetch()
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert "CRC" in str(e)
+        with open(fetcher.path, 'rb') as f:
+            assert f.read() == good
+        assert not os.path.exists(fetcher.part_path)
+        assert fetcher.status()['etag'] == '"v1"'
+
+        try:
+            verify_zip(fetcher.path, expected_size=len(good) + 1)
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert "Incomplete" in str(e)
+
+        # A truncated local copy (e.g. from an older version) is downloaded again
+        StubArchive.body, StubArchive.etag = good, '"v3"'
+        with open(fetcher.path, 'wb') as f:
+            f.write(good[:1000])
+        assert fetcher.ensure() == fetcher.path
+        assert "If-None-Match" not in StubArchive.requests[-1]
+        verify_zip(fetcher.path, len(good))
+
+    print("✓ Corrupt archives rejected")
+
+
+def test_scheduled_refresh():
+    """The server re-indexes the archive when the scheduled check downloads a new one."""
+    calls = []
+    scheduler = RefreshScheduler(lambda: calls.append(1) or 1 / (len(calls) % 2), 0.01).start()
+    deadline = time.time() + 5
+    while len(calls) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    scheduler.stop()
+    assert len(calls) >= 3 and scheduler.runs >= 3
+
+    updated = dict(DOCS, **{"fastmcp-main/docs/servers/sampling.mdx": "# Sampling\nAsk the client LLM for a completion."})
+    saved = server._archive_fetcher
+    with isolated_index(files=DOCS) as builds, stub_archive(zip_bytes(updated)) as url:
+        zip_path = server._download_fastmcp_zip()
+        asyncio.run(server.search_fastmcp_docs.fn("context", 1))
+        server._archive_fetcher = ArchiveFetcher(url, zip_path)
+        try:
+            outcome = server._refresh_fastmcp_archive()
+            assert outcome['result'] == "downloaded"
+            assert outcome['changed'] == ["docs/servers/sampling.mdx"] and len(builds) == 1
+            [result] = asyncio.run(server.search_fastmcp_docs.fn("sampling completion", 1))
+            assert result['filename'] == "docs/servers/sampling.mdx"
+
+            assert server._refresh_fastmcp_archive() == {'result': "not_modified", 'bytes': 0, 'resumed_from': None}
+            assert server.fastmcp_index_status.fn()['archive']['etag'] == '"v1"'
+        finally:
+            server._archive_fetcher = saved
+
+    print("✓ Scheduled refresh")
+
+
+if __name__ == "__main__":
+    print("Running archive fetch tests...\n")
+
+    try:
+        test_conditional_download()
+        test_resume_after_interruption()
+        test_corrupt_download_is_rejected()
+        test_scheduled_refresh()
+
+        print("\n✅ All archive fetch tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+Tests for batch search (no network needed).
+"""
+
+import sys
+
+from batch_search import search_many
+from search import build_index
+from test_bm25 import make_documents
+
+QUERIES = ["server", "tool context", "python async demo", "unknownterm", "auth auth middleware", ""]
+
+
+def test_batch_matches_single_queries():
+    """Each query of a batch gets the same results as searching it alone."""
+    documents = make_documents(300, seed=2)
+
+    for engine in ["bm25", "minsearch"]:
+        index = build_index(documents, engine=engine)
+        batch = search_many(index, QUERIES, num_results=5)
+        assert len(batch) == len(QUERIES)
+
+        for query, results in zip(QUERIES, batch):
+            expected = index.search(query, num_results=5)
+            assert [d['filename'] for d in results] == [d['filename'] for d in expected], (engine, query)
+
+        # Filters apply to every query of the batch
+        target = documents[3]['filename']
+        filtered = search_many(index, QUERIES, filter_dict={'filename': target}, num_results=5)
+        for query, results in zip(QUERIES, filtered):
+            assert all(d['filename'] == target for d in results)
+            expected = index.search(query, filter_dict={'filename': target}, num_results=5)
+            assert len(results) == len(expected), (engine, query)
+
+    print("✓ Batch results match single-query results")
+
+
+def test_empty_batch_and_index():
+    """Empty inputs return empty results instead of failing."""
+    index = build_index(make_documents(10), engine="bm25")
+    assert search_many(index, []) == []
+    assert search_many(build_index([], engine="bm25"), ["server"]) == [[]]
+
+    print("✓ Empty batches and indexes")
+
+
+if __name__ == "__main__":
+    try:
+        test_batch_matches_single_queries()
+        test_empty_batch_and_index()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
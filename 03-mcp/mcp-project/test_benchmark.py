@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Tests for the benchmark corpus generator and regression check (no network needed).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmark import check_startup, compare, import_profile, latency_summary, make_corpus, make_queries
+from search import build_index, extract_and_index_files
+
+
+def test_synthetic_corpus():
+    """Generated archives have the fastmcp-main layout and are reproducible."""
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = make_corpus(os.path.join(tmp, "a.zip"), 60, seed=3)
+        documents = extract_and_index_files(zip_path)
+
+        assert len(documents) == 60
+        assert sum(d['filename'].endswith("README.md") for d in documents) == 3
+        assert all(d['filename'].startswith(("docs/", "examples/")) for d in documents)
+        assert all(d['content'].startswith("# ") and "\n## " in d['content'] for d in documents)
+
+        again = extract_and_index_files(make_corpus(os.path.join(tmp, "b.zip"), 60, seed=3))
+        assert again == documents
+
+        # Generated queries hit the generated text
+        index = build_index(documents)
+        queries = make_queries(20)
+        assert queries == make_queries(20)
+        assert sum(bool(index.search(query)) for query in queries) >= 15
+
+    print("✓ Synthetic corpus generator")
+
+
+def test_regression_check():
+    """compare flags slowdowns beyond the tolerance and ignores noise."""
+    def report(build_s, p95_ms):
+        latency = latency_summary([p95_ms / 1000] * 10)
+        return {'results': [{
+            'docs': 1000, 'build_s': build_s, 'server_build_s': build_s,
+            'search': latency, 'search_fastmcp_docs': latency,
+        }]}
+
+    baseline = report(1.0, 2.0)
+    assert compare(report(1.1, 2.1), baseline, tolerance=1.25) == []
+    assert compare(report(1.0, 0.3), report(1.0, 0.2), tolerance=1.25) == []  # below the noise floor
+
+    regressions = compare(report(2.0, 5.0), baseline, tolerance=1.25)
+    assert len(regressions) == 4
+    assert regressions[0].startswith("1000 docs: build_s 1.0 -> 2.0")
+
+    # The baseline is never overwritten by the run compared with it
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "benchmark_results.json")
+        with open(path, 'w') as f:
+            json.dump(baseline, f)
+        run = subprocess.run(
+            [sys.executable, "benchmark.py", "--sizes", "10", "--compare", path, "--output", path],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+        )
+        assert run.returncode == 2 and "overwrite" in run.stderr
+        with open(path) as f:
+            assert json.load(f) == baseline
+
+    print("✓ Regression check")
+
+
+def test_startup_check():
+    """server.py imports no part of the search stack; slow starts are flagged."""
+    profile = import_profile("server")
+    assert profile['heavy'] == [] and profile['import_s'] > 0
+    assert "fastmcp" in profile['slowest']
+
+    def startup(seconds, heavy=()):
+        return {'import_s': seconds, 'ready_s': seconds, 'first_tool_s': seconds, 'heavy': list(heavy)}
+
+    assert check_startup({'basic_server': startup(1.0), 'server': startup(1.1)}, tolerance=1.25) == []
+    problems = check_startup({'basic_server': startup(1.0), 'server': startup(2.0, ["numpy"])}, tolerance=1.25)
+    assert len(problems) == 4 and problems[-1] == "server: imports numpy at start-up"
+
+    print("✓ Start-up check")
+
+
+if __name__ == "__main__":
+    try:
+        test_synthetic_corpus()
+        test_regression_check()
+        test_startup_check()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Tests for the native BM25 engine (no network needed).
+"""
+
+import math
+import random
+import sys
+from collections import Counter
+
+from bm25 import BM25Index, tokenize
+
+WORDS = ["server", "tool", "context", "client", "resource", "prompt", "python",
+         "async", "demo", "transport", "auth", "middleware", "logging", "test"]
+
+
+def make_documents(n, seed=0):
+    rng = random.Random(seed)
+    documents = []
+    for i in range(n):
+        words = rng.choices(WORDS, weights=range(len(WORDS), 0, -1), k=rng.randint(5, 60))
+        documents.append({
+            'filename': f"docs/{rng.choice(['servers', 'clients'])}/page{i}.mdx",
+            'content': " ".join(words),
+        })
+    return documents
+
+
+def brute_force_scores(documents, query, fields, k1=1.2, b=0.75, boost_dict=None):
+    """Score every document with the textbook BM25 formula."""
+    boost_dict = boost_dict or {}
+    n = len(documents)
+    scores = [0.0] * n
+    query_terms = Counter(tokenize(query))
+
+    for field in fields:
+        counts = [Counter(tokenize(doc[field])) for doc in documents]
+        lengths = [sum(c.values()) for c in counts]
+        avg_length = sum(lengths) / n
+        for term, qtf in query_terms.items():
+            df = sum(1 for c in counts if term in c)
+            if df == 0:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for i, c in enumerate(counts):
+                tf = c.get(term, 0)
+                if tf:
+                    norm = k1 * (1 - b + b * lengths[i] / avg_length)
+                    scores[i] += boost_dict.get(field, 1) * qtf * idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def test_top_k_matches_exhaustive_scoring():
+    """Pruned top-k retrieval returns the same scores as scoring everything."""
+    documents = make_documents(400)
+    index = BM25Index(text_fields=['content', 'filename'], keyword_fields=['filename']).fit(documents)
+
+    for query in ["demo", "server tool", "auth middleware logging test", "python python async", "clients demo"]:
+        expected = sorted(brute_force_scores(documents, query, ['content', 'filename']), reverse=True)
+        for k in [1, 5, 20]:
+            doc_ids, scores = index.search_ids(query, num_results=k)
+            wanted = [s for s in expected[:k] if s > 0]
+            assert len(scores) == len(wanted), (query, k)
+            for got, want in zip(scores, wanted):
+                assert abs(got - want) < 1e-3, (query, k, got, want)
+
+    print("✓ Pruned top-k matches exhaustive BM25 scoring")
+
+
+def test_drop_in_search_interface():
+    """search() behaves like minsearch.Index.search for filters, boosts and ids."""
+    documents = make_documents(100, seed=1)
+    index = BM25Index(text_fields=['content', 'filename'], keyword_fields=['filename']).fit(documents)
+
+    results = index.search("server", num_results=3, output_ids=True)
+    assert len(results) == 3
+    assert all(documents[r['_id']]['filename'] == r['filename'] for r in results)
+
+    target = documents[7]['filename']
+    filtered = index.search("server tool demo", filter_dict={'filename': target})
+    assert [doc['filename'] for doc in filtered] in ([target], [])
+
+    boosted = index.search("clients", boost_dict={'content': 0}, num_results=5)
+    assert all(doc['filename'].startswith("docs/clients/") for doc in boosted)
+    expected = sorted(brute_force_scores(documents, "clients", ['content', 'filename'],
+                                         boost_dict={'content': 0}), reverse=True)
+    assert len(boosted) == min(5, sum(1 for s in expected if s > 0))
+
+    assert index.search("unknownterm") == []
+    assert BM25Index(text_fields=['content']).fit([]).search("server") == []
+
+    print("✓ search() is a drop-in replacement for minsearch")
+
+
+if __name__ == "__main__":
+    try:
+        test_top_k_matches_exhaustive_scoring()
+        test_drop_in_search_interface()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Tests for section-level chunking (no network needed).
+"""
+
+import sys
+
+from chunking import chunk_document, split_sections
+
+DOC = {
+    'filename': "docs/servers/context.mdx",
+    'content': (
+        "---\ntitle: Context\n---\n"
+        "Intro text.\n"
+        "# Context\n"
+        "The Context object.\n"
+        "## Logging\n"
+        "Use ctx.info to log.\n"
+        "```python\n# not a heading\nctx.info('hi')\n```\n"
+        "### Levels\n"
+        "Debug, info, warning.\n"
+        "## Progress\n"
+        "Report progress.\n"
+    ),
+}
+
+
+def test_split_on_headings():
+    """Sections follow the heading hierarchy and skip fenced code."""
+    sections = split_sections(DOC['content'])
+    paths = [" > ".join(path) for path, _, _ in sections]
+    assert paths == ["", "Context", "Context > Logging", "Context > Logging > Levels", "Context > Progress"]
+
+    # Sections cover the file without gaps
+    assert sections[0][1] == 0
+    assert sections[-1][2] == len(DOC['content'])
+    for (_, _, end), (_, start, _) in zip(sections, sections[1:]):
+        assert end == start
+
+    logging = DOC['content'][sections[2][1]:sections[2][2]]
+    assert "# not a heading" in logging
+
+    print("✓ Sections split on headings")
+
+
+def test_chunks_keep_source_location():
+    """Chunks carry filename, heading path and their offset in the file."""
+    chunks = chunk_document(DOC)
+    assert [c['heading'] for c in chunks][1:3] == ["Context", "Context > Logging"]
+    for chunk in chunks:
+        assert chunk['filename'] == DOC['filename']
+        assert DOC['content'][chunk['start']:].startswith(chunk['content'])
+
+    print("✓ Chunks keep filename, heading and offset")
+
+
+def test_long_sections_use_overlapping_windows():
+    """Sections longer than max_tokens are cut into overlapping windows."""
+    words = [f"w{i}" for i in range(95)]
+    doc = {'filename': "long.md", 'content': "# Long\n" + " ".join(words)}
+    chunks = chunk_document(doc, max_tokens=40, overlap=10)
+
+    assert len(chunks) == 3
+    assert all(len(c['content'].split()) <= 40 for c in chunks)
+    assert all(c['heading'] == "Long" for c in chunks)
+    # Consecutive windows share 10 words
+    assert chunks[0]['content'].split()[-10:] == chunks[1]['content'].split()[:10]
+    assert chunks[-1]['content'].endswith("w94")
+
+    print("✓ Long sections are windowed with overlap")
+
+
+if __name__ == "__main__":
+    try:
+        test_split_on_headings()
+        test_chunks_keep_source_location()
+        test_long_sections_use_overlapping_windows()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
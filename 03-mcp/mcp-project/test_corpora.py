@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+"""
+Tests for the multi-corpus registry and fan-out search (no network needed).
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+import server
+from bm25 import BM25Index
+from corpora import CorpusRegistry, parse_corpora, search_shards
+from mmap_store import mapped_path
+from test_index_store import make_zip
+from test_server_index import isolated_index
+
+PYDANTIC_DOCS = {
+    "pydantic-main/docs/models.md": "# Models\nModels are classes that inherit from BaseModel.",
+    "pydantic-main/docs/validators.md": "# Validators\nField validators run after the tool parses input.",
+}
+NOTES = {
+    "deploy.md": "# Deploy\nRun the server behind a proxy.",
+    "guides/tools.mdx": "# Tools\nOur internal tool conventions.",
+}
+
+
+def make_corpora(tmp):
+    """A zip corpus and a directory corpus."""
+    os.makedirs(os.path.join(tmp, "pydantic"))
+    zip_path = make_zip(os.path.join(tmp, "pydantic"), PYDANTIC_DOCS)
+    notes = os.path.join(tmp, "notes")
+    for filename, content in NOTES.items():
+        os.makedirs(os.path.dirname(os.path.join(notes, filename)), exist_ok=True)
+        with open(os.path.join(notes, filename), 'w') as f:
+            f.write(content)
+    return zip_path, notes
+
+
+def test_parse_corpora():
+    """FASTMCP_CORPORA lists name=source pairs."""
+    assert parse_corpora("") == {}
+    assert parse_corpora("a=docs/a.zip, b = https://x/b.zip") == {
+        'a': "docs/a.zip", 'b': "https://x/b.zip"
+    }
+    try:
+        parse_corpora("just-a-path.zip")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    print("✓ Corpus lists are parsed")
+
+
+def test_shards_built_in_parallel_and_kept():
+    """Shards are built in a process pool, mapped, and not rebuilt for a new corpus."""
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path, notes = make_corpora(tmp)
+        registry = CorpusRegistry(server.CHUNK_SETTINGS, max_workers=2)
+        registry.register("pydantic", zip_path)
+        registry.register("notes", notes)
+
+        shards = registry.ensure()
+        assert list(shards) == ["pydantic", "notes"]
+        assert os.path.exists(mapped_path(zip_path))
+        assert os.path.exists(mapped_path(notes))
+        status = registry.status()
+        assert status['pydantic']['state'] == status['notes']['state'] == "ready"
+        assert status['notes']['how'] == "built"
+        assert sorted(doc['filename'] for doc in shards['notes'][1]) == ["deploy.md", "guides/tools.mdx"]
+
+        # Adding a corpus leaves the loaded shards alone
+        os.makedirs(os.path.join(tmp, "extra"))
+        registry.register("extra", make_zip(os.path.join(tmp, "extra")))
+        generation = registry.generation("notes")
+        again = registry.ensure()
+        assert again['pydantic'] is shards['pydantic']
+        assert again['notes'] is shards['notes']
+        assert registry.generation("notes") == generation
+
+        # Replacing a corpus moves its generation on (it keys cached rankings)
+        registry.register("notes", notes)
+        registry.ensure(["notes"])
+        assert registry.generation("notes") > generation
+
+        # A new registry (another process) maps the saved shards
+        fresh = CorpusRegistry(server.CHUNK_SETTINGS)
+        fresh.register("notes", notes)
+        fresh.ensure()
+        assert fresh.status()['notes']['how'] == "mapped"
+
+        try:
+            registry.ensure(["missing"])
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+    print("✓ Shards are built in parallel and kept when a corpus is added")
+
+
+def test_failed_shard_is_reported():
+    """A corpus that cannot be built fails alone."""
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path, _ = make_corpora(tmp)
+        registry = CorpusRegistry(server.CHUNK_SETTINGS)
+        registry.register("pydantic", zip_path)
+        registry.register("empty", tmp + "/nothing-here")
+
+        try:
+            registry.ensure()
+            assert False, "expected RuntimeError"
+        except RuntimeError as e:
+            assert "empty" in str(e)
+        assert registry.status()['empty']['state'] == "failed"
+        assert registry.ensure(["pydantic"])['pydantic'] is not None
+
+    print("✓ A failed shard is reported without affecting the others")
+
+
+def test_builds_are_single_flight_per_corpus():
+    """A slow download blocks neither other corpora nor runs twice."""
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path, notes = make_corpora(tmp)
+        started, release = threading.Event(), threading.Event()
+        downloads = []
+
+        def download(url, path):
+            downloads.append(url)
+            started.set()
+            release.wait(10)
+            shutil.copy(zip_path, path)
+
+        registry = CorpusRegistry(
+            server.CHUNK_SETTINGS, directory=os.path.join(tmp, "downloads"), download=download
+        )
+        registry.register("pydantic", "https://example.com/pydantic.zip")
+        registry.register("notes", notes)
+
+        shards = []
+        callers = [
+            threading.Thread(target=lambda: shards.append(registry.ensure(["pydantic"])["pydantic"]))
+            for _ in range(2)
+        ]
+        callers[0].start()
+        assert started.wait(10)
+        callers[1].start()
+        try:
+            # Built while the download of the other corpus is still blocked
+            assert registry.ensure(["notes"])["notes"] is not None
+            assert registry.status()["pydantic"]["state"] == "building"
+        finally:
+            release.set()
+            for caller in callers:
+                caller.join(10)
+
+        assert downloads == ["https://example.com/pydantic.zip"]
+        assert len(shards) == 2 and shards[0] is shards[1]
+
+    print("✓ Corpus builds are single-flight and independent")
+
+
+def test_fan_out_scores_match_single_index():
+    """Merged shard scores equal those of one index over all the documents."""
+    words = ["alpha", "beta", "gamma", "delta"]
+    rng = np.random.default_rng(0)
+    # Equal lengths, so only the IDF differs between the shards
+    docs = [{'content': " ".join(rng.choice(words, size=4)), 'id': str(i)} for i in range(40)]
+    docs += [{'content': "alpha alpha alpha rare", 'id': "rare"}]
+
+    def fit(documents):
+        return BM25Index(text_fields=['content']).fit(documents)
+
+    whole = fit(docs)
+    shards = {"a": (fit(docs[:10]), docs[:10]), "b": (fit(docs[10:]), docs[10:])}
+
+    for query in ["rare", "alpha beta", "gamma rare"]:
+        hits = asyncio.run(search_shards(shards, query, num_results=5))
+        doc_ids, scores = whole.search_ids(query, num_results=5)
+        assert [shards[name][1][i]['id'] for name, i, _ in hits] == [docs[i]['id'] for i in doc_ids]
+        assert np.allclose([score for _, _, score in hits], scores, rtol=1e-5)
+
+    print("✓ Fan-out scores are comparable across shards")
+
+
+def test_search_tool_with_corpora():
+    """search_fastmcp_docs searches the selected corpora."""
+    with tempfile.TemporaryDirectory() as tmp, isolated_index():
+        _, notes = make_corpora(tmp)
+        saved = server._corpora
+        server._corpora = CorpusRegistry(server.CHUNK_SETTINGS)
+        try:
+            server._corpora.register("notes", notes)
+
+            results = asyncio.run(server.search_fastmcp_docs.fn("tool", 10))
+            assert {result['corpus'] for result in results} == {"fastmcp", "notes"}
+
+            results = asyncio.run(server.search_fastmcp_docs.fn("tool", 10, corpora=["notes"]))
+            assert [result['filename'] for result in results] == ["guides/tools.mdx"]
+            assert results[0]['corpus'] == "notes"
+
+            only_fastmcp = asyncio.run(server.search_fastmcp_docs.fn("tool", 10, corpora=["fastmcp"]))
+            assert only_fastmcp and all('corpus' not in result for result in only_fastmcp)
+
+            try:
+                asyncio.run(server.search_fastmcp_docs.fn("tool", 10, corpora=["nope"]))
+                assert False, "expected ValueError"
+            except ValueError as e:
+                assert "available: fastmcp, notes" in str(e)
+
+            status = server.corpora_status.fn()
+            assert status['notes']['state'] == "ready"
+            assert status['fastmcp']['state'] == "ready"
+        finally:
+            server._corpora = saved
+
+    print("✓ search_fastmcp_docs fans out to the selected corpora")
+
+
+if __name__ == "__main__":
+    print("Running corpus registry tests...\n")
+
+    try:
+        test_parse_corpora()
+        test_shards_built_in_parallel_and_kept()
+        test_failed_shard_is_reported()
+        test_builds_are_single_flight_per_corpus()
+        test_fan_out_scores_match_single_index()
+        test_search_tool_with_corpora()
+
+        print("\n✅ All corpus registry tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
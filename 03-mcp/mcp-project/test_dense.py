@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Tests for hashed-embedding dense retrieval and rank fusion (no network needed).
+"""
+
+import asyncio
+import sys
+import threading
+
+import numpy as np
+
+import server
+from bm25 import BM25Index
+from dense import DenseIndex, ngram_vectors, reciprocal_rank_fusion
+from test_bm25 import make_documents
+from test_search_responses import FILES
+from test_server_index import isolated_index
+
+PARAPHRASES = [
+    {'content': "Launch the server with the command line"},
+    {'content': "Run the server with the command line"},
+    {'content': "Start the server with the command line"},
+] + [
+    {'content': f"Bake cake number {i} in the oven with butter and flour"} for i in range(30)
+]
+
+
+def fit(documents, **options):
+    index = BM25Index(text_fields=['content']).fit(documents)
+    return index, DenseIndex(**options).fit(index)
+
+
+def test_ngram_vectors():
+    """Forms of a word share n-grams, unrelated words do not."""
+    configure, configuration, butter = ngram_vectors(["configure", "configuration", "butter"])
+    assert np.isclose(np.linalg.norm(configure), 1)
+    assert configure @ configuration > 0.4
+    assert abs(configure @ butter) < 0.3
+
+    print("✓ Hashed n-gram vectors")
+
+
+def test_context_matches_paraphrases():
+    """Terms used in the same contexts find each other's documents."""
+    _, dense = fit(PARAPHRASES)
+    doc_ids, scores = dense.search_ids("launch", num_results=3, nprobe=100)
+    assert sorted(doc_ids.tolist()) == [0, 1, 2]
+    assert doc_ids[0] == 0 and scores[0] >= scores[1] >= scores[2]
+
+    # A word missing from the corpus still matches through its n-grams
+    assert dense.search_ids("launching", num_results=1, nprobe=100)[0].tolist() == [0]
+    assert len(dense.search_ids("zzzz qqqq", num_results=3)[0]) <= 3
+
+    print("✓ Context vectors match paraphrases")
+
+
+def test_ivf_matches_exhaustive_search():
+    """Probing every list gives the exact ranking of the quantized vectors."""
+    documents = make_documents(400)
+    _, dense = fit(documents)
+    assert len(dense.centroids) == 20
+    assert sorted(dense.doc_ids.tolist()) == list(range(400))
+
+    vectors = np.empty((400, dense.dim), dtype=np.float32)
+    vectors[dense.doc_ids] = dense.codes.astype(np.float32) * dense.scales[:, None]
+    for query in ["server tool", "python async logging"]:
+        expected = np.argsort(-(vectors @ dense.embed(query)), kind='stable')[:10]
+        doc_ids, _ = dense.search_ids(query, num_results=10, nprobe=len(dense.centroids))
+        assert set(doc_ids.tolist()) == set(expected.tolist())
+
+        # A few lists already find most of them
+        approximate, _ = dense.search_ids(query, num_results=10, nprobe=5)
+        assert len(set(approximate.tolist()) & set(expected.tolist())) >= 5
+
+    print("✓ IVF search matches exhaustive search")
+
+
+def test_restricted_search():
+    """Restricted searches rank the allowed documents exactly, in any list."""
+    documents = make_documents(400)
+    _, dense = fit(documents)
+    vectors = np.empty((400, dense.dim), dtype=np.float32)
+    vectors[dense.doc_ids] = dense.codes.astype(np.float32) * dense.scales[:, None]
+    rng = np.random.default_rng(0)
+    for size in [3, 40, 300]:
+        allowed = np.sort(rng.choice(400, size=size, replace=False))
+        for query in ["server tool", "python async logging"]:
+            scores = vectors[allowed] @ dense.embed(query)
+            expected = allowed[np.lexsort((allowed, -scores))][:10]
+            doc_ids, _ = dense.search_ids(query, num_results=10, allowed_ids=allowed)
+            assert doc_ids.tolist() == expected.tolist()
+    assert dense.search_ids("server", allowed_ids=np.empty(0, dtype=np.int32))[0].tolist() == []
+
+    print("✓ Restricted dense search")
+
+
+def test_reciprocal_rank_fusion():
+    """Items ranked well by both lists come first."""
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]], k=60)
+    assert [item for item, _ in fused] == ["b", "a", "d", "c"]
+    assert np.isclose(fused[0][1], 1 / 62 + 1 / 61)
+    assert reciprocal_rank_fusion([]) == []
+
+    print("✓ Reciprocal rank fusion")
+
+
+def test_search_modes():
+    """search_fastmcp_docs searches in sparse, dense or hybrid mode."""
+    def search(query, **options):
+        return asyncio.run(server.search_fastmcp_docs.fn(query, 5, fields=["filename", "score"], **options))
+
+    with isolated_index(files=FILES):
+        sparse = search("tool server")
+        assert sparse == search("tool server", mode="sparse")
+
+        dense = search("tool server", mode="dense")
+        assert len(dense) == 5 and all(0 < result['score'] <= 1.01 for result in dense)
+
+        hybrid = search("tool server", mode="hybrid")
+        assert len(hybrid) == 5
+        top = {result['filename'] for result in sparse[:2]} | {result['filename'] for result in dense[:2]}
+        assert hybrid[0]['filename'] in top
+        assert hybrid[0]['score'] >= hybrid[-1]['score']
+
+        try:
+            search("tool server", mode="semantic")
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert "hybrid" in str(e)
+
+    print("✓ Search modes")
+
+
+def test_slow_dense_fit_blocks_nothing_else():
+    """A dense fit in flight holds up neither other derived indexes nor a second fit."""
+    started, release = threading.Event(), threading.Event()
+    fits = []
+    fit_derived_index = server._fit_derived_index
+
+    def slow_fit(kind, index):
+        fits.append(kind)
+        if kind == 'dense':
+            started.set()
+            release.wait(10)
+        return fit_derived_index(kind, index)
+
+    with isolated_index(files=FILES):
+        index, _ = asyncio.run(server._ensure_fastmcp_index())
+        server._fit_derived_index = slow_fit
+        dense = []
+        callers = [
+            threading.Thread(target=lambda: dense.append(server._derived_index("dense", "fastmcp", index)))
+            for _ in range(2)
+        ]
+        try:
+            callers[0].start()
+            assert started.wait(10)
+            callers[1].start()
+            paths = threading.Thread(target=server._derived_index, args=("paths", "fastmcp", index))
+            paths.start()
+            paths.join(5)
+            assert not paths.is_alive(), "the path index waited for the dense fit"
+        finally:
+            release.set()
+            for caller in callers:
+                caller.join(10)
+            server._fit_derived_index = fit_derived_index
+
+        assert fits.count('dense') == 1
+        assert len(dense) == 2 and dense[0] is dense[1]
+
+    print("✓ A slow dense fit blocks nothing else")
+
+
+if __name__ == "__main__":
+    print("Running dense retrieval tests...\n")
+
+    try:
+        test_ngram_vectors()
+        test_context_matches_paraphrases()
+        test_ivf_matches_exhaustive_search()
+        test_restricted_search()
+        test_reciprocal_rank_fusion()
+        test_search_modes()
+        test_slow_dense_fit_blocks_nothing_else()
+
+        print("\n✅ All dense retrieval tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Tests for the compressed document store (no network needed).
+"""
+
+import os
+import sys
+import tempfile
+
+from minsearch import Index
+
+from bm25 import BM25Index
+from doc_store import CompressedDocuments, CompressedStrings, compress_documents, field_values
+from mmap_store import load_mapped, save_mapped
+from test_bm25 import make_documents
+
+DOCS = [
+    {'filename': "docs/emoji.md", 'heading': "Emoji", 'content': "Tools 🚀 ship fast " * 20, 'start': 0},
+    {'filename': "docs/tools.md", 'heading': "Tools > Args", 'content': "Arguments are validated.", 'start': 3},
+    {'filename': "docs/empty.md", 'heading': "", 'content': "", 'start': 7},
+]
+
+
+def test_round_trip():
+    """Documents read back exactly, with their field order."""
+    store = CompressedDocuments(DOCS)
+    assert len(store) == 3
+    assert list(store) == DOCS
+    assert [list(doc) for doc in store] == [list(doc) for doc in DOCS]
+    assert store[-1] == DOCS[-1]
+    assert store[1:] == DOCS[1:]
+    assert store.column('filename') == [doc['filename'] for doc in DOCS]
+    assert store.column('start') == [0, 3, 7]
+    assert field_values(store, 'heading') == field_values(DOCS, 'heading')
+
+    try:
+        store[3]
+        assert False, "expected IndexError"
+    except IndexError:
+        pass
+
+    print("✓ Compressed documents round trip")
+
+
+def test_content_is_compressed():
+    """The contents take far less room than their decoded text."""
+    documents = make_documents(500)
+    store = CompressedDocuments(documents)
+    decoded = sum(len(doc['content'].encode('utf-8')) for doc in documents)
+    assert store.compressed_bytes < decoded / 2
+    assert list(store) == documents
+
+    print("✓ Contents are stored compressed")
+
+
+def test_search_results_unchanged():
+    """Indexes over the compressed store return the same results."""
+    documents = make_documents(300)
+    queries = ["python", "server tool", "missing"]
+    page = {'filename': documents[7]['filename']}
+    for engine in [BM25Index, Index]:
+        index = engine(text_fields=['content', 'filename'], keyword_fields=['filename']).fit(documents)
+        expected = [index.search(query, num_results=5) for query in queries]
+        expected_filtered = index.search("server", filter_dict=page)
+        assert expected[0] and expected_filtered
+
+        compress_documents(index, documents)
+        assert isinstance(index.docs, CompressedDocuments)
+        assert [index.search(query, num_results=5) for query in queries] == expected
+        assert index.search("server", filter_dict=page) == expected_filtered
+
+    print("✓ Search results are unchanged over compressed documents")
+
+
+def test_update_keeps_contents_compressed():
+    """BM25 updates carry compressed and mapped contents over without decompressing them."""
+    documents = make_documents(200, seed=3)
+    added = make_documents(30, seed=4)
+    removed_ids = [0, 5, 17, 99, 199]
+    expected_docs = [doc for i, doc in enumerate(documents) if i not in removed_ids] + added
+
+    def fit(docs):
+        return BM25Index(text_fields=['content', 'filename'], keyword_fields=['filename']).fit(docs)
+
+    expected = fit(expected_docs)
+    with tempfile.TemporaryDirectory() as tmp:
+        compressed, _ = compress_documents(fit(documents), documents)
+        zip_path = os.path.join(tmp, "docs.zip")
+        save_mapped(fit(documents), documents, zip_path, digest="test")
+        mapped, _ = load_mapped(zip_path, "test")
+
+        for index in [compressed, mapped]:
+            decompressed = []
+            read = CompressedStrings.__getitem__
+            CompressedStrings.__getitem__ = lambda column, i: decompressed.append(i) or read(column, i)
+            try:
+                index.update(added, removed_ids)
+            finally:
+                CompressedStrings.__getitem__ = read
+            assert decompressed == []
+
+            assert isinstance(index.docs, CompressedDocuments)
+            assert list(index.docs) == expected_docs
+            for query in ["server", "tool context", "page12 clients"]:
+                assert index.search(query, num_results=5) == expected.search(query, num_results=5)
+            assert index.search("server", filter_dict={'filename': added[0]['filename']})
+
+    print("✓ Updates keep the contents compressed")
+
+
+if __name__ == "__main__":
+    print("Running document store tests...\n")
+
+    try:
+        test_round_trip()
+        test_content_is_compressed()
+        test_search_results_unchanged()
+        test_update_keeps_contents_compressed()
+
+        print("\n✅ All document store tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
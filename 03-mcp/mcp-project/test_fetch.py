@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+"""
+Tests for the async fetch layer against a local stub reader (no network needed).
+"""
+
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import server
+from fetch import JinaFetcher
+from metrics import Metrics
+from page_cache import PageCache
+from test_result_cache import FakeClock
+
+PAGE = "Data data DATA. Database and metadata.\n"
+
+
+class StubReader(BaseHTTPRequestHandler):
+    """
+    Answers /<url> like r.jina.ai; /slow/... and /slower/... sleep, /missing/... is a 404
+    and /etag/... carries an ETag and honours If-None-Match.
+    """
+    protocol_version = "HTTP/1.1"
+    active = 0
+    peak = 0
+    connections = set()
+    statuses = []
+    etag = '"v1"'
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+            cls.connections.add(self.client_address)
+        try:
+            if "/slow/" in self.path:
+                time.sleep(0.1)
+            elif "/slower/" in self.path:
+                time.sleep(0.5)
+            status = 404 if "/missing/" in self.path else 200
+            if "/etag/" in self.path and self.headers.get("If-None-Match") == cls.etag:
+                status = 304
+            body = {200: PAGE, 304: "", 404: "not found"}[status].encode()
+            with cls.lock:
+                cls.statuses.append(status)
+            self.send_response(status)
+            if "/etag/" in self.path:
+                self.send_header("ETag", cls.etag)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    """Stub server that ignores clients hanging up (e.g. cancelled fetches)."""
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+@contextmanager
+def stub_reader():
+    """Serve StubReader on a free local port and yield its base URL."""
+    StubReader.active = StubReader.peak = 0
+    StubReader.connections = set()
+    StubReader.statuses = []
+    httpd = QuietServer(("127.0.0.1", 0), StubReader)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_keep_alive_and_errors():
+    """Sequential requests reuse one connection; HTTP errors become messages."""
+    with stub_reader() as base_url:
+        fetcher = JinaFetcher(base_url=base_url)
+
+        async def run():
+            try:
+                pages = [await fetcher.fetch_text(f"https://example.com/{i}") for i in range(5)]
+                missing = await fetcher.fetch_text("https://example.com/missing/page")
+                return pages, missing
+            finally:
+                await fetcher.aclose()
+
+        pages, missing = asyncio.run(run())
+        assert pages == [PAGE] * 5
+        assert missing.startswith("Error fetching content") and "404" in missing
+        assert len(StubReader.connections) == 1
+
+    print("✓ Keep-alive connection reuse and error messages")
+
+
+def test_per_host_limit_and_timeout():
+    """Concurrency is bounded per target host; slow reads time out."""
+    with stub_reader() as base_url:
+        fetcher = JinaFetcher(base_url=base_url, max_per_host=2)
+
+        async def run():
+            try:
+                return await asyncio.gather(*[
+                    fetcher.fetch_text(f"https://example.com/slow/{i}") for i in range(6)
+                ])
+            finally:
+                await fetcher.aclose()
+
+        assert asyncio.run(run()) == [PAGE] * 6
+        assert StubReader.peak == 2
+
+        impatient = JinaFetcher(base_url=base_url, read_timeout=0.01)
+        result = impatient.fetch_text_blocking("https://example.com/slow/page")
+        assert result.startswith("Error fetching content")
+
+    print("✓ Per-host concurrency limit and read timeout")
+
+
+def test_identical_fetches_are_coalesced():
+    """Concurrent fetches of one URL share a single upstream request."""
+    with stub_reader() as base_url:
+        fetcher = JinaFetcher(base_url=base_url, cache=PageCache())
+
+        async def run():
+            try:
+                return await asyncio.gather(*[
+                    fetcher.fetch_text("https://example.com/slow/page") for _ in range(5)
+                ])
+            finally:
+                await fetcher.aclose()
+
+        assert asyncio.run(run()) == [PAGE] * 5
+        assert StubReader.statuses == [200]
+        assert fetcher.flights.coalesced == 4
+
+    print("✓ Identical in-flight fetches are coalesced")
+
+
+def test_clients_are_closed_with_their_loop():
+    """The pooled client of a finished or replaced event loop is closed."""
+    with stub_reader() as base_url:
+        fetcher = JinaFetcher(base_url=base_url)
+        clients = []
+
+        async def fetch():
+            text = await fetcher.fetch_text("https://example.com/")
+            clients.append(fetcher._client)
+            return text
+
+        # asyncio.run closes the client before closing its loop
+        assert asyncio.run(fetch()) == PAGE
+        assert clients[0].is_closed
+
+        # A loop still running in another thread closes it when it is replaced
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            assert asyncio.run_coroutine_threadsafe(fetch(), loop).result(10) == PAGE
+            assert not clients[1].is_closed
+            assert asyncio.run(fetch()) == PAGE
+            for _ in range(100):
+                if clients[1].is_closed:
+                    break
+                time.sleep(0.01)
+            assert clients[1].is_closed and clients[2].is_closed
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(10)
+            loop.close()
+
+        async def blocking_in_loop():
+            return fetcher.fetch_text_blocking("https://example.com/")
+
+        try:
+            asyncio.run(blocking_in_loop())
+            assert False, "expected RuntimeError"
+        except RuntimeError as e:
+            assert "await fetch_text()" in str(e)
+
+    print("✓ Clients are closed with their event loop")
+
+
+def test_cache_revalidation():
+    """Fresh pages skip the network; stale ones are served and revalidated with a 304."""
+    clock = FakeClock()
+    url = "https://example.com/etag/page"
+    with stub_reader() as base_url:
+        cache = PageCache(ttl=10, stale_ttl=100, clock=clock)
+        fetcher = JinaFetcher(base_url=base_url, cache=cache)
+
+        async def fetch(wait=False):
+            text = await fetcher.fetch_text(url)
+            if wait:
+                await fetcher.wait_revalidations()
+            return text
+
+        async def run():
+            try:
+                first = await fetch()
+                clock.now = 5  # fresh: no request
+                second = await fetch()
+                clock.now = 50  # stale: served, then revalidated in the background
+                third = await fetch(wait=True)
+                clock.now = 500  # expired: revalidated before answering
+                fourth = await fetch()
+                return [first, second, third, fourth]
+            finally:
+                await fetcher.aclose()
+
+        assert asyncio.run(run()) == [PAGE] * 4
+        assert StubReader.statuses == [200, 304, 304]
+
+        stats = cache.stats()
+        assert (stats['memory_hits'], stats['stale_served'], stats['not_modified']) == (2, 1, 2)
+
+    print("✓ Page cache with stale-while-revalidate and conditional requests")
+
+
+def test_cache_writes_off_the_loop():
+    """Pages are stored in the cache, and written to its disk tier, off the event loop."""
+    clock = FakeClock()
+    stored = []
+
+    class RecordingCache(PageCache):
+        def _write_disk(self, key, entry):
+            try:
+                asyncio.get_running_loop()
+                stored.append(True)
+            except RuntimeError:
+                stored.append(False)
+            super()._write_disk(key, entry)
+
+    url = "https://example.com/etag/page"
+    with stub_reader() as base_url, tempfile.TemporaryDirectory() as tmp:
+        cache = RecordingCache(ttl=10, stale_ttl=0, directory=tmp, clock=clock)
+        fetcher = JinaFetcher(base_url=base_url, cache=cache)
+
+        async def run():
+            try:
+                first = await fetcher.fetch_text(url)
+                clock.now = 50  # expired: the 304 refreshes the entry
+                return [first, await fetcher.fetch_text(url)]
+            finally:
+                await fetcher.aclose()
+
+        assert asyncio.run(run()) == [PAGE] * 2
+        assert StubReader.statuses == [200, 304]
+        assert stored == [False, False]
+
+    print("✓ Page cache writes run off the event loop")
+
+
+def test_url_tools_use_fetcher():
+    """The URL tools go through the configured reader and share its cache."""
+    saved = server._fetcher
+    with stub_reader() as base_url:
+        metrics = Metrics()
+        server._fetcher = JinaFetcher(base_url=base_url, cache=PageCache(), metrics=metrics)
+        calls_before = server._metrics.snapshot()['tools'].get('read_url', {}).get('calls', 0)
+        try:
+            assert asyncio.run(server.read_url.fn("https://example.com/")) == PAGE
+            assert server._metrics.snapshot()['tools']['read_url']['calls'] == calls_before + 1
+            result = asyncio.run(server.count_word_in_url.fn("https://example.com/", "data"))
+            assert result['count_word_boundaries'] == 3
+            assert result['count_substring'] == 5
+            result = asyncio.run(server.count_words_in_url.fn("https://example.com/", ["data", "meta"]))
+            assert result['counts'] == {
+                'data': {'count_word_boundaries': 3, 'count_substring': 5},
+                'meta': {'count_word_boundaries': 0, 'count_substring': 1},
+            }
+            assert server.get_jina_content("https://example.com/") == PAGE
+            assert StubReader.statuses == [200]
+            assert metrics.snapshot()['upstream']['jina']['calls'] == 1
+        finally:
+            server._fetcher = saved
+
+    print("✓ URL tools use the shared fetcher")
+
+
+def test_read_urls_in_parallel_with_deadline():
+    """read_urls keeps input order, runs fetches concurrently and honours the deadline."""
+    saved = server._fetcher
+    with stub_reader() as base_url:
+        server._fetcher = JinaFetcher(base_url=base_url)
+        try:
+            urls = [f"https://site{i}.example.com/slow/page" for i in range(6)]
+            urls.append("https://example.com/missing/page")
+            started = time.perf_counter()
+            batch = asyncio.run(server.read_urls.fn(urls, max_concurrency=8))
+            elapsed = time.perf_counter() - started
+
+            assert [result['url'] for result in batch['results']] == urls
+            assert [result['status'] for result in batch['results']] == ["ok"] * 6 + ["error"]
+            assert all(result['bytes'] == len(PAGE) for result in batch['results'][:6])
+            assert batch['completed'] == 7 and batch['timed_out'] == 0
+            assert elapsed < 0.4  # about one slow fetch, not six
+
+            batch = asyncio.run(server.read_urls.fn(
+                ["https://example.com/fast", "https://example.com/slower/page"], deadline=0.25,
+            ))
+            assert [result['status'] for result in batch['results']] == ["ok", "timeout"]
+            assert batch['completed'] == 1 and batch['timed_out'] == 1
+        finally:
+            server._fetcher = saved
+
+    print("✓ read_urls fetches in parallel with a deadline")
+
+
+if __name__ == "__main__":
+    try:
+        test_keep_alive_and_errors()
+        test_per_host_limit_and_timeout()
+        test_identical_fetches_are_coalesced()
+        test_clients_are_closed_with_their_loop()
+        test_cache_revalidation()
+        test_cache_writes_off_the_loop()
+        test_url_tools_use_fetcher()
+        test_read_urls_in_parallel_with_deadline()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Tests for typo-tolerant search with the trigram index (no network needed).
+"""
+
+import asyncio
+import random
+import sys
+
+import server
+from bm25 import BM25Index
+from fuzzy import TrigramIndex, edit_distance, max_edits
+from test_server_index import derived_fits, isolated_index
+
+DOCS = [
+    {'content': "The Context object gives tools access to logging"},
+    {'content': "FastMCP servers expose tools, resources and prompts"},
+    {'content': "Middleware wraps every request of the server"},
+    {'content': "Elicitation asks the user for more input"},
+]
+
+
+def reference_distance(a, b):
+    """Textbook optimal string alignment distance."""
+    d = [[i + j if not i * j else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def test_edit_distance():
+    """The banded distance matches the full one up to its limit."""
+    rng = random.Random(0)
+    for _ in range(3000):
+        a = "".join(rng.choice("abc") for _ in range(rng.randint(0, 7)))
+        b = "".join(rng.choice("abc") for _ in range(rng.randint(0, 7)))
+        for limit in [1, 2]:
+            assert edit_distance(a, b, limit) == min(reference_distance(a, b), limit + 1)
+    assert edit_distance("fastmpc", "fastmcp", 1) == 1
+
+    print("✓ Bounded edit distance")
+
+
+def test_candidates():
+    """Misspelled terms find the vocabulary terms a few edits away."""
+    index = BM25Index(text_fields=['content']).fit(DOCS)
+    trigrams = TrigramIndex(index.vocabulary)
+
+    assert trigrams.candidates("fastmpc") == [("fastmcp", 1)]
+    assert trigrams.candidates("contxt") == [("context", 1)]
+    assert trigrams.candidates("middlewear") == [("middleware", 2)]
+    assert trigrams.candidates("context") == []
+    assert max_edits("too") == 0 and trigrams.candidates("too") == []
+    assert trigrams.expand("contxt servr") == {'context': 0.5, 'server': 0.5}
+
+    # The same as checking every term of the vocabulary
+    vocabulary = list(index.vocabulary)
+    rng = random.Random(1)
+    for term in rng.sample(vocabulary, 10):
+        i = rng.randrange(len(term))
+        typo = term[:i] + term[i + 1:]
+        expected = sorted(
+            (other, edit_distance(typo, other, max_edits(typo))) for other in vocabulary
+            if other != typo and edit_distance(typo, other, max_edits(typo)) <= max_edits(typo)
+        )
+        assert sorted(trigrams.candidates(typo, limit=100)) == expected
+
+    print("✓ Trigram candidates")
+
+
+def test_expanded_search():
+    """Candidates are scored below the terms they stand for."""
+    index = BM25Index(text_fields=['content']).fit(DOCS)
+    expansions = TrigramIndex(index.vocabulary).expand("contxt")
+    assert index.search_ids("contxt")[0].tolist() == []
+
+    doc_ids, scores = index.search_ids("contxt", expansions=expansions)
+    exact_ids, exact_scores = index.search_ids("context")
+    assert doc_ids.tolist() == exact_ids.tolist() == [0]
+    assert abs(scores[0] - exact_scores[0] / 2) < 1e-5
+
+    print("✓ Expanded queries")
+
+
+def test_fuzzy_mode():
+    """search_fastmcp_docs finds misspelled terms in fuzzy mode."""
+    with isolated_index(), derived_fits() as fits:
+        assert asyncio.run(server.search_fastmcp_docs.fn("contxt objetc", 3)) == []
+
+        results = asyncio.run(server.search_fastmcp_docs.fn("contxt objetc", 3, mode="fuzzy"))
+        assert results[0]['filename'] == "docs/servers/context.mdx"
+        assert "**" in results[0]['highlights'][0]
+        # The trigram index is built off the event loop
+        assert fits == [("fuzzy", False)]
+
+        # Plain BM25 with the expansions: no dense ranking is fused in
+        results = asyncio.run(server.search_fastmcp_docs.fn("contxt objetc", 3, fields=["score"], mode="fuzzy"))
+        index = server._fastmcp_index
+        expansions = TrigramIndex(index.vocabulary).expand("contxt objetc")
+        _, scores = index.search_ids("contxt objetc", num_results=3, expansions=expansions)
+        assert len(results) == len(scores) > 0
+        assert all(abs(result['score'] - score) < 1e-6 for result, score in zip(results, scores))
+
+    print("✓ Fuzzy search mode")
+
+
+if __name__ == "__main__":
+    print("Running fuzzy search tests...\n")
+
+    try:
+        test_edit_distance()
+        test_candidates()
+        test_expanded_search()
+        test_fuzzy_mode()
+
+        print("\n✅ All fuzzy search tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Tests for incremental reindexing (no network needed).
+"""
+
+import sys
+import tempfile
+
+from bm25 import BM25Index
+from incremental import diff_manifests, read_manifest, update_from_archive
+from index_store import load_previous_snapshot, load_snapshot, save_snapshot
+from search import build_index, extract_and_index_files
+from test_bm25 import make_documents
+from test_index_store import DOCS, make_zip
+
+
+def assert_same_ranking(index, expected_index, queries):
+    for query in queries:
+        got_ids, got_scores = index.search_ids(query, num_results=10)
+        want_ids, want_scores = expected_index.search_ids(query, num_results=10)
+        assert list(got_ids) == list(want_ids), query
+        assert all(abs(a - b) < 1e-4 for a, b in zip(got_scores, want_scores)), query
+
+
+def test_bm25_update_matches_refit():
+    """Removing and adding documents gives the same index as fitting from scratch."""
+    documents = make_documents(200, seed=3)
+    added = make_documents(30, seed=4)
+    removed_ids = [0, 5, 17, 99, 199]
+
+    index = BM25Index(text_fields=['content', 'filename'], keyword_fields=['filename']).fit(documents)
+    index.update(added, removed_ids)
+
+    expected_docs = [d for i, d in enumerate(documents) if i not in removed_ids] + added
+    expected = BM25Index(text_fields=['content', 'filename'], keyword_fields=['filename']).fit(expected_docs)
+
+    assert index.docs == expected_docs
+    assert_same_ranking(index, expected, ["server", "tool context", "demo auth", "page12 clients"])
+    assert index.search("server", filter_dict={'filename': added[0]['filename']})[0] is added[0]
+
+    print("✓ BM25 update matches a full refit")
+
+
+def test_manifest_diff():
+    """Manifests detect changed, added and deleted markdown entries."""
+    with tempfile.TemporaryDirectory() as tmp:
+        old = read_manifest(make_zip(tmp))
+        assert set(old) == {"README.md", "docs/servers/context.mdx", "docs/servers/tools.mdx"}
+
+        changed = dict(DOCS)
+        changed["fastmcp-main/docs/servers/tools.mdx"] += "\nMore about tools."
+        changed["fastmcp-main/docs/new.md"] = "# New"
+        del changed["fastmcp-main/README.md"]
+        new = read_manifest(make_zip(tmp, changed))
+
+        assert diff_manifests(old, new) == (["docs/new.md", "docs/servers/tools.mdx"], ["README.md"])
+        assert diff_manifests(new, new) == ([], [])
+
+    print("✓ Manifest diff")
+
+
+def test_update_from_archive_and_snapshot():
+    """An outdated snapshot is brought up to date with only the changed files."""
+    changed = dict(DOCS)
+    changed["fastmcp-main/docs/servers/tools.mdx"] = "# Tools\nTools can report progress to the client."
+    changed["fastmcp-main/docs/new.md"] = "# Prompts\nPrompts are reusable message templates."
+    del changed["fastmcp-main/README.md"]
+
+    for engine in ["bm25", "minsearch"]:
+        with tempfile.TemporaryDirectory() as tmp:
+            zip_path = make_zip(tmp)
+            documents = extract_and_index_files(zip_path)
+            index = build_index(documents, engine=engine)
+            save_snapshot(index, documents, zip_path, manifest=read_manifest(zip_path))
+
+            make_zip(tmp, changed)
+            assert load_snapshot(zip_path, engine=engine) is None
+            index, documents, manifest = load_previous_snapshot(zip_path, engine=engine)
+
+            def builder(docs):
+                return build_index(docs, engine=engine)
+
+            index, documents, manifest, changes = update_from_archive(
+                index, documents, manifest, zip_path, build_index=builder
+            )
+            assert changes == {'changed': ["docs/new.md", "docs/servers/tools.mdx"], 'deleted': ["README.md"]}
+            assert manifest == read_manifest(zip_path)
+
+            fresh_documents = extract_and_index_files(zip_path)
+            fresh = build_index(fresh_documents, engine=engine)
+            assert sorted(d['filename'] for d in documents) == sorted(d['filename'] for d in fresh_documents)
+            for query in ["progress", "prompts templates", "context", "python"]:
+                got = [d['filename'] for d in index.search(query, num_results=3)]
+                want = [d['filename'] for d in fresh.search(query, num_results=3)]
+                assert sorted(got) == sorted(want), (engine, query)
+
+    print("✓ Outdated snapshots are updated incrementally")
+
+
+if __name__ == "__main__":
+    try:
+        test_bm25_update_matches_refit()
+        test_manifest_diff()
+        test_update_from_archive_and_snapshot()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
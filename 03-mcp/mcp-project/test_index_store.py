@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Tests for the on-disk index snapshots (no network needed).
+"""
+
+import os
+import sys
+import tempfile
+import zipfile
+
+from index_store import load_snapshot, save_snapshot, snapshot_path
+from search import build_index, extract_and_index_files
+
+DOCS = {
+    "fastmcp-main/README.md": "# FastMCP\nBuild MCP servers with a few lines of Python.",
+    "fastmcp-main/docs/servers/context.mdx": "# Context\nThe Context object gives tools access to logging.",
+    "fastmcp-main/docs/servers/tools.mdx": "# Tools\nDecorate a function with mcp.tool to expose it.",
+    "fastmcp-main/src/fastmcp/server.py": "print('not indexed')",
+}
+
+
+def make_zip(directory, files=DOCS):
+    """Write a small archive with the same layout as fastmcp-main.zip."""
+    zip_path = os.path.join(directory, "fastmcp-main.zip")
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return zip_path
+
+
+def test_snapshot_round_trip():
+    """A loaded snapshot answers queries exactly like the fitted index."""
+    for engine in ["bm25", "minsearch"]:
+        with tempfile.TemporaryDirectory() as tmp:
+            zip_path = make_zip(tmp)
+            documents = extract_and_index_files(zip_path)
+            index = build_index(documents, engine=engine)
+
+            path = save_snapshot(index, documents, zip_path)
+            assert path == snapshot_path(zip_path)
+            assert os.path.exists(path)
+
+            loaded_index, loaded_documents = load_snapshot(zip_path, engine=engine)
+            assert type(loaded_index) is type(index)
+            assert loaded_documents == documents
+
+            for query in ["context", "tool", "python servers", "missing"]:
+                expected = index.search(query, num_results=3)
+                assert loaded_index.search(query, num_results=3) == expected
+
+            filtered = loaded_index.search("tool", filter_dict={'filename': 'docs/servers/tools.mdx'})
+            assert [doc['filename'] for doc in filtered] == ['docs/servers/tools.mdx']
+
+            # A snapshot from the other engine is not reused
+            other = "minsearch" if engine == "bm25" else "bm25"
+            assert load_snapshot(zip_path, engine=other) is None
+
+    print("✓ Snapshot round trip returns identical results")
+
+
+def test_snapshot_invalidated_by_new_archive():
+    """A snapshot built from a different archive is ignored."""
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = make_zip(tmp)
+        documents = extract_and_index_files(zip_path)
+        save_snapshot(build_index(documents), documents, zip_path)
+
+        changed = dict(DOCS)
+        changed["fastmcp-main/docs/new.md"] = "# New page"
+        make_zip(tmp, changed)
+
+        assert load_snapshot(zip_path) is None
+
+    print("✓ Stale snapshot is ignored")
+
+
+def test_missing_or_corrupt_snapshot():
+    """Missing and unreadable snapshots are treated as absent."""
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = make_zip(tmp)
+        assert load_snapshot(zip_path) is None
+
+        with open(snapshot_path(zip_path), 'wb') as f:
+            f.write(b"not a snapshot")
+        assert load_snapshot(zip_path) is None
+
+    print("✓ Missing and corrupt snapshots are ignored")
+
+
+if __name__ == "__main__":
+    try:
+        test_snapshot_round_trip()
+        test_snapshot_invalidated_by_new_archive()
+        test_missing_or_corrupt_snapshot()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Tests for tool and upstream metrics (no network needed).
+"""
+
+import asyncio
+import sys
+
+import httpx
+
+import server
+from metrics import Histogram, Metrics
+
+
+def test_histogram():
+    """Observations land in their bucket; quantiles are bucket upper bounds."""
+    histogram = Histogram(bounds=(0.01, 0.1, 1.0))
+    for seconds in [0.005, 0.005, 0.05, 0.5, 5.0]:
+        histogram.observe(seconds)
+
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.quantile(0.4) == 0.01
+    assert histogram.quantile(0.8) == 1.0
+    assert histogram.quantile(1.0) == float('inf')
+    assert histogram.to_dict()['buckets'] == {'0.01': 2, '0.1': 1, '1.0': 1, '+Inf': 1}
+
+    print("✓ Histogram buckets and quantiles")
+
+
+def test_instrument():
+    """Calls, raised and reported errors, latency and result bytes are recorded per tool."""
+    metrics = Metrics()
+
+    @metrics.instrument(is_error=lambda result: "error" in result)
+    async def lookup(word):
+        if word == "boom":
+            raise ValueError(word)
+        return {"error": "missing"} if word == "missing" else {"word": word}
+
+    @metrics.instrument(name="shout")
+    def upper(text):
+        return text.upper()
+
+    async def run():
+        await lookup("data")
+        await lookup("missing")
+        try:
+            await lookup("boom")
+        except ValueError:
+            pass
+
+    asyncio.run(run())
+    assert upper("abc") == "ABC" and upper.__name__ == "upper"
+
+    tools = metrics.snapshot()['tools']
+    assert (tools['lookup']['calls'], tools['lookup']['errors']) == (3, 2)
+    assert tools['lookup']['bytes_returned'] == len('{"word": "data"}') + len('{"error": "missing"}')
+    assert tools['lookup']['latency']['count'] == 3
+    assert (tools['shout']['calls'], tools['shout']['bytes_returned']) == (1, 3)
+
+    print("✓ Tool instrumentation")
+
+
+def test_server_metrics_and_prometheus():
+    """Server tools, upstream fetches and index phases show up in the resource and /metrics."""
+    metrics = Metrics()
+    saved = server._metrics
+    server._metrics = metrics
+    try:
+        metrics.record_call("read_url", 0.02, nbytes=1200)
+        metrics.record_upstream("jina", 0.3, error=True)
+        metrics.record_phase("fit", 1.5)
+
+        snapshot = metrics.snapshot()
+        assert snapshot['upstream']['jina']['errors'] == 1
+        assert snapshot['index_phases']['fit']['count'] == 1
+
+        async def scrape():
+            app = server.mcp.http_app()
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await client.get("/metrics")
+
+        response = asyncio.run(scrape())
+        assert response.status_code == 200
+        text = response.text
+        assert 'mcp_tool_calls_total{tool="read_url"} 1' in text
+        assert 'mcp_tool_bytes_returned_total{tool="read_url"} 1200' in text
+        assert 'mcp_tool_latency_seconds_bucket{tool="read_url",le="0.025"} 1' in text
+        assert 'mcp_upstream_errors_total{service="jina"} 1' in text
+        assert 'mcp_index_phase_seconds_count{phase="fit"} 1' in text
+    finally:
+        server._metrics = saved
+
+    print("✓ Server metrics resource and Prometheus endpoint")
+
+
+if __name__ == "__main__":
+    try:
+        test_histogram()
+        test_instrument()
+        test_server_metrics_and_prometheus()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Tests for the memory-mapped BM25 index (no network needed).
+"""
+
+import copy
+import os
+import sys
+import tempfile
+
+import server
+from mmap_store import MappedDocuments, load_mapped, load_previous_mapped, mapped_path, save_mapped
+from test_index_store import DOCS, make_zip
+from test_server_index import isolated_index
+
+SETTINGS = server.CHUNK_SETTINGS
+QUERIES = ["context", "tool", "python servers", "logging tools", "missing"]
+
+
+def build(zip_path):
+    documents = server._extract_and_index_files(zip_path)
+    return server._build_fastmcp_index(documents), documents
+
+
+def test_mapped_round_trip():
+    """A mapped index answers queries exactly like the fitted one."""
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = make_zip(tmp)
+        index, documents = build(zip_path)
+
+        path = save_mapped(index, documents, zip_path, settings=SETTINGS)
+        assert path == mapped_path(zip_path)
+
+        mapped_index, mapped_documents = load_mapped(zip_path, settings=SETTINGS)
+        assert isinstance(mapped_documents, MappedDocuments)
+        assert list(mapped_documents) == documents
+
+        for query in QUERIES:
+            expected = index.search(query, num_results=3)
+            assert mapped_index.search(query, num_results=3) == expected
+        assert mapped_index.search_many(QUERIES, num_results=3) == index.search_many(QUERIES, num_results=3)
+
+        tools = {'filename': 'docs/servers/tools.mdx'}
+        filtered = mapped_index.search("tool", filter_dict=tools)
+        assert filtered == index.search("tool", filter_dict=tools)
+        assert {doc['filename'] for doc in filtered} == {'docs/servers/tools.mdx'}
+
+    print("✓ Mapped index returns identical results")
+
+
+def test_mapped_index_can_be_updated():
+    """Incremental updates work on a copy of a mapped index."""
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = make_zip(tmp)
+        index, documents = build(zip_path)
+        save_mapped(index, documents, zip_path, settings=SETTINGS)
+        mapped_index, mapped_documents = load_mapped(zip_path, settings=SETTINGS)
+
+        added = [{'content': 'Sampling lets a tool ask the client LLM.', 'filename': 'docs/sampling.mdx'}]
+        updated = copy.copy(mapped_index)
+        updated.update(added_docs=added)
+        index.update(added_docs=added)
+
+        assert updated.search("sampling") == index.search("sampling")
+        # The mapped index itself is left untouched
+        assert mapped_index.search("sampling") == []
+
+    print("✓ Mapped index can be updated")
+
+
+def test_mapped_index_invalidation():
+    """Other archives, other settings and corrupt files are not loaded."""
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = make_zip(tmp)
+        index, documents = build(zip_path)
+        save_mapped(index, documents, zip_path, settings=SETTINGS, manifest={'a.md': 'x'})
+
+        assert load_mapped(zip_path, settings={'max_tokens': 1, 'overlap': 0}) is None
+
+        changed = dict(DOCS)
+        changed["fastmcp-main/docs/new.md"] = "# New page"
+        make_zip(tmp, changed)
+        assert load_mapped(zip_path, settings=SETTINGS) is None
+
+        # ... but it is still a base for an incremental update
+        _, previous_documents, manifest = load_previous_mapped(zip_path, settings=SETTINGS)
+        assert manifest == {'a.md': 'x'}
+        assert list(previous_documents) == documents
+
+        with open(mapped_path(zip_path), 'r+b') as f:
+            f.write(b"garbage!")
+        assert load_mapped(zip_path, settings=SETTINGS) is None
+        assert load_previous_mapped(zip_path, settings=SETTINGS) is None
+
+    print("✓ Stale, mismatched and corrupt mapped indexes are ignored")
+
+
+def test_server_serves_from_mapping():
+    """The server builds once, then serves (and restarts) from the mapped file."""
+    with isolated_index() as builds:
+        server._initialize_fastmcp_index()
+        assert len(builds) == 1
+        assert isinstance(server._fastmcp_documents, MappedDocuments)
+        zip_path = server._download_fastmcp_zip()
+        assert os.path.exists(mapped_path(zip_path))
+
+        # A second process would find the mapped file and skip the build
+        server._fastmcp_index = server._fastmcp_documents = None
+        server._initialize_fastmcp_index()
+        assert len(builds) == 1
+        assert isinstance(server._fastmcp_documents, MappedDocuments)
+
+    print("✓ Server serves from the mapped index")
+
+
+if __name__ == "__main__":
+    print("Running memory-mapped index tests...\n")
+
+    try:
+        test_mapped_round_trip()
+        test_mapped_index_can_be_updated()
+        test_mapped_index_invalidation()
+        test_server_serves_from_mapping()
+
+        print("\n✅ All memory-mapped index tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
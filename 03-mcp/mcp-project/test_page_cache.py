@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Tests for the two-tier page cache (no network needed).
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+from page_cache import EXPIRED, FRESH, STALE, PageCache
+from test_result_cache import FakeClock
+
+
+def test_freshness_states():
+    """Entries go from fresh to stale to expired; validators become request headers."""
+    clock = FakeClock()
+    cache = PageCache(ttl=10, stale_ttl=20, clock=clock)
+    assert cache.lookup("https://a") == (None, None)
+
+    cache.put("https://a", "page", etag='"abc"', last_modified="Mon, 05 Oct 2026 10:00:00 GMT")
+    states = []
+    for clock.now in [0, 9.9, 10, 29.9, 30]:
+        states.append(cache.lookup("https://a")[1])
+    assert states == [FRESH, FRESH, STALE, STALE, EXPIRED]
+
+    entry, _ = cache.lookup("https://a")
+    assert cache.validators(entry) == {
+        'If-None-Match': '"abc"',
+        'If-Modified-Since': "Mon, 05 Oct 2026 10:00:00 GMT",
+    }
+    assert cache.state(cache.refresh("https://a", entry)) == FRESH
+
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['stale_served'], stats['misses']) == (4, 2, 3)
+
+    print("✓ Fresh, stale and expired entries")
+
+
+def test_disk_tier_budget_and_persistence():
+    """Pages evicted from memory are read back from disk, within the byte budget."""
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "pages")
+        cache = PageCache(max_entries=1, directory=directory, max_disk_bytes=1300)
+        # Nothing is created until a page is written
+        assert not os.path.exists(directory) and cache.lookup("https://a") == (None, None)
+        cache.put("https://a", "a" * 300)
+        cache.put("https://b", "b" * 300)
+        assert cache.stats()['memory_entries'] == 1
+
+        entry, state = cache.lookup("https://a")
+        assert entry['body'] == "a" * 300 and state == FRESH
+        assert cache.stats()['disk_hits'] == 1
+
+        # "b" is now the least recently used page on disk and gets evicted
+        cache.put("https://c", "c" * 300)
+        cache.put("https://d", "d" * 300)
+        stats = cache.stats()
+        assert stats['disk_bytes'] <= 1300 and stats['disk_evictions'] == 1
+        assert len(os.listdir(directory)) == stats['disk_entries'] == 3
+
+        # A new process sees the pages that are still on disk
+        reopened = PageCache(directory=directory, max_disk_bytes=1300)
+        assert reopened.lookup("https://a")[0]['body'] == "a" * 300
+        assert reopened.lookup("https://b") == (None, None)
+
+        reopened.clear()
+        assert os.listdir(directory) == []
+
+    print("✓ Disk tier with byte budget and persistence")
+
+
+def test_unwritable_disk_tier():
+    """A disk tier that cannot be written keeps the pages in memory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        # A file where the directory should be: every write fails
+        directory = os.path.join(tmp, "pages")
+        with open(directory, 'w') as f:
+            f.write("not a directory")
+        cache = PageCache(directory=directory)
+
+        entry = cache.put("https://a", "page")
+        assert entry['body'] == "page"
+        assert cache.refresh("https://a", entry)['body'] == "page"
+        assert cache.lookup("https://a")[0]['body'] == "page"
+
+        stats = cache.stats()
+        assert stats['disk_errors'] == 2
+        assert stats['memory_entries'] == 1 and stats['disk_entries'] == 0
+
+    print("✓ Unwritable disk tier falls back to memory")
+
+
+def test_disk_writes_do_not_hold_the_lock():
+    """Lookups are answered while a page is being written to disk."""
+    started, release = threading.Event(), threading.Event()
+
+    class SlowDisk(PageCache):
+        def _write_disk(self, key, entry):
+            started.set()
+            release.wait(10)
+            super()._write_disk(key, entry)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SlowDisk(directory=tmp)
+        release.set()
+        cache.put("https://a", "a")
+        started.clear()
+        release.clear()
+        writer = threading.Thread(target=cache.put, args=("https://b", "b"))
+        writer.start()
+        try:
+            assert started.wait(10)
+            reader = threading.Thread(target=cache.lookup, args=("https://a",))
+            reader.start()
+            reader.join(5)
+            assert not reader.is_alive(), "the lookup waited for the disk write"
+        finally:
+            release.set()
+            writer.join(10)
+        assert cache.stats()['disk_entries'] == 2
+
+    print("✓ Disk writes do not hold the cache lock")
+
+
+if __name__ == "__main__":
+    try:
+        test_freshness_states()
+        test_disk_tier_budget_and_persistence()
+        test_unwritable_disk_tier()
+        test_disk_writes_do_not_hold_the_lock()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
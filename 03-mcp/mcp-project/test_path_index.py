@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Tests for path-prefix, glob and extension filters (no network needed).
+"""
+
+import asyncio
+import sys
+import tempfile
+
+import numpy as np
+
+import server
+from bm25 import BM25Index
+from mmap_store import load_mapped, save_mapped
+from path_index import PathIndex
+from test_bm25 import make_documents
+from test_index_store import DOCS, make_zip
+from test_server_index import derived_fits, isolated_index
+
+PATHS = [
+    "README.md", "docs/servers/context.mdx", "docs/servers/tools.mdx", "docs/servers/context.mdx",
+    "docs/clients/client.mdx", "docs/servers-old/tools.MD", "docs/servers/auth/oauth.mdx",
+]
+
+
+def test_select():
+    """Prefixes, extensions and globs resolve to sorted document ids."""
+    index = BM25Index(text_fields=['content'], keyword_fields=['filename']).fit(
+        [{'filename': path, 'content': "text"} for path in PATHS]
+    )
+    paths = PathIndex(index.keyword_index['filename'])
+    assert paths.paths == sorted(set(PATHS))
+
+    assert paths.select(["docs/servers/"]).tolist() == [1, 2, 3, 6]
+    assert paths.select(["docs/servers"]).tolist() == [1, 2, 3, 5, 6]
+    assert paths.select(["docs/servers/context.mdx"]).tolist() == [1, 3]
+    assert paths.select([".md"]).tolist() == [0, 5]
+    assert paths.select([".mdx"]).tolist() == [1, 2, 3, 4, 6]
+    assert paths.select(["docs/*/tools.*"]).tolist() == [2, 5]
+    assert paths.select(["docs/servers/*.mdx"]).tolist() == [1, 2, 3, 6]
+    assert paths.select(["docs/servers/", "docs/servers/context.mdx", "README.md"]).tolist() == [0, 1, 2, 3, 6]
+    assert paths.select(["missing/"]).tolist() == [] and paths.select([".txt"]).tolist() == []
+    assert not paths.select(["docs/"]).flags.writeable
+
+    print("✓ Path selection")
+
+
+def test_mapped_keyword_index():
+    """A memory-mapped index gives the same selections."""
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = make_zip(tmp)
+        documents = server._extract_and_index_files(zip_path)
+        index = server._build_fastmcp_index(documents)
+        save_mapped(index, documents, zip_path, settings=server.CHUNK_SETTINGS)
+        mapped_index, _ = load_mapped(zip_path, settings=server.CHUNK_SETTINGS)
+
+        fitted, mapped = PathIndex(index.keyword_index['filename']), PathIndex(mapped_index.keyword_index['filename'])
+        assert mapped.paths == fitted.paths
+        for patterns in [["docs/"], [".md"], ["docs/servers/*"]]:
+            assert mapped.select(patterns).tolist() == fitted.select(patterns).tolist()
+
+    print("✓ Mapped keyword index")
+
+
+def test_restricted_search():
+    """Restricting to allowed ids ranks them exactly like filtering the full ranking."""
+    documents = make_documents(2000)
+    index = BM25Index(text_fields=['content', 'heading']).fit(documents)
+    rng = np.random.default_rng(0)
+    for size in [3, 40, 1500]:
+        allowed = np.sort(rng.choice(len(documents), size=size, replace=False)).astype(np.int32)
+        for query in ["server tool", "python async logging", "context"]:
+            doc_ids, scores = index.search_ids(query, num_results=len(documents))
+            keep = np.isin(doc_ids, allowed)
+            restricted = index.search_ids(query, num_results=10, allowed_ids=allowed)
+            assert restricted[0].tolist() == doc_ids[keep][:10].tolist()
+            assert np.allclose(restricted[1], scores[keep][:10])
+
+    print("✓ Restricted search")
+
+
+def test_paths_in_search():
+    """search_fastmcp_docs only returns sections under the path filters."""
+    def search(query, **options):
+        results = asyncio.run(server.search_fastmcp_docs.fn(query, 5, fields=["filename"], **options))
+        return sorted({result['filename'] for result in results})
+
+    with isolated_index(files=DOCS), derived_fits() as fits:
+        assert search("context tools") == ["docs/servers/context.mdx", "docs/servers/tools.mdx"]
+        assert search("context tools", paths=["docs/servers/tools.mdx"]) == ["docs/servers/tools.mdx"]
+        assert search("fastmcp", paths=[".md"]) == ["README.md"]
+        assert search("fastmcp", paths=["docs/"]) == []
+        assert search("context", paths=["docs/*/context.*", "README.md"]) == ["docs/servers/context.mdx"]
+        assert search('"context object"', paths=["docs/servers/"], mode="hybrid") == ["docs/servers/context.mdx"]
+        # The path index is built off the event loop
+        assert ("paths", False) in fits and not any(on_loop for _, on_loop in fits)
+
+        for paths in [[], [""]]:
+            try:
+                search("context", paths=paths)
+                assert False, "expected ValueError"
+            except ValueError as e:
+                assert "paths" in str(e)
+
+    print("✓ Path filters in search_fastmcp_docs")
+
+
+def test_paths_in_dense_search():
+    """Dense and hybrid rankings are restricted before their top-k, like sparse ones."""
+    files = {
+        f"fastmcp-main/docs/servers/page{i}.mdx": f"# Server tools {i}\nServer tools and server resources."
+        for i in range(120)
+    }
+    files.update({
+        f"fastmcp-main/docs/deployment/page{i}.mdx": f"# Deploy {i}\nRun the server behind a proxy."
+        for i in range(3)
+    })
+
+    with isolated_index(files=files):
+        for mode in ["sparse", "dense", "hybrid"]:
+            results = asyncio.run(server.search_fastmcp_docs.fn(
+                "server tools", 5, fields=["filename"], mode=mode, paths=["docs/deployment/"]
+            ))
+            assert sorted(result['filename'] for result in results) == [
+                f"docs/deployment/page{i}.mdx" for i in range(3)
+            ], mode
+
+    print("✓ Path filters in dense and hybrid search")
+
+
+if __name__ == "__main__":
+    print("Running path filter tests...\n")
+
+    try:
+        test_select()
+        test_mapped_keyword_index()
+        test_restricted_search()
+        test_paths_in_search()
+        test_paths_in_dense_search()
+
+        print("\n✅ All path filter tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+Tests for phrase, proximity and prefix queries on compressed positions (no network needed).
+"""
+
+import asyncio
+import random
+import sys
+
+import numpy as np
+
+import server
+from bm25 import BM25Index, tokenize
+from positional import PositionalIndex, decode_varints, encode_varints, parse_query
+from test_bm25 import make_documents
+from test_server_index import derived_fits, isolated_index
+
+DOCS = [
+    {'content': "The Context object gives tools access to logging"},
+    {'content': "An object of the request context"},
+    {'content': "Context and object, context object, and the object context"},
+    {'content': "Tools, toolkits and resources"},
+]
+
+PAGES = {
+    "fastmcp-main/docs/context.mdx": "# Context\nThe Context object gives tools access to logging.",
+    "fastmcp-main/docs/objects.mdx": "# Objects\nAn object can hold the request context.",
+    "fastmcp-main/docs/servers.mdx": "# Servers\nA server exposes tools. Serving them is easy.",
+}
+
+
+def fit(documents):
+    index = BM25Index(text_fields=['content'], position_fields=['content']).fit(documents)
+    return index, PositionalIndex(index)
+
+
+def test_varints():
+    """Positions round-trip through the variable-length encoding."""
+    values = np.array([0, 1, 127, 128, 300, 16383, 16384, 2**31 - 1, 5])
+    data = encode_varints(values)
+    assert len(data) == 1 + 1 + 1 + 2 + 2 + 2 + 3 + 5 + 1
+    assert decode_varints(data).tolist() == values.tolist()
+    assert decode_varints(encode_varints([3, 4])).tolist() == [3, 4]
+    assert decode_varints(encode_varints([])).tolist() == []
+
+    print("✓ Varint encoding")
+
+
+def test_parse_query():
+    """Phrases and prefixes are split out; their words stay in the text."""
+    assert parse_query('"Context object"~5 tool* logging') == (
+        "context object logging", [(['context', 'object'], 5)], ['tool']
+    )
+    assert parse_query('"run the server" x* "single"') == (
+        "run the server single", [(['run', 'the', 'server'], 0)], []
+    )
+    assert parse_query("plain words") == ("plain words", [], [])
+
+    print("✓ Query syntax")
+
+
+def test_phrases():
+    """Exact phrases and proximity queries match on token positions."""
+    index, positional = fit(DOCS)
+    assert len(positional.occurrences("context")) == 5
+
+    doc_ids, counts = positional.phrase_docs(["context", "object"])
+    assert doc_ids.tolist() == [0, 2] and counts.tolist() == [1, 1]
+    assert positional.phrase_docs(["object", "context"])[0].tolist() == [2]
+    assert positional.phrase_docs(["context", "object"], distance=4)[0].tolist() == [0, 1, 2]
+    assert positional.phrase_docs(["context", "missing"])[0].tolist() == []
+    assert positional.matching_docs([(["context", "object"], 0), (["the", "object"], 0)]).tolist() == [2]
+
+    # The same as scanning every document
+    documents = make_documents(300)
+    index, positional = fit(documents)
+    rng = random.Random(0)
+    for _ in range(20):
+        tokens = tokenize(rng.choice(documents)['content'])
+        start = rng.randrange(len(tokens) - 2)
+        phrase = tokens[start:start + 3]
+        expected = [
+            doc_id for doc_id, tokens in enumerate(tokenize(doc['content']) for doc in documents)
+            if any(tokens[i:i + 3] == phrase for i in range(len(tokens)))
+        ]
+        assert positional.phrase_docs(phrase)[0].tolist() == expected
+
+    print("✓ Phrase and proximity matches")
+
+
+def test_prefixes_and_updates():
+    """Prefixes expand to the most frequent terms; positions follow updates."""
+    index, positional = fit(DOCS)
+    assert positional.prefix_terms("tool") == ["tools", "toolkits"]
+    assert positional.prefix_terms("tool", limit=1) == ["tools"]
+    assert positional.prefix_terms("zz") == []
+
+    index.update(added_docs=[{'content': "context object"}], removed_ids=[0])
+    positional = PositionalIndex(index)
+    assert positional.phrase_docs(["context", "object"])[0].tolist() == [1, 3]
+
+    print("✓ Prefixes and updates")
+
+
+def test_query_syntax_in_search():
+    """search_fastmcp_docs restricts results to phrases and expands prefixes."""
+    def search(query, **options):
+        results = asyncio.run(server.search_fastmcp_docs.fn(query, 5, fields=["filename", "highlights"], **options))
+        return sorted(result['filename'] for result in results)
+
+    with isolated_index(files=PAGES):
+        assert search("context object") == ["docs/context.mdx", "docs/objects.mdx"]
+        assert search('"context object"') == ["docs/context.mdx"]
+        assert search('"context object"', mode="hybrid") == ["docs/context.mdx"]
+        assert search('"object context"~5') == ["docs/context.mdx", "docs/objects.mdx"]
+        assert search('"object context"~4') == ["docs/context.mdx"]
+        assert search('"context unknownword"') == []
+
+        assert search("serv*") == ["docs/servers.mdx"]
+        [result] = asyncio.run(server.search_fastmcp_docs.fn("serv*", 5, fields=["highlights"]))
+        assert "**server**" in result['highlights'][0] and "**serving**" in result['highlights'][0].lower()
+
+        try:
+            search("serv*", mode="dense")
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert "Prefix" in str(e)
+
+    # The positional index of a first prefix query is built off the event loop
+    with isolated_index(files=PAGES), derived_fits() as fits:
+        assert search("serv*") == ["docs/servers.mdx"]
+        assert fits == [("positional", False)]
+
+    print("✓ Query syntax in search_fastmcp_docs")
+
+
+def test_phrases_in_dense_search():
+    """Dense and hybrid rankings only hold documents with the phrase, ranked or not."""
+    pages = {
+        f"fastmcp-main/docs/tools/page{i}.mdx": f"# Tool {i}\nTool object, tool context and a tool object."
+        for i in range(120)
+    }
+    pages["fastmcp-main/docs/context.mdx"] = (
+        "# Notes\nSee the context object for logging, progress, sampling and elicitation details."
+    )
+
+    with isolated_index(files=pages):
+        for mode in ["sparse", "dense", "hybrid"]:
+            results = asyncio.run(server.search_fastmcp_docs.fn(
+                '"context object" tool', 5, fields=["filename"], mode=mode
+            ))
+            assert [result['filename'] for result in results] == ["docs/context.mdx"], mode
+
+    print("✓ Phrases in dense and hybrid search")
+
+
+if __name__ == "__main__":
+    print("Running positional index tests...\n")
+
+    try:
+        test_varints()
+        test_parse_query()
+        test_phrases()
+        test_prefixes_and_updates()
+        test_query_syntax_in_search()
+        test_phrases_in_dense_search()
+
+        print("\n✅ All positional index tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
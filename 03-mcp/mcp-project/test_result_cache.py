@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Tests for the search result cache (no network needed).
+"""
+
+import sys
+
+from result_cache import ResultCache, make_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    """The least recently used entry is evicted first."""
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()['evictions'] == 1
+
+    print("✓ LRU eviction")
+
+
+def test_ttl_expiry():
+    """Entries expire after the TTL."""
+    clock = FakeClock()
+    cache = ResultCache(max_entries=10, ttl=5, clock=clock)
+    cache.put("q", ["result"])
+
+    clock.now = 4.9
+    assert cache.get("q") == ["result"]
+    clock.now = 5.0
+    assert cache.get("q") is None
+    assert len(cache) == 0
+
+    print("✓ TTL expiry")
+
+
+def test_keys_and_counters():
+    """Keys normalize the query; counters track hits and misses."""
+    assert make_key("  Server   TOOL ", 5) == make_key("server tool", 5)
+    assert make_key("server", 5) != make_key("server", 3)
+    assert make_key("server", 5, {'filename': 'a.md'}) != make_key("server", 5)
+
+    cache = ResultCache()
+    key = make_key("server", 5)
+    assert cache.get(key) is None
+    cache.put(key, [])
+    assert cache.get(key) == []
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+    cache.clear()
+    assert cache.get(key) is None
+    assert cache.stats()['entries'] == 0
+
+    print("✓ Key normalization and counters")
+
+
+if __name__ == "__main__":
+    try:
+        test_lru_eviction()
+        test_ttl_expiry()
+        test_keys_and_counters()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+Tests for field projection, pagination and size budgets of search_fastmcp_docs,
+and for the batch tool.
+"""
+
+import asyncio
+import json
+import sys
+
+import server
+from test_server_index import isolated_index
+
+# Thirty pages mentioning tools, with a long body each
+FILES = {
+    f"fastmcp-main/docs/tools/page-{i}.mdx": f"# Tool page {i}\n" + "Tools run the tool server. " * (5 + i)
+    for i in range(30)
+}
+
+
+def search(query, num_results=5, **options):
+    return asyncio.run(server.search_fastmcp_docs.fn(query, num_results, **options))
+
+
+def test_field_projection():
+    """Only the requested fields are returned."""
+    with isolated_index(files=FILES):
+        full = search("tool server", 3)
+        assert list(full[0]) == ['filename', 'heading', 'snippet', 'highlights', 'content']
+        assert '**' in full[0]['highlights'][0] and '**' not in full[0]['snippet']
+
+        light = search("tool server", 3, fields=["filename", "score"])
+        assert [list(result) for result in light] == [['filename', 'score']] * 3
+        assert [result['filename'] for result in light] == [result['filename'] for result in full]
+        assert light[0]['score'] >= light[1]['score'] >= light[2]['score'] > 0
+
+        try:
+            search("tool server", fields=["filename", "secret"])
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert "secret" in str(e)
+
+    print("✓ Fields are projected")
+
+
+def test_pagination_uses_cached_ranking():
+    """Pages slice one cached ranking and add up to the full result list."""
+    with isolated_index(files=FILES):
+        server._rankings.clear()
+        everything = search("tool page", 20, fields=["filename"])
+        hits_before = server._rankings.stats()['hits']
+
+        pages = [search("tool page", 5, offset=offset, fields=["filename"]) for offset in range(0, 20, 5)]
+        assert [result for page in pages for result in page] == everything
+        assert server._rankings.stats()['hits'] == hits_before + 4
+
+        # Past the end there is nothing left
+        assert search("tool page", 5, offset=100) == []
+        try:
+            search("tool page", offset=-1)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+
+    print("✓ Pages come from the cached ranking")
+
+
+def test_rankings_follow_rebuilds():
+    """A rebuilt index never gets the cached ranking of the one it replaced."""
+    def filenames():
+        return [result['filename'] for result in search("tool page", 3, fields=["filename"])]
+
+    with isolated_index(files=FILES):
+        expected = filenames()
+        store = list(server._fastmcp_documents)
+        server._publish_fastmcp_index(server._build_fastmcp_index(store), store, server._fastmcp_manifest)
+        assert filenames() == expected
+
+        # Rebuilt over the same list object, so the document store keeps its id
+        store.reverse()
+        server._publish_fastmcp_index(server._build_fastmcp_index(store), store, server._fastmcp_manifest)
+        assert filenames() == expected
+
+    print("✓ Rankings follow index rebuilds")
+
+
+def test_max_bytes_budget():
+    """Contents are truncated, best result first, so the response fits."""
+    with isolated_index(files=FILES):
+        full = search("tool server", 5)
+        full_size = len(json.dumps(full).encode('utf-8'))
+
+        # The 'truncated' flags alone push the full response over the budget
+        fitted = search("tool server", 5, max_bytes=full_size)
+        assert len(json.dumps(fitted).encode('utf-8')) <= full_size
+        assert [result['truncated'] for result in fitted] == [False] * 4 + [True]
+        assert fitted[0]['content'] == full[0]['content']
+        assert full[-1]['content'].startswith(fitted[-1]['content'])
+
+        budget = full_size // 3
+        fitted = search("tool server", 5, max_bytes=budget)
+        assert len(json.dumps(fitted).encode('utf-8')) <= budget
+        assert fitted and fitted[0]['truncated'] and fitted[-1]['content'] == ""
+        for result, original in zip(fitted, full):
+            assert original['content'].startswith(result['content'])
+
+        # Too small for even one result without content
+        assert search("tool server", 5, max_bytes=10) == []
+
+        names = search("tool server", 5, fields=["filename"], max_bytes=60)
+        assert 0 < len(names) < 5
+        assert len(json.dumps(names)) <= 60
+
+    print("✓ Responses fit the max_bytes budget")
+
+
+def test_batch_tool():
+    """Batched queries get exactly the results of search_fastmcp_docs."""
+    queries = ["tool server", "page 7", '"run the tool"', "unknownterm"]
+    with isolated_index(files=FILES):
+        server._search_cache.clear()
+        batch = asyncio.run(server.search_fastmcp_docs_batch.fn(queries, 3))
+        assert [entry['query'] for entry in batch] == queries
+
+        server._search_cache.clear()
+        for entry in batch:
+            assert entry['results'] == search(entry['query'], 3)
+        assert '**' in batch[0]['results'][0]['highlights'][0]
+        assert batch[-1]['results'] == []
+
+        # Both tools share the cached results
+        hits_before = server._search_cache.stats()['hits']
+        asyncio.run(server.search_fastmcp_docs_batch.fn(queries, 3))
+        assert server._search_cache.stats()['hits'] == hits_before + len(queries)
+
+        try:
+            asyncio.run(server.search_fastmcp_docs_batch.fn(queries, 3, corpora=["missing"]))
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert "missing" in str(e)
+
+    print("✓ Batch tool")
+
+
+if __name__ == "__main__":
+    print("Running search response tests...\n")
+
+    try:
+        test_field_projection()
+        test_pagination_uses_cached_ranking()
+        test_rankings_follow_rebuilds()
+        test_max_bytes_budget()
+        test_batch_tool()
+
+        print("\n✅ All search response tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Tests for the docs index lifecycle of server.py (no network needed).
+"""
+
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import server
+from test_index_store import DOCS, make_zip
+
+
+@contextmanager
+def isolated_index(build_delay=0.0, files=DOCS):
+    """Point server.py at a fresh synthetic archive and count index builds."""
+    saved = {name: getattr(server, name) for name in [
+        '_download_fastmcp_zip', '_build_fastmcp_index', '_fastmcp_index',
+        '_fastmcp_documents', '_fastmcp_manifest', '_warmup_thread',
+    ]}
+    saved_status = dict(server._fastmcp_index_status)
+    builds = []
+
+    def counting_build(documents):
+        builds.append(threading.current_thread().name)
+        time.sleep(build_delay)
+        return saved['_build_fastmcp_index'](documents)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = make_zip(tmp, files)
+        server._download_fastmcp_zip = lambda: zip_path
+        server._build_fastmcp_index = counting_build
+        server._fastmcp_index = server._fastmcp_documents = server._fastmcp_manifest = None
+        server._warmup_thread = None
+        server._fastmcp_index_status.update(state="idle", phase=None, phases={}, error=None)
+        server._search_cache.clear()
+        try:
+            yield builds
+        finally:
+            if server._warmup_thread is not None:
+                server._warmup_thread.join()
+            for name, value in saved.items():
+                setattr(server, name, value)
+            server._fastmcp_index_status.clear()
+            server._fastmcp_index_status.update(saved_status)
+            server._search_cache.clear()
+
+
+@contextmanager
+def derived_fits():
+    """Record the kind of every derived index built, and whether it ran on an event loop."""
+    fits = []
+    fit_derived_index = server._fit_derived_index
+
+    def recording_fit(kind, index):
+        try:
+            asyncio.get_running_loop()
+            fits.append((kind, True))
+        except RuntimeError:
+            fits.append((kind, False))
+        return fit_derived_index(kind, index)
+
+    server._fit_derived_index = recording_fit
+    try:
+        yield fits
+    finally:
+        server._fit_derived_index = fit_derived_index
+
+
+def test_concurrent_callers_share_one_build():
+    """Concurrent first calls wait for a single build and get the same index."""
+    with isolated_index(build_delay=0.2) as builds:
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(server._initialize_fastmcp_index()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(builds) == 1
+        assert len({id(index) for index, _ in results}) == 1
+
+    print("✓ Concurrent callers share one build")
+
+
+def test_concurrent_callers_share_a_failed_build():
+    """A failing build runs once and every concurrent caller gets its error."""
+    with isolated_index() as builds:
+        def failing_load():
+            builds.append(threading.current_thread().name)
+            time.sleep(0.2)
+            raise RuntimeError("corrupt archive")
+
+        saved_load = server._load_or_build_fastmcp_index
+        server._load_or_build_fastmcp_index = failing_load
+        try:
+            errors = []
+
+            def call():
+                try:
+                    server._initialize_fastmcp_index()
+                except RuntimeError as e:
+                    errors.append(str(e))
+
+            threads = [threading.Thread(target=call) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            server._load_or_build_fastmcp_index = saved_load
+
+        assert len(builds) == 1
+        assert errors == ["corrupt archive"] * 5
+        assert server.fastmcp_index_status.fn()['state'] == "failed"
+
+    print("✓ Concurrent callers share a failed build")
+
+
+def test_warmup_and_status():
+    """The warm-up thread builds the index and the status reports readiness."""
+    with isolated_index(build_delay=0.2) as builds:
+        assert server.fastmcp_index_status.fn()['ready'] is False
+
+        server._start_index_warmup()
+        server._start_index_warmup()  # Starting twice is a no-op
+
+        # A search issued during the warm-up waits for it instead of building again
+        results = asyncio.run(server.search_fastmcp_docs.fn("context object", 2))
+        assert results[0]['filename'] == "docs/servers/context.mdx"
+        assert builds == ["fastmcp-index-warmup"]
+
+        status = server.fastmcp_index_status.fn()
+        assert status['ready'] is True and status['state'] == "ready"
+        assert status['documents'] > 0
+        assert {"download", "extract", "fit", "save_snapshot"} <= set(status['phases'])
+
+    print("✓ Warm-up builds the index once and reports readiness")
+
+
+if __name__ == "__main__":
+    try:
+        test_concurrent_callers_share_one_build()
+        test_concurrent_callers_share_a_failed_build()
+        test_warmup_and_status()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
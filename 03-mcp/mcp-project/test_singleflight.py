@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Tests for single-flight request coalescing (no network needed).
+"""
+
+import asyncio
+import sys
+import threading
+import time
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_threads_share_one_call():
+    """Concurrent threads with the same key share one call, its result and its error."""
+    flights = SingleFlight()
+    runs = []
+
+    def slow(value):
+        runs.append(value)
+        time.sleep(0.1)
+        if value == "boom":
+            raise RuntimeError("boom")
+        return value
+
+    def call(key, results):
+        try:
+            results.append(flights.do(key, lambda: slow(key)))
+        except RuntimeError as e:
+            results.append(str(e))
+
+    results = []
+    threads = [threading.Thread(target=call, args=(key, results)) for key in ["a"] * 5 + ["boom"] * 3]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(runs) == ["a", "boom"]
+    assert sorted(results) == ["a"] * 5 + ["boom"] * 3
+    assert (flights.calls, flights.coalesced) == (2, 6)
+
+    # Once finished, the key runs again
+    assert flights.do("a", lambda: slow("a")) == "a" and runs.count("a") == 2
+
+    print("✓ Threads share one in-flight call")
+
+
+def test_tasks_share_one_call():
+    """Concurrent tasks share one call; a cancelled caller does not cancel it for the others."""
+    flights = AsyncSingleFlight()
+    runs = []
+
+    async def slow():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "page"
+
+    async def run():
+        impatient = asyncio.create_task(flights.do("url", slow))
+        await asyncio.sleep(0)
+        others = [flights.do("url", slow) for _ in range(3)]
+        impatient.cancel()
+        return await asyncio.gather(*others)
+
+    assert asyncio.run(run()) == ["page"] * 3
+    assert len(runs) == 1 and flights.coalesced == 3
+
+    print("✓ Tasks share one in-flight call")
+
+
+if __name__ == "__main__":
+    try:
+        test_threads_share_one_call()
+        test_tasks_share_one_call()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)
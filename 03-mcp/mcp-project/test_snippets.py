@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Tests for query-aware snippets and highlights (no network needed).
+"""
+
+import sys
+import tempfile
+
+import numpy as np
+
+from bm25 import BM25Index
+from index_store import load_snapshot, save_snapshot
+from mmap_store import load_mapped, save_mapped
+from snippets import highlight, scanned_matches, stored_matches
+from test_bm25 import make_documents
+from test_index_store import make_zip
+
+TEXT = (
+    "Context is mentioned here first. " + "Unrelated filler words go on and on. " * 12
+    + "Later the Context object gives every tool access to logging and progress. "
+    + "More filler text closes the section. " * 6
+)
+
+
+def fit(documents):
+    return BM25Index(text_fields=['content'], keyword_fields=['filename'], position_fields=['content']).fit(documents)
+
+
+def token_terms(index):
+    terms = {term_id: term for term, term_id in index.vocabulary.items()}
+    return [terms[term_id] for term_id in index.positions['content'][1].tolist()]
+
+
+def test_stored_positions_match_the_text():
+    """Stored positions point at the query terms, like a scan of the text."""
+    documents = make_documents(200) + [{'filename': "docs/emoji.md", 'content': "Tools 🚀 and ÜBER tools"}]
+    index = fit(documents)
+    for query in ["server tool", "context missing", "über tools"]:
+        weights = index.term_weights(query, 'content')
+        for doc_id, doc in enumerate(documents):
+            stored = [(start, end) for start, end, _ in stored_matches(index, doc_id, weights)]
+            scanned = [(start, end) for start, end, _ in scanned_matches(doc['content'], query)[0]]
+            assert stored == scanned
+
+    print("✓ Stored positions match the text")
+
+
+def test_best_window_and_highlights():
+    """The window with the most query terms wins and the terms are highlighted."""
+    matches, weights = scanned_matches(TEXT, "context tool logging")
+    snippet, highlights = highlight(TEXT, matches, weights, max_chars=120)
+
+    assert "tool access to logging" in snippet and "**" not in snippet
+    assert "**Context** object gives every **tool** access to **logging**" in highlights[0]
+    assert len(highlights) == 2 and highlights[1].startswith("**Context** is mentioned")
+    assert all(len(text) <= 120 + 6 + 4 * 3 for text in highlights)
+
+    # Without a match the snippet is the start of the text
+    snippet, highlights = highlight(TEXT, [], {}, max_chars=40)
+    assert snippet.startswith("Context is mentioned") and snippet.endswith("...")
+    assert highlights == []
+
+    print("✓ Best windows are highlighted")
+
+
+def test_positions_survive_updates_and_saves():
+    """Positions are kept through updates, snapshots and mapped files."""
+    documents = make_documents(120)
+    updated = fit(documents[:100]).update(documents[100:], removed_ids=range(0, 100, 3))
+    kept = [doc for i, doc in enumerate(documents[:100]) if i % 3] + documents[100:]
+    fresh = fit(kept)
+    # Term ids differ (the updated vocabulary keeps its old ids), the terms do not
+    assert token_terms(updated) == token_terms(fresh)
+    for i in [0, 2, 3]:
+        assert np.array_equal(updated.positions['content'][i], fresh.positions['content'][i])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = make_zip(tmp)
+        save_snapshot(fresh, kept, zip_path)
+        snapshot, _ = load_snapshot(zip_path)
+        save_mapped(fresh, kept, zip_path)
+        mapped, _ = load_mapped(zip_path)
+        for loaded in [snapshot, mapped]:
+            assert loaded.position_fields == ['content']
+            weights = loaded.term_weights("server tool", 'content')
+            assert weights == fresh.term_weights("server tool", 'content')
+            assert stored_matches(loaded, 5, weights) == stored_matches(fresh, 5, weights)
+
+    print("✓ Positions survive updates and saves")
+
+
+if __name__ == "__main__":
+    print("Running snippet tests...\n")
+
+    try:
+        test_stored_positions_match_the_text()
+        test_best_window_and_highlights()
+        test_positions_survive_updates_and_saves()
+
+        print("\n✅ All snippet tests passed!")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Tests for the single-pass term counter (no network needed).
+"""
+
+import random
+import re
+import sys
+
+from term_counter import TermCounter, count_terms
+
+
+def reference_counts(text, term):
+    """The two counts count_word_in_url used to compute with regex and str.count."""
+    return {
+        'count_word_boundaries': len(re.findall(r'\b' + re.escape(term) + r'\b', text, re.IGNORECASE)),
+        'count_substring': text.lower().count(term.lower()),
+    }
+
+
+def test_matches_regex_and_str_count():
+    """Counts equal the regex and str.count results, including overlaps and punctuation."""
+    text = "Data data DATA. Database, metadata; big-data_x aaaa c++ and C++!"
+    terms = ["data", "Data", "aa", "c++", "big-data", "missing", "a"]
+    counts = count_terms(text, terms)
+    for term in terms:
+        assert counts[term] == reference_counts(text, term), term
+
+    rng = random.Random(7)
+    for _ in range(500):
+        text = "".join(rng.choice("aAbB _-.\nd") for _ in range(rng.randint(0, 80)))
+        terms = ["".join(rng.choice("abd_ .") for _ in range(rng.randint(1, 4))) for _ in range(4)]
+        counts = count_terms(text, terms)
+        for term in terms:
+            assert counts[term] == reference_counts(text, term), (text, term)
+
+    print("✓ Counts match regex and str.count")
+
+
+def test_streamed_chunks():
+    """Feeding the text in chunks gives the same counts as one call."""
+    text = "The data team shares data-driven metadata. Data! " * 50
+    terms = ["data", "metadata", "the", "a"]
+    counter = TermCounter(terms)
+    for start in range(0, len(text), 7):
+        counter.feed(text[start:start + 7])
+    counts = counter.finish()
+
+    assert counter.characters == len(text)
+    for term in terms:
+        assert counts[term] == reference_counts(text, term), term
+
+    print("✓ Streamed chunks")
+
+
+if __name__ == "__main__":
+    try:
+        test_matches_regex_and_str_count()
+        test_streamed_chunks()
+        print("✓ All tests passed!")
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        sys.exit(1)